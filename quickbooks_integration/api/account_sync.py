@@ -1,100 +1,101 @@
 import frappe
-import requests
 import json
+from frappe.utils import cint
 from frappe.utils.password import get_decrypted_password
-
-def get_quickbooks_auth():
-    """Get QuickBooks settings and access token"""
-    settings = frappe.get_single("Quickbook Settings")
-    access_token = settings.access_token
-    realm_id = settings.realm_id
-    environment = settings.environment or "sandbox"
-
-    if environment == "sandbox":
-        base_url = "https://sandbox-quickbooks.api.intuit.com"
-    else:
-        base_url = "https://quickbooks.api.intuit.com"
-
-    return access_token, realm_id, base_url
+from quickbooks_integration.api.batch_commit import BatchCommitter
+from quickbooks_integration.api.qbo_client import get_qbo_client
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+from quickbooks_integration.api.sync_jobs import in_sync_job, track_progress
+from quickbooks_integration.api.sync_logger import get_logger
+from quickbooks_integration.api.sync_state import Watermark, hold_watermark
+from quickbooks_integration.api.telemetry import record_counts
 
 
 @frappe.whitelist()
-def sync_quickbooks_chart_of_accounts():
+def sync_quickbooks_chart_of_accounts(full_sync=0):
     try:
-        access_token, realm_id, base_url = get_quickbooks_auth()
-
-        url = f"{base_url}/v3/company/{realm_id}/query"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/text"
-        }
+        client = get_qbo_client()
 
-        query = "select * from Account"
-        response = requests.post(url, headers=headers, data=query)
+        watermark = Watermark("Account", full_sync=cint(full_sync))
+        accounts = watermark.fetch(client)
+        result = import_quickbooks_accounts(track_progress("Account", watermark.track(accounts)))
 
-        if response.status_code != 200:
-            frappe.throw(f"QuickBooks API Error: {response.text}")
-
-        data = response.json()
-        print(json.dumps(data, indent=2))  
-
-        if "QueryResponse" not in data or "Account" not in data["QueryResponse"]:
+        watermark.save()
+        if not watermark.seen and not watermark.since:
             frappe.throw("No accounts found in QuickBooks response")
 
-        accounts = data["QueryResponse"]["Account"]
-
-        company = frappe.defaults.get_user_default("Company")
-
-        for acc in accounts:
-            acc_name = acc.get("Name")
-            acc_type = acc.get("AccountType")
-            acc_subtype = acc.get("AccountSubType")
-            acc_id = acc.get("Id")
-            acc_number = acc.get("AcctNum") or f"QB-{acc_id}"  
-            parent_id = acc.get("ParentRef", {}).get("value")
-
-            existing = frappe.db.exists("Account", {"quickbooks_id": acc_id})
-            if existing:
-                continue
-
-            account_type, root_type = map_quickbooks_type(acc_type, acc_subtype)
-
-            parent_account = get_parent_account(parent_id)
-            if not parent_id:  
-                parent_account = get_default_root_account(root_type, company)
-
-            if not parent_account:
-                frappe.msgprint(f"Skipping {acc_name}, missing valid parent")
-                continue
-
-            is_group = 0 if parent_id else 1
-
-            new_account = frappe.get_doc({
-                "doctype": "Account",
-                "account_name": acc_name,
-                "account_number": acc_number,
-                "parent_account": parent_account,  
-                "is_group": is_group,
-                "account_type": account_type,
-                "root_type": root_type if not parent_id else None,  
-                "company": company,
-                "quickbooks_id": acc_id
-            })
-            new_account.insert(ignore_permissions=True)
-
-        return "✅ Chart of Accounts synced successfully from QuickBooks"
+        return result
 
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "QuickBooks COA Sync Error")
+        if in_sync_job():
+            raise
         return f"Error: {str(e)}"
 
 
-def get_parent_account(parent_id):
+def import_quickbooks_accounts(accounts):
+    """Create ERPNext Accounts for an iterable of QuickBooks Account records"""
+    company = frappe.defaults.get_user_default("Company")
+    links = QuickBooksLinks()
+    committer = BatchCommitter()
+    created, failed = 0, 0
+
+    for acc in accounts:
+        acc_name = acc.get("Name")
+        acc_type = acc.get("AccountType")
+        acc_subtype = acc.get("AccountSubType")
+        acc_id = acc.get("Id")
+        acc_number = acc.get("AcctNum") or f"QB-{acc_id}"  
+        parent_id = acc.get("ParentRef", {}).get("value")
+
+        existing = links.get_name("Account", acc_id, doctype="Account")
+        if existing:
+            continue
+
+        account_type, root_type = map_quickbooks_type(acc_type, acc_subtype)
+
+        parent_account = get_parent_account(links, parent_id)
+        if not parent_id:  
+            parent_account = get_default_root_account(root_type, company)
+
+        if not parent_account:
+            get_logger().warning("Skipping %s, missing valid parent", acc_name)
+            hold_watermark(acc)
+            continue
+
+        is_group = 0 if parent_id else 1
+
+        try:
+            with committer.record():
+                new_account = frappe.get_doc({
+                    "doctype": "Account",
+                    "account_name": acc_name,
+                    "account_number": acc_number,
+                    "parent_account": parent_account,
+                    "is_group": is_group,
+                    "account_type": account_type,
+                    "root_type": root_type if not parent_id else None,
+                    "company": company,
+                    "quickbooks_id": acc_id
+                })
+                new_account.insert(ignore_permissions=True)
+                links.set("Account", acc_id, "Account", new_account.name, acc.get("SyncToken"))
+                created += 1
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), f"QuickBooks Account Sync Failed: {acc_id}")
+            hold_watermark(acc)
+            failed += 1
+
+    committer.commit()
+    record_counts("Account", created=created, failed=failed)
+    return f"✅ Chart of Accounts synced successfully from QuickBooks: {created} created, {failed} failed"
+
+
+def get_parent_account(links, parent_id):
     """Map QuickBooks parent account ID to ERPNext account"""
     if not parent_id:
         return None
-    return frappe.db.get_value("Account", {"quickbooks_id": parent_id}, "name")
+    return links.get_name("Account", parent_id, doctype="Account")
 
 
 def get_default_root_account(root_type, company):
@@ -0,0 +1,61 @@
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+from quickbooks_integration.api.sync_state import save_checkpoint
+from quickbooks_integration.api.telemetry import get_telemetry
+
+DEFAULT_COMMIT_BATCH_SIZE = 100
+RECORD_SAVEPOINT = "quickbooks_record"
+
+
+class BatchCommitter:
+    """Commits every `batch_size` imported records, isolating each record in a savepoint
+
+    A record that raises is rolled back to its savepoint alone, so the records before
+    it in the same batch survive and are committed with the next batch. Each commit
+    also stores the run's resume checkpoint (see sync_state.Watermark).
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = cint(batch_size) or get_commit_batch_size()
+        self.pending = 0
+        self.committed = 0
+
+    @contextmanager
+    def record(self):
+        started = time.monotonic()
+        frappe.db.savepoint(RECORD_SAVEPOINT)
+        try:
+            yield
+        except Exception:
+            frappe.db.rollback(save_point=RECORD_SAVEPOINT)
+            record_write_time(started)
+            raise
+
+        frappe.db.release_savepoint(RECORD_SAVEPOINT)
+        record_write_time(started)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        """Commit the records imported since the last batch, with the run's checkpoint in the same transaction"""
+        started = time.monotonic()
+        save_checkpoint()
+        frappe.db.commit()
+        record_write_time(started)
+        self.committed += self.pending
+        self.pending = 0
+
+
+def get_commit_batch_size():
+    return cint(frappe.db.get_single_value("Quickbook Settings", "commit_batch_size")) or DEFAULT_COMMIT_BATCH_SIZE
+
+
+def record_write_time(started):
+    telemetry = get_telemetry()
+    if telemetry:
+        telemetry.record_write(time.monotonic() - started)
@@ -0,0 +1,224 @@
+import json
+import time
+
+import frappe
+from frappe.utils import flt
+
+from quickbooks_integration.api.qbo_client import MAX_BATCH_OPERATIONS, QuickBooksAPIError, get_qbo_client
+from quickbooks_integration.api.qbo_links import LINK_DOCTYPE, QuickBooksLinks
+from quickbooks_integration.api.rate_limiter import get_retry_delay
+
+SYNC_TOKEN_FIELD = "custom_quickbooks_sync_token"
+MAX_BATCH_RETRIES = 3  # extra attempts for operations that failed for a transient reason
+NON_RETRYABLE_FAULTS = ("ValidationFault", "AuthorizationFault")  # the same payload will fail again
+
+
+class QuickBooksWriteError(frappe.ValidationError):
+    pass
+
+
+@frappe.whitelist()
+def push_to_quickbooks(doctype, names):
+    """Create or update QBO records for submitted Sales Invoices, Payment Entries or Journal Entries"""
+    frappe.only_for("System Manager")
+    if doctype not in WRITE_MAPPINGS:
+        frappe.throw(f"Pushing {doctype} to QuickBooks is not supported")
+    if isinstance(names, str):
+        names = json.loads(names) if names.startswith("[") else [names]
+
+    try:
+        return push_documents(get_qbo_client(), doctype, names)
+    except QuickBooksAPIError as e:
+        frappe.log_error(e.response_text, "QuickBooks Batch API Error")
+        return "❌ Failed to push documents. Check error logs."
+
+
+def push_documents(client, doctype, names):
+    """Push documents in /batch calls of 30, storing the returned Id/SyncToken and retrying only failed operations"""
+    entity = WRITE_MAPPINGS[doctype]["entity"]
+    links = QuickBooksLinks(client.realm_id)
+    pushed, failed = [], {}
+
+    operations = {}
+    for name in names:
+        doc = frappe.get_doc(doctype, name)
+        if doc.docstatus != 1:
+            failed[name] = "Only submitted documents can be pushed"
+            continue
+        try:
+            operations[name] = build_operation(doc, links)
+        except QuickBooksWriteError as e:
+            failed[name] = str(e)
+
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        retry = {}
+        pending = list(operations.items())
+        for start in range(0, len(pending), MAX_BATCH_OPERATIONS):
+            chunk = dict(pending[start:start + MAX_BATCH_OPERATIONS])
+            # bId only has to be unique within one batch; the document name maps the result back
+            responses = client.batch([{"bId": name, **operation} for name, operation in chunk.items()])
+
+            responded = set()
+            for response in responses:
+                name = response.get("bId")
+                responded.add(name)
+                if entity in response:
+                    save_qbo_reference(doctype, name, response[entity], links)
+                    pushed.append(name)
+                    failed.pop(name, None)
+                    continue
+
+                fault = response.get("Fault", {})
+                failed[name] = get_fault_message(fault)
+                if fault.get("type") not in NON_RETRYABLE_FAULTS:
+                    retry[name] = chunk[name]
+
+            # Operations QBO left out of the response never ran, so they are retried too
+            for name in chunk:
+                if name not in responded:
+                    failed[name] = "No response from QuickBooks"
+                    retry[name] = chunk[name]
+
+            frappe.db.commit()
+
+        if not retry or attempt == MAX_BATCH_RETRIES:
+            break
+        operations = retry
+        # Transient faults are mostly throttling, so back off before the next round
+        time.sleep(get_retry_delay(None, attempt))
+
+    return {"pushed": pushed, "failed": failed}
+
+
+def build_operation(doc, links=None):
+    mapping = WRITE_MAPPINGS[doc.doctype]
+    entity = mapping["entity"]
+    document_links = get_document_links(doc, links or QuickBooksLinks())
+    if document_links and entity not in document_links:
+        # e.g. a Journal Entry imported from a QBO Bill: pushing it as a JournalEntry would book the bill twice
+        other = ", ".join(f"{linked} {qb_id}" for linked, (qb_id, _) in document_links.items())
+        raise QuickBooksWriteError(f"{doc.doctype} {doc.name} was imported from QuickBooks {other} and cannot be pushed as a {entity}")
+
+    payload = mapping["map"](doc)
+    if entity in document_links:
+        qb_id, sync_token = document_links[entity]
+        # Sparse update: only the mapped fields change, QBO keeps the rest, including its own DocNumber
+        payload.pop("DocNumber", None)
+        payload.update({"Id": qb_id, "SyncToken": sync_token or doc.get(SYNC_TOKEN_FIELD) or "0", "sparse": True})
+        return {"operation": "update", entity: payload}
+    return {"operation": "create", entity: payload}
+
+
+def save_qbo_reference(doctype, name, record, links=None):
+    """Store the QBO Id and SyncToken on a submitted document without touching its modified timestamp"""
+    mapping = WRITE_MAPPINGS[doctype]
+    frappe.db.set_value(doctype, name, {
+        mapping["id_field"]: record.get("Id"),
+        SYNC_TOKEN_FIELD: record.get("SyncToken")
+    }, update_modified=False)
+    (links or QuickBooksLinks()).set(mapping["entity"], record.get("Id"), doctype, name, record.get("SyncToken"))
+
+
+def get_document_links(doc, links):
+    """{entity: (QBO Id, SyncToken)} of the records a document was imported as or pushed to
+
+    The id fields cannot tell entities apart: custom_quickbooks_je_id holds a Bill Id
+    on Journal Entries imported from bills, so only the crosswalk is used. Its SyncToken
+    is the one the record had when it was last imported or pushed.
+    """
+    rows = frappe.get_all(
+        LINK_DOCTYPE,
+        filters={"realm_id": links.realm_id, "reference_doctype": doc.doctype, "reference_name": doc.name},
+        fields=["entity", "qbo_id", "sync_token"],
+        as_list=True
+    )
+    return {entity: (qb_id, sync_token) for entity, qb_id, sync_token in rows}
+
+
+def get_fault_message(fault):
+    errors = fault.get("Error") or [{}]
+    return "; ".join(f"{e.get('code', '')} {e.get('Message', '')}: {e.get('Detail', '')}".strip() for e in errors)
+
+
+def get_qbo_id(doctype, name, fieldname):
+    qb_id = frappe.db.get_value(doctype, name, fieldname)
+    if not qb_id:
+        raise QuickBooksWriteError(f"{doctype} {name} has not been synced with QuickBooks")
+    return qb_id
+
+
+def map_sales_invoice(doc):
+    return {
+        "DocNumber": doc.name[:21],  # QBO limit
+        "TxnDate": str(doc.posting_date),
+        "DueDate": str(doc.due_date),
+        "CustomerRef": {"value": get_qbo_id("Customer", doc.customer, "custom_quickbooks_customer_id")},
+        "Line": [
+            {
+                "DetailType": "SalesItemLineDetail",
+                "Amount": flt(item.amount),
+                "Description": item.description,
+                "SalesItemLineDetail": {
+                    "ItemRef": {"value": get_qbo_id("Item", item.item_code, "custom_quickbooks_item_id")},
+                    "Qty": flt(item.qty),
+                    "UnitPrice": flt(item.rate)
+                }
+            }
+            for item in doc.items
+        ]
+    }
+
+
+def map_payment_entry(doc):
+    if doc.party_type != "Customer":
+        raise QuickBooksWriteError(f"Payment Entry {doc.name} is not a customer payment")
+
+    lines = []
+    for reference in doc.references:
+        if reference.reference_doctype != "Sales Invoice":
+            continue
+        lines.append({
+            "Amount": flt(reference.allocated_amount),
+            "LinkedTxn": [{
+                "TxnId": get_qbo_id("Sales Invoice", reference.reference_name, "custom_quickbooks_invoice_id"),
+                "TxnType": "Invoice"
+            }]
+        })
+
+    return {
+        "TxnDate": str(doc.posting_date),
+        "PaymentRefNum": (doc.reference_no or doc.name)[:21],
+        "TotalAmt": flt(doc.received_amount),
+        "CustomerRef": {"value": get_qbo_id("Customer", doc.party, "custom_quickbooks_customer_id")},
+        "Line": lines
+    }
+
+
+def map_journal_entry(doc):
+    lines = []
+    for row in doc.accounts:
+        debit = flt(row.debit_in_account_currency)
+        lines.append({
+            "DetailType": "JournalEntryLineDetail",
+            "Amount": debit or flt(row.credit_in_account_currency),
+            "Description": row.user_remark,
+            "JournalEntryLineDetail": {
+                "PostingType": "Debit" if debit else "Credit",
+                "AccountRef": {"value": get_qbo_id("Account", row.account, "quickbooks_id")}
+            }
+        })
+
+    return {
+        "DocNumber": doc.name[:21],
+        "TxnDate": str(doc.posting_date),
+        "PrivateNote": doc.user_remark,
+        "Line": lines
+    }
+
+
+# ERPNext doctype → QBO entity, the custom field holding the QBO Id and the payload builder
+WRITE_MAPPINGS = {
+    "Sales Invoice": {"entity": "Invoice", "id_field": "custom_quickbooks_invoice_id", "map": map_sales_invoice},
+    "Payment Entry": {"entity": "Payment", "id_field": "qbo_payment_id", "map": map_payment_entry},
+    "Journal Entry": {"entity": "JournalEntry", "id_field": "custom_quickbooks_je_id", "map": map_journal_entry}
+}
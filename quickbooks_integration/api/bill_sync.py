@@ -1,8 +1,13 @@
 import frappe
-import requests
 import json
-from frappe.utils import getdate, nowdate
-from quickbooks_integration.overrides.journal_entry_account import CustomJournalEntryAccount
+from frappe.utils import cint, getdate, nowdate
+from quickbooks_integration.api.batch_commit import BatchCommitter
+from quickbooks_integration.api.qbo_client import QuickBooksAPIError, get_qbo_client
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+from quickbooks_integration.api.resolvers import AccountResolver, ItemResolver
+from quickbooks_integration.api.sync_jobs import in_sync_job, track_progress
+from quickbooks_integration.api.sync_state import Watermark, hold_watermark
+from quickbooks_integration.api.telemetry import record_counts, record_summary
 
 # -----------------------------
 # Date Normalization
@@ -27,47 +32,62 @@ def adjust_due_date_for_je(posting_date, due_date):
 # QuickBooks Bill Sync
 # -----------------------------
 @frappe.whitelist()
-def sync_quickbooks_bills():
+def sync_quickbooks_bills(full_sync=0):
     try:
-        settings = frappe.get_single("Quickbook Settings")
-        access_token = settings.access_token
-        realm_id = settings.realm_id
-        environment = settings.environment or "sandbox"
+        client = get_qbo_client()
 
-        if not access_token or not realm_id:
+        if not client.access_token or not client.realm_id:
             frappe.throw("Access Token or Realm ID missing. Please connect to QuickBooks.")
 
-        base_url = "https://sandbox-quickbooks.api.intuit.com" if environment=="sandbox" else "https://quickbooks.api.intuit.com"
-        endpoint = f"{base_url}/v3/company/{realm_id}/query"
-        query = "SELECT * FROM Bill"
+        watermark = Watermark("Bill", full_sync=cint(full_sync))
+        bills = watermark.fetch(client)
+        msg = import_quickbooks_bills(track_progress("Bill", watermark.track(bills)))
 
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/text"
-        }
+        watermark.save()
+        frappe.db.commit()
 
-        response = requests.post(endpoint, headers=headers, data=query)
-        if response.status_code != 200:
-            frappe.log_error(response.text, "QuickBooks Bill Sync API Error")
-            return "❌ Failed to fetch bills. Check error logs."
+        if not watermark.seen:
+            return "No bills found in QuickBooks."
 
-        bills = response.json().get("QueryResponse", {}).get("Bill", [])
-        print("🔎 Raw Bill Response:")
-        print(json.dumps(bills, indent=4))
+        return msg
 
-        if not bills:
-            return "No bills found in QuickBooks."
+    except QuickBooksAPIError as e:
+        frappe.log_error(e.response_text, "QuickBooks Bill Sync API Error")
+        if in_sync_job():
+            raise
+        return "❌ Failed to fetch bills. Check error logs."
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "QuickBooks Bill Sync Error")
+        if in_sync_job():
+            raise
+        return f"🔥 Error occurred: {str(e)}"
+
+
+def import_quickbooks_bills(bills):
+    """Map QuickBooks Bills to Journal Entries (account lines) or Purchase Invoices (item lines)
 
-        company = frappe.db.get_single_value("Global Defaults", "default_company")
-        default_payable = frappe.db.get_value("Company", company, "default_payable_account")
-        default_expense = frappe.db.get_value("Company", company, "default_expense_account")
-        default_currency = frappe.db.get_single_value("Global Defaults", "default_currency")
+    Returns the counts; why each bill was skipped goes to the QuickBooks Sync Run summary.
+    """
+    company = frappe.db.get_single_value("Global Defaults", "default_company")
+    default_payable = frappe.db.get_value("Company", company, "default_payable_account")
+    default_expense = frappe.db.get_value("Company", company, "default_expense_account")
+    default_currency = frappe.db.get_single_value("Global Defaults", "default_currency")
 
-        created_je, created_pi, updated, skipped = 0, 0, 0, []
+    created_je, created_pi, updated, unchanged, skipped = 0, 0, 0, 0, []
+    links = QuickBooksLinks()
+    item_resolver = ItemResolver(links)
+    account_resolver = AccountResolver(company, links)
+    committer = BatchCommitter()
 
-        for b in bills:
-            try:
+    for b in bills:
+        # Same SyncToken as at the last import: the JE/PI rows are already up to date
+        if links.is_unchanged("Bill", b):
+            unchanged += 1
+            continue
+
+        try:
+            with committer.record():
                 qb_id = b.get("Id")
                 bill_no = b.get("DocNumber")
                 vendor_ref = b.get("VendorRef", {})
@@ -80,11 +100,12 @@ def sync_quickbooks_bills():
                 # --- Supplier mapping ---
                 supplier = None
                 if vendor_id:
-                    supplier = frappe.db.exists("Supplier", {"quickbooks_vendor_id": vendor_id})
+                    supplier = links.get_name("Vendor", vendor_id, doctype="Supplier")
                 if not supplier and vendor_name:
                     supplier = frappe.db.exists("Supplier", {"supplier_name": vendor_name})
                 if not supplier:
                     skipped.append(f"Bill {bill_no or qb_id} skipped - Supplier not found")
+                    hold_watermark(b)
                     continue
 
                 lines = b.get("Line", []) or []
@@ -95,7 +116,7 @@ def sync_quickbooks_bills():
                 # ACCOUNT-BASED → Journal Entry
                 # -----------------------
                 if has_account_lines and not has_item_lines:
-                    existing_je = frappe.db.exists("Journal Entry", {"custom_quickbooks_je_id": qb_id})
+                    existing_je = links.get_name("Bill", qb_id, doctype="Journal Entry")
                     accounts, total_credit = [], 0
                     skip_bill = False
 
@@ -104,11 +125,7 @@ def sync_quickbooks_bills():
                         account_ref = acc_detail.get("AccountRef", {}) or {}
                         acc_name = account_ref.get("name")
 
-                        expense_account = frappe.db.get_value(
-                            "Account",
-                            {"custom_qbc_child_account_name": acc_name, "company": company},
-                            "name"
-                        )
+                        expense_account = account_resolver.resolve(account_ref)
                         if not expense_account:
                             skipped.append(f"Bill {bill_no or qb_id} skipped - Account mapping missing: {acc_name}")
                             skip_bill = True
@@ -126,6 +143,7 @@ def sync_quickbooks_bills():
                         total_credit += line.get("Amount", 0)
 
                     if skip_bill:
+                        hold_watermark(b)
                         continue
 
                     party_account = frappe.db.get_value(
@@ -175,12 +193,15 @@ def sync_quickbooks_bills():
                         je.insert(ignore_permissions=True)
                         created_je += 1
 
+                    links.set("Bill", qb_id, "Journal Entry", je.name, b.get("SyncToken"))
+
                 # -----------------------
                 # ITEM-BASED → Purchase Invoice
                 # -----------------------
                 elif has_item_lines and not has_account_lines:
-                    existing_pi = frappe.db.exists("Purchase Invoice", {"custom_quickbooks_pi_id": qb_id})
+                    existing_pi = links.get_name("Bill", qb_id, doctype="Purchase Invoice")
                     items = []
+                    missing_items = False
 
                     for line in lines:
                         item_detail = line.get("ItemBasedExpenseLineDetail", {}) or {}
@@ -193,9 +214,10 @@ def sync_quickbooks_bills():
                         if not item_name:
                             continue
 
-                        item_code = frappe.db.exists("Item", {"item_name": item_name})
+                        item_code = item_resolver.resolve(item_ref, match_item_code=False)
                         if not item_code:
                             skipped.append(f"Bill {bill_no or qb_id} skipped - Item {item_name} not found")
+                            missing_items = True
                             continue
 
                         items.append({
@@ -207,6 +229,8 @@ def sync_quickbooks_bills():
 
                     if not items:
                         skipped.append(f"Bill {bill_no or qb_id} skipped - No items")
+                        if missing_items:
+                            hold_watermark(b)
                         continue
 
                     posting_date, bill_date, due_date = normalize_invoice_dates(raw_txn_date, raw_due_date)
@@ -241,20 +265,26 @@ def sync_quickbooks_bills():
                         pi.insert(ignore_permissions=True)
                         created_pi += 1
 
+                    if missing_items:
+                        # Fetch it again and, with no SyncToken on the link, update it once the items exist
+                        hold_watermark(b)
+                    links.set("Bill", qb_id, "Purchase Invoice", pi.name, None if missing_items else b.get("SyncToken"))
+
                 else:
                     skipped.append(f"Bill {bill_no or qb_id} skipped - Mixed Account/Item lines")
 
-            except Exception as inner_e:
-                skipped.append(f"Bill {b.get('DocNumber') or b.get('Id')} skipped due to error: {str(inner_e)}")
-                continue
-
-        frappe.db.commit()
-        msg = f"✅ Sync Completed → {created_je} JEs, {created_pi} PIs, {updated} updated."
-        if skipped:
-            msg += f" ⚠️ {len(skipped)} skipped:\n" + "\n".join(skipped)
-        frappe.msgprint(msg)
-        return msg
-
-    except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "QuickBooks Bill Sync Error")
-        return f"🔥 Error occurred: {str(e)}"
+        except Exception as inner_e:
+            skipped.append(f"Bill {b.get('DocNumber') or b.get('Id')} skipped due to error: {inner_e}")
+            hold_watermark(b)
+            continue
+
+    committer.commit()
+    record_counts("Bill", created=created_je + created_pi, updated=updated, skipped=len(skipped) + unchanged)
+    record_summary("Bill", skipped)
+    return {
+        "journal_entries": created_je,
+        "purchase_invoices": created_pi,
+        "updated": updated,
+        "unchanged": unchanged,
+        "skipped": len(skipped)
+    }
@@ -0,0 +1,161 @@
+"""Record QBO traffic of real syncs into cassettes and replay them offline
+
+Set in site_config.json:
+
+    "quickbooks_cassette_mode": "record" | "replay",
+    "quickbooks_cassette": "/path/to/run.jsonl.gz",  # optional when recording
+    "quickbooks_replay_latency": "recorded" | "zero"
+"""
+
+import gzip
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import frappe
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+COMPANY_PATH = re.compile(r"^/v3/company/[^/]+/")
+QUERY_WHERE = re.compile(r" WHERE .+?(?= ORDERBY| STARTPOSITION| MAXRESULTS|$)", re.IGNORECASE)
+RECORDED_HEADERS = ("Content-Type", "Retry-After", "intuit_tid")
+
+_cassette_session = None
+
+
+def get_cassette_mode():
+    """"record", "replay" or None, from quickbooks_cassette_mode in site_config.json"""
+    return frappe.conf.get("quickbooks_cassette_mode")
+
+
+def get_cassette_session():
+    """Session whose adapter records to or replays from the configured cassette, shared by the process"""
+    global _cassette_session
+    if _cassette_session is None:
+        mode = get_cassette_mode()
+        if mode == "record":
+            adapter = RecordingAdapter(frappe.conf.get("quickbooks_cassette") or get_default_cassette_path())
+        elif mode == "replay":
+            if not frappe.conf.get("quickbooks_cassette"):
+                frappe.throw("Set quickbooks_cassette in site_config.json to the cassette to replay.")
+            adapter = ReplayAdapter(
+                frappe.conf.quickbooks_cassette,
+                realistic_latency=frappe.conf.get("quickbooks_replay_latency", "recorded") == "recorded"
+            )
+        else:
+            frappe.throw(f"Unknown quickbooks_cassette_mode: {mode}")
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+        frappe.logger("quickbooks_integration").info(f"📼 QuickBooks cassette {mode}: {adapter.path}")
+        _cassette_session = session
+    return _cassette_session
+
+
+def get_default_cassette_path():
+    directory = os.path.join(frappe.utils.get_bench_path(), "logs", "quickbooks_cassettes")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{frappe.local.site}-{frappe.generate_hash(length=10)}.jsonl.gz")
+
+
+def get_match_keys(method, url, body):
+    """Exact key, plus a loose one that ignores the WHERE clause of /query
+
+    The loose key lets a replay serve a recorded page even though the watermark
+    stored on the replaying site makes the query differ from the recorded one.
+    """
+    url = urlparse(url)
+    path = COMPANY_PATH.sub("", url.path)  # realm ids differ between recording and replaying sites
+    query = urlencode(sorted(parse_qsl(url.query)))
+    body = body.decode() if isinstance(body, bytes) else (body or "")
+    exact = f"{method} {path}?{query} {body}"
+    if path == "query":
+        return exact, f"{method} {path}?{query} {QUERY_WHERE.sub('', body)}"
+    return exact, exact
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Sends requests as usual and appends each request/response pair to a gzip JSONL cassette"""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, request, stream=False, **kwargs):
+        started = time.monotonic()
+        response = super().send(request, stream=False, **kwargs)  # the body is needed for the cassette anyway
+        elapsed = time.monotonic() - started
+        response.raw = io.BytesIO(response.content)  # the content was consumed, let streaming readers read it again
+
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "body": request.body.decode() if isinstance(request.body, bytes) else request.body,
+            "status_code": response.status_code,
+            "headers": {h: response.headers[h] for h in RECORDED_HEADERS if h in response.headers},
+            "content": response.content.decode("utf-8", errors="replace"),
+            "elapsed": round(elapsed, 4)
+        }
+        with self.lock, gzip.open(self.path, "at", encoding="utf-8") as cassette:
+            cassette.write(json.dumps(entry) + "\n")
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves recorded responses in recording order per request, never touching the network"""
+
+    def __init__(self, path, realistic_latency=True):
+        super().__init__()
+        self.path = path
+        self.realistic_latency = realistic_latency
+        self.lock = threading.Lock()
+        self.exact = defaultdict(deque)
+        self.loose = defaultdict(deque)
+        with gzip.open(path, "rt", encoding="utf-8") as cassette:
+            for line in cassette:
+                entry = json.loads(line)
+                exact, loose = get_match_keys(entry["method"], entry["url"], entry["body"])
+                self.exact[exact].append(entry)
+                self.loose[loose].append(entry)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        exact, loose = get_match_keys(request.method, request.url, request.body)
+        with self.lock:
+            entry = self.pop(self.exact, exact) or self.pop(self.loose, loose)
+        if not entry:
+            raise requests.ConnectionError(f"No recorded response in the cassette for {request.method} {request.url}", request=request)
+
+        if self.realistic_latency:
+            time.sleep(entry["elapsed"])
+        return self.build_response(request, entry)
+
+    def pop(self, index, key):
+        """Take the next recorded response for a key; the last one keeps being served once the rest are used"""
+        entries = index.get(key)
+        if not entries:
+            return None
+        return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def build_response(self, request, entry):
+        content = entry["content"].encode("utf-8")
+        response = requests.Response()
+        response.status_code = entry["status_code"]
+        response.headers = CaseInsensitiveDict({**entry["headers"], "Content-Length": str(len(content))})
+        response.raw = io.BytesIO(content)  # readable by the streaming /query reader too
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,189 @@
+from datetime import datetime, timedelta, timezone
+
+import frappe
+
+from quickbooks_integration.api.account_sync import import_quickbooks_accounts
+from quickbooks_integration.api.bill_sync import import_quickbooks_bills
+from quickbooks_integration.api.customer_sync import import_quickbooks_customers
+from quickbooks_integration.api.invoice_sync import import_quickbooks_invoices
+from quickbooks_integration.api.item_sync import import_quickbooks_items
+from quickbooks_integration.api.journal_entries_sync import import_quickbooks_journal_entries
+from quickbooks_integration.api.payments_sync import import_quickbooks_payments
+from quickbooks_integration.api.qbo_client import QuickBooksAPIError, get_qbo_client
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+from quickbooks_integration.api.sync_jobs import in_sync_job, track_progress
+from quickbooks_integration.api.sync_state import (
+    Watermark,
+    get_time_before,
+    get_watermark,
+    parse_qbo_timestamp,
+    set_watermark,
+)
+from quickbooks_integration.api.vendor_sync import import_quickbooks_vendors
+
+CDC_STATE = "CDC"
+CDC_MAX_LOOKBACK_DAYS = 30  # QBO rejects changedSince older than this
+CDC_MAX_RESULTS = 1000  # QBO truncates each entity's change list at this size
+REMOVAL_SAVEPOINT = "quickbooks_cdc_removal"
+
+# Dependency order: masters before the transactions that reference them
+ENTITY_IMPORTERS = {
+    "Account": import_quickbooks_accounts,
+    "Customer": import_quickbooks_customers,
+    "Vendor": import_quickbooks_vendors,
+    "Item": import_quickbooks_items,
+    "Invoice": import_quickbooks_invoices,
+    "Bill": import_quickbooks_bills,
+    "Payment": import_quickbooks_payments,
+    "JournalEntry": import_quickbooks_journal_entries
+}
+
+
+@frappe.whitelist()
+def sync_quickbooks_changes(changed_since=None):
+    """Apply every QBO change since the last CDC run with a single /cdc request"""
+    try:
+        client = get_qbo_client()
+
+        if not client.access_token or not client.realm_id:
+            frappe.throw("Access Token or Realm ID missing. Please connect to QuickBooks.")
+
+        since = changed_since or get_watermark(CDC_STATE) or get_oldest_entity_watermark()
+        if not since:
+            frappe.throw("No previous sync found. Run a full sync of each entity before using Change Data Capture.")
+
+        if parse_qbo_timestamp(since) < datetime.now(timezone.utc) - timedelta(days=CDC_MAX_LOOKBACK_DAYS):
+            frappe.throw(f"Last sync was more than {CDC_MAX_LOOKBACK_DAYS} days ago. Run a full sync of each entity instead.")
+
+        data = client.cdc(list(ENTITY_IMPORTERS), since)
+        changes = get_changes_by_entity(data)
+
+        results, failed, held = {}, [], []
+        for entity, importer in ENTITY_IMPORTERS.items():
+            records = changes.get(entity, [])
+            try:
+                results[entity] = apply_entity_changes(client, entity, importer, records, since, held)
+            except Exception:
+                frappe.log_error(frappe.get_traceback(), f"QuickBooks CDC Sync Error: {entity}")
+                failed.append(entity)
+
+        # Only move the CDC watermark forward if every entity was applied, and not past a held record
+        if not failed:
+            cdc_time = min(map(get_time_before, held), key=parse_qbo_timestamp) if held else data.get("time")
+            set_watermark(CDC_STATE, cdc_time, sum(len(r) for r in changes.values()))
+        frappe.db.commit()
+
+        if failed and in_sync_job():
+            frappe.throw(f"Changes of {', '.join(failed)} could not be applied. Check error logs.")
+        return {"changed_since": since, "results": results, "failed": failed}
+
+    except QuickBooksAPIError as e:
+        frappe.log_error(e.response_text, "QuickBooks CDC API Error")
+        if in_sync_job():
+            raise
+        return "❌ Failed to fetch changes. Check error logs."
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "QuickBooks CDC Sync Error")
+        if in_sync_job():
+            raise
+        return f"🔥 Error occurred: {e}"
+
+
+def get_oldest_entity_watermark():
+    """Fall back to the oldest per-entity watermark when every entity has one"""
+    watermarks = [get_watermark(entity) for entity in ENTITY_IMPORTERS]
+    if not all(watermarks):
+        return None
+    return min(watermarks, key=parse_qbo_timestamp)
+
+
+def get_changes_by_entity(data):
+    """Flatten the nested CDCResponse into {entity: [records]}"""
+    changes = {}
+    for cdc_response in data.get("CDCResponse", []):
+        for query_response in cdc_response.get("QueryResponse", []):
+            for entity in ENTITY_IMPORTERS:
+                if entity in query_response:
+                    changes.setdefault(entity, []).extend(query_response[entity])
+    return changes
+
+
+def apply_entity_changes(client, entity, importer, records, since, held=None):
+    """Route deleted/voided records to removal and the rest to the entity's import function
+
+    The LastUpdatedTime of the oldest record the import skipped or rolled back, or whose
+    removal failed, is added to held.
+    """
+    if not records:
+        return None
+
+    watermark = Watermark(entity)
+    if len(records) >= CDC_MAX_RESULTS:
+        # CDC truncated this entity, so page through the changes with a regular query instead
+        records = client.iter_updated_since(entity, since)
+        result = importer(track_progress(entity, watermark.track(records)))
+        watermark.save()
+        if watermark.held_from and held is not None:
+            held.append(watermark.held_from)
+        return result
+
+    removed = []
+    changed = []
+    for record in records:
+        if is_deleted(record) or is_voided(entity, record):
+            # One failed removal is rolled back and held, without losing the rest of the entity's changes
+            frappe.db.savepoint(REMOVAL_SAVEPOINT)
+            try:
+                removed.extend(remove_linked_documents(entity, record.get("Id")))
+            except Exception:
+                frappe.db.rollback(save_point=REMOVAL_SAVEPOINT)
+                frappe.log_error(frappe.get_traceback(), f"QuickBooks CDC Delete Error: {entity} {record.get('Id')}")
+                watermark.hold(record)
+            else:
+                frappe.db.release_savepoint(REMOVAL_SAVEPOINT)
+        else:
+            changed.append(record)
+
+    result = importer(track_progress(entity, watermark.track(changed, checkpoint=False))) if changed else None
+    watermark.save()
+    if watermark.held_from and held is not None:
+        held.append(watermark.held_from)
+    return {"imported": result, "removed": removed}
+
+
+def is_deleted(record):
+    return record.get("status") == "Deleted"
+
+
+def is_voided(entity, record):
+    """QBO keeps voided transactions with a zero total and a 'Voided' private note"""
+    if entity not in ("Invoice", "Payment"):
+        return False
+    return not record.get("TotalAmt") and "Voided" in (record.get("PrivateNote") or "")
+
+
+def remove_linked_documents(entity, qb_id):
+    """Cancel submitted documents, delete drafts and disable masters linked to a QBO Id"""
+    links = QuickBooksLinks()
+    link = links.get(entity, qb_id)
+    if not link:
+        return []
+
+    doctype, name = link[0], link[1]
+    if not frappe.db.exists(doctype, name):
+        links.remove(entity, qb_id)
+        return []
+
+    doc = frappe.get_doc(doctype, name)
+    if doc.meta.is_submittable and doc.docstatus == 1:
+        doc.flags.ignore_permissions = True
+        doc.cancel()
+        links.remove(entity, qb_id)
+    elif doc.meta.is_submittable and doc.docstatus == 0:
+        doc.delete(ignore_permissions=True)  # on_trash drops the link
+    elif doc.meta.has_field("disabled"):
+        doc.db_set("disabled", 1)
+    else:
+        return []
+    return [f"{doctype} {name}"]
@@ -1,33 +1,20 @@
-import requests
 import frappe
-import json
 from frappe.utils.password import get_decrypted_password
+from quickbooks_integration.api.qbo_client import get_qbo_client
 
 @frappe.whitelist()
 def get_quickbooks_company_info():
     try:
         # Fetch QuickBooks settings from your doctype
-        settings = frappe.get_single("Quickbook Settings")
-        access_token = settings.access_token
-        realm_id = settings.realm_id
-        
-        if not access_token or not realm_id:
+        client = get_qbo_client()
+
+        if not client.access_token or not client.realm_id:
             frappe.throw("QuickBooks Access Token or Realm ID is missing")
-        
-        url = f"https://quickbooks.api.intuit.com/v3/company/{realm_id}/companyinfo/{realm_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(url, headers=headers)
+
+        response = client.get_company_info()
         response.raise_for_status()
         
         company_info = response.json()
-        print("Company Info:")
-        print(json.dumps(company_info, indent=2))
 
         return company_info
     
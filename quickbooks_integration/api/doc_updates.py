@@ -0,0 +1,34 @@
+import frappe
+from frappe.utils import cstr
+
+
+def get_current_values(doctype, name, fieldnames):
+    """Stored values of the given fields, read in one query without loading the document
+
+    Fields the doctype does not have are left out, as the ORM would ignore them on save.
+    """
+    meta = frappe.get_meta(doctype)
+    fieldnames = [fieldname for fieldname in fieldnames if meta.has_field(fieldname)]
+    return frappe.db.get_value(doctype, name, fieldnames, as_dict=True) or frappe._dict()
+
+
+def get_changes(current, values):
+    """Mapped values that differ from the stored ones; None, "" and 0/"0" compare the way they are stored"""
+    return {
+        fieldname: value
+        for fieldname, value in values.items()
+        if fieldname in current and cstr(current[fieldname]) != cstr(value)
+    }
+
+
+def apply_header_changes(doctype, name, changes):
+    """Write plain header fields straight to the row, skipping the controller and its validation
+
+    Only for fields no validation, child table or hook depends on. Fields that on_update copies to
+    other documents (Item Prices, variants, Contacts) need the caller to make that copy itself, or
+    a full save.
+    """
+    if not changes:
+        return
+    frappe.db.set_value(doctype, name, changes)
+    frappe.clear_document_cache(doctype, name)
@@ -1,8 +1,15 @@
 import frappe
-import requests
 import json
-from frappe.utils import nowdate
+from frappe.utils import cint, nowdate
 from frappe import _   # ✅ Fix for translation function
+from quickbooks_integration.api.batch_commit import BatchCommitter
+from quickbooks_integration.api.qbo_client import get_qbo_client
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+from quickbooks_integration.api.resolvers import CustomerResolver, ItemResolver
+from quickbooks_integration.api.sync_jobs import track_progress
+from quickbooks_integration.api.sync_logger import RecordLogger, get_logger
+from quickbooks_integration.api.sync_state import Watermark, hold_watermark
+from quickbooks_integration.api.telemetry import record_counts, record_summary
 
 
 def get_or_create_payment_terms_template(template_name="3 Days from Invoice Date"):
@@ -23,84 +30,89 @@ def get_or_create_payment_terms_template(template_name="3 Days from Invoice Date
 
 
 @frappe.whitelist()
-def sync_quickbooks_invoices():
+def sync_quickbooks_invoices(full_sync=0):
     """Sync invoices from QuickBooks to ERPNext"""
     try:
-        settings = frappe.get_single("Quickbook Settings")
-        access_token = settings.access_token
-        realm_id = settings.realm_id
-        environment = settings.environment or "sandbox"
+        client = get_qbo_client()
 
-        if not access_token or not realm_id:
+        if not client.access_token or not client.realm_id:
             frappe.throw("QuickBooks access token or Realm ID is missing. Please check Quickbook Settings.")
 
-        base_url = (
-            "https://sandbox-quickbooks.api.intuit.com"
-            if environment == "sandbox"
-            else "https://quickbooks.api.intuit.com"
-        )
-
-        # Fetch invoices
-        url = f"{base_url}/v3/company/{realm_id}/query"
-        query = {"query": "SELECT * FROM Invoice MAXRESULTS 50", "minorversion": "65"}
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/text",
-        }
-
-        response = requests.post(url, headers=headers, data=query["query"])
-        data = response.json()
-        invoices = data.get("QueryResponse", {}).get("Invoice", [])
-        frappe.msgprint(f"🔥 Total Invoices in QuickBooks: {len(invoices)}")
-        print("Fetched Invoices:", json.dumps(invoices, indent=2))
-        print(f"🔥 Total Invoices in QuickBooks: {len(invoices)}")
-
-        created_invoices = []
-        skipped_invoices = []
-
-        # Ensure payment terms template exists
-        default_terms = get_or_create_payment_terms_template("3 Days from Invoice Date")
-
-        # ✅ Fixed Cost Center
-        fixed_cost_center = "Benin - MTL"
-
-        for qb_invoice in invoices:
-            try:
+        watermark = Watermark("Invoice", full_sync=cint(full_sync))
+        invoices = watermark.fetch(client)
+        result = import_quickbooks_invoices(track_progress("Invoice", watermark.track(invoices)))
+
+        watermark.save()
+        get_logger().info("🔥 Total Invoices in QuickBooks: %s", watermark.seen)
+        return result
+
+    except Exception as e:
+        frappe.throw(f"Error syncing invoices: {str(e)}")
+
+
+def import_quickbooks_invoices(invoices):
+    """Create and submit Sales Invoices for an iterable of QuickBooks Invoice records
+
+    Returns the counts; why each invoice was skipped goes to the QuickBooks Sync Run summary.
+    """
+    created = 0
+    skipped_invoices = []
+
+    # Ensure payment terms template exists
+    default_terms = get_or_create_payment_terms_template("3 Days from Invoice Date")
+
+    # ✅ Fixed Cost Center
+    fixed_cost_center = "Benin - MTL"
+
+    links = QuickBooksLinks()
+    customers = CustomerResolver(links)
+    items = ItemResolver(links)
+    committer = BatchCommitter()
+    logger = get_logger()
+    record_logger = RecordLogger("Invoice")
+
+    for qb_invoice in invoices:
+        try:
+            with committer.record():
                 qb_invoice_id = qb_invoice.get("Id")
-                customer_ref = qb_invoice.get("CustomerRef", {}).get("name")
+                customer_qbo_ref = qb_invoice.get("CustomerRef") or {}
+                customer_ref = customer_qbo_ref.get("name") or customer_qbo_ref.get("value")
 
                 if not customer_ref:
                     skipped_invoices.append(f"Invoice {qb_invoice_id} → No CustomerRef in QuickBooks")
                     continue
 
-                # ✅ Lookup customer by customer_name or name
-                customer_name = frappe.db.get_value("Customer", {"customer_name": customer_ref}, "name") \
-                                or frappe.db.get_value("Customer", {"name": customer_ref}, "name")
+                # ✅ Lookup customer by QBO id, falling back to customer_name or name
+                customer_name = (
+                    customers.get_by_qbo_id(customer_qbo_ref.get("value"))
+                    or customers.get_by_name(customer_qbo_ref.get("name"))
+                )
 
                 if not customer_name:
                     skipped_invoices.append(f"Invoice {qb_invoice_id} → Customer '{customer_ref}' not found in ERPNext")
+                    hold_watermark(qb_invoice)
                     continue
 
-                customer = frappe.get_doc("Customer", customer_name)
-
                 # ✅ Ensure customer has payment terms
-                if not customer.payment_terms:
-                    customer.payment_terms = default_terms
+                payment_terms = customers.get_payment_terms(customer_name)
+                if not payment_terms:
+                    customer = frappe.get_doc("Customer", customer_name)
+                    customer.payment_terms = payment_terms = default_terms
                     customer.save(ignore_permissions=True)
+                    customers.add(customer_name, payment_terms=payment_terms)
 
                 # Skip if invoice already exists
-                if frappe.db.exists("Sales Invoice", {"custom_quickbooks_invoice_id": qb_invoice_id}):
+                if links.get("Invoice", qb_invoice_id):
                     skipped_invoices.append(f"Invoice {qb_invoice_id} → Already exists in ERPNext")
                     continue
 
                 # Create Sales Invoice
                 si = frappe.new_doc("Sales Invoice")
-                si.customer = customer.name
+                si.customer = customer_name
                 si.company = frappe.defaults.get_user_default("Company")
                 si.posting_date = qb_invoice.get("TxnDate") or nowdate()
                 si.custom_quickbooks_invoice_id = qb_invoice_id  # ✅ mapped to custom field
-                si.payment_terms_template = customer.payment_terms or default_terms
+                si.payment_terms_template = payment_terms or default_terms
                 si.currency = frappe.get_cached_value("Company", si.company, "default_currency")  # ✅ Fix billing currency issue
 
                 # ✅ Map Header Cost Center
@@ -119,9 +131,8 @@ def sync_quickbooks_invoices():
                     if not item_ref:
                         continue
 
-                    # Lookup item code
-                    item_code = frappe.db.get_value("Item", {"item_code": item_ref}, "item_code") \
-                                or frappe.db.get_value("Item", {"item_name": item_ref}, "item_code")
+                    # Lookup item code by QBO id, item_code or item_name
+                    item_code = items.resolve(detail.get("ItemRef"))
 
                     if not item_code:
                         skipped_invoices.append(f"Invoice {qb_invoice_id} → Item '{item_ref}' not found")
@@ -142,19 +153,17 @@ def sync_quickbooks_invoices():
                 # Save and submit
                 si.save(ignore_permissions=True)
                 si.submit()
-                created_invoices.append(f"Invoice {qb_invoice_id} → Created for Customer '{customer_ref}'")
-                frappe.msgprint(f"Invoice {qb_invoice_id} → Created for Customer '{customer_ref}'")
-                print(f"Invoice {qb_invoice_id} → Created for Customer '{customer_ref}'")
-
-            except Exception:
-                skipped_invoices.append(f"Invoice {qb_invoice.get('Id')} → Error: {frappe.get_traceback()}")
-                print(f"Error processing Invoice {qb_invoice.get('Id')}: {frappe.get_traceback()}")
-
-        # Summary
-        summary = "<b>✅ Created Invoices:</b><br>" + "<br>".join(created_invoices) if created_invoices else "None"
-        summary += "<br><br><b>❌ Skipped Invoices:</b><br>" + "<br>".join(skipped_invoices) if skipped_invoices else ""
-        frappe.msgprint(summary)
-        print(summary)
-
-    except Exception as e:
-        frappe.throw(f"Error syncing invoices: {str(e)}")
+                links.set("Invoice", qb_invoice_id, "Sales Invoice", si.name, qb_invoice.get("SyncToken"))
+                created += 1
+                record_logger.debug("Invoice %s → Created for Customer '%s'", qb_invoice_id, customer_ref)
+
+        except Exception:
+            skipped_invoices.append(f"Invoice {qb_invoice.get('Id')} → Error: {frappe.get_traceback()}")
+            hold_watermark(qb_invoice)
+            logger.warning("Error processing Invoice %s", qb_invoice.get("Id"), exc_info=True)
+
+    committer.commit()
+    record_counts("Invoice", created=created, skipped=len(skipped_invoices))
+    record_summary("Invoice", skipped_invoices)
+    logger.info("Invoice sync: %s created, %s skipped", created, len(skipped_invoices))
+    return {"created": created, "skipped": len(skipped_invoices)}
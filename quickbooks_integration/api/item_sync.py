@@ -1,50 +1,68 @@
 import frappe
-import requests
 import json
+from frappe.utils import cint
+from quickbooks_integration.api.batch_commit import BatchCommitter
+from quickbooks_integration.api.doc_updates import apply_header_changes, get_changes, get_current_values
+from quickbooks_integration.api.qbo_client import QuickBooksAPIError, get_qbo_client
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+from quickbooks_integration.api.sync_jobs import in_sync_job, track_progress
+from quickbooks_integration.api.sync_logger import get_logger
+from quickbooks_integration.api.sync_state import Watermark, hold_watermark
+from quickbooks_integration.api.telemetry import record_counts
+
+# Item header fields that Item.update_item_price copies to every Item Price of the item
+ITEM_PRICE_FIELDS = {"item_name": "item_name", "description": "item_description"}
+
 
 @frappe.whitelist()
-def sync_quickbooks_items():
+def sync_quickbooks_items(full_sync=0):
     try:
         # Load QuickBooks Settings
-        settings = frappe.get_single("Quickbook Settings")
-        access_token = settings.access_token
-        realm_id = settings.realm_id
-        environment = settings.environment or "sandbox"
+        client = get_qbo_client()
 
-        if not access_token or not realm_id:
+        if not client.access_token or not client.realm_id:
             frappe.throw("Access Token or Realm ID missing. Please connect to QuickBooks.")
 
-        # Choose base URL
-        base_url = "https://sandbox-quickbooks.api.intuit.com" if environment == "sandbox" else "https://quickbooks.api.intuit.com"
-        endpoint = f"{base_url}/v3/company/{realm_id}/query"
-        query = "SELECT * FROM Item"  # Fetch all items
+        watermark = Watermark("Item", full_sync=cint(full_sync))
+        qb_items = watermark.fetch(client)
+        result = import_quickbooks_items(track_progress("Item", watermark.track(qb_items)))
 
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/text"
-        }
+        watermark.save()
+        get_logger().info("Fetched Items Count: %s", watermark.seen)
+        if not watermark.seen:
+            return "No items found in QuickBooks."
 
-        response = requests.post(endpoint, headers=headers, data=query)
+        return result
 
-        if response.status_code != 200:
-            frappe.log_error(response.text, "QuickBooks Item Fetch Error")
-            return "Failed to fetch items. Check error logs."
+    except QuickBooksAPIError as e:
+        frappe.log_error(e.response_text, "QuickBooks Item Fetch Error")
+        if in_sync_job():
+            raise
+        return "Failed to fetch items. Check error logs."
 
-        item_data = response.json()
-        print("Fetched Item Data:", json.dumps(item_data, indent=2))
-        print("Fetched Items Count:", len(item_data.get("QueryResponse", {}).get("Item", [])))
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "QuickBooks Item Sync Error")
+        if in_sync_job():
+            raise
+        return f"Error occurred: {str(e)}"
 
-        if "QueryResponse" not in item_data or "Item" not in item_data["QueryResponse"]:
-            return "No items found in QuickBooks."
 
-        qb_items = item_data["QueryResponse"]["Item"]
+def import_quickbooks_items(qb_items):
+    """Create or update ERPNext Items for an iterable of QuickBooks Item records"""
+    created_items = []
+    skipped_items = []
+    unchanged = 0
+    committer = BatchCommitter()
+    links = QuickBooksLinks()
 
-        created_items = []
-        skipped_items = []
+    for qb_item in qb_items:
+        # Same SyncToken as at the last import: nothing changed in QuickBooks, so skip the save
+        if links.is_unchanged("Item", qb_item, doctype="Item"):
+            unchanged += 1
+            continue
 
-        for qb_item in qb_items:
-            try:
+        try:
+            with committer.record():
                 # Map QuickBooks fields to ERPNext fields
                 qb_item_id = qb_item.get("Id")
                 item_code = qb_item.get("Name") or qb_item_id
@@ -52,68 +70,85 @@ def sync_quickbooks_items():
                 description = qb_item.get("Description", "")
                 is_stock_item = qb_item.get("Type") == "Inventory"
 
-                # ✅ Dynamic Item Group
                 qb_item_group = qb_item.get("SubItem") or "All Item Groups"
-                if not frappe.db.exists("Item Group", qb_item_group):
-                    # create item group if not exists
-                    ig = frappe.get_doc({
-                        "doctype": "Item Group",
-                        "item_group_name": qb_item_group,
-                        "parent_item_group": "All Item Groups",
-                        "is_group": 0
-                    })
-                    ig.insert(ignore_permissions=True)
-                    frappe.db.commit()
-
-                # ✅ Dynamic UOM
                 qb_uom = qb_item.get("UnitPrice")  # QB does not always store UOM directly
                 stock_uom = qb_item.get("Unit") or "Nos"
-                if not frappe.db.exists("UOM", stock_uom):
-                    uom_doc = frappe.get_doc({"doctype": "UOM", "uom_name": stock_uom})
-                    uom_doc.insert(ignore_permissions=True)
-                    frappe.db.commit()
+
+                # Plain header fields can be written directly; the rest go through Item validation
+                header_values = {"item_name": item_name, "description": description}
+                validated_values = {"item_group": qb_item_group, "stock_uom": stock_uom, "is_stock_item": 1 if is_stock_item else 0}
+                item_values = {**header_values, **validated_values}
 
                 # Check if item already exists by QuickBooks ID
-                existing_item = frappe.db.exists("Item", {"custom_quickbooks_item_id": qb_item_id})
+                existing_item = links.get_name("Item", qb_item_id, doctype="Item")
                 if existing_item:
-                    # ✅ Update existing item instead of skipping
-                    erp_item = frappe.get_doc("Item", existing_item)
-                    erp_item.item_name = item_name
-                    erp_item.description = description
-                    erp_item.item_group = qb_item_group
-                    erp_item.stock_uom = stock_uom
-                    erp_item.is_stock_item = 1 if is_stock_item else 0
-                    erp_item.save(ignore_permissions=True)
-                    frappe.db.commit()
+                    # ✅ Update existing item instead of skipping, saving it only when a validated field changed
+                    current = get_current_values("Item", existing_item, [*item_values, "has_variants"])
+                    changes = get_changes(current, item_values)
+                    # Item.on_update copies the header fields to variants too; templates keep the full save
+                    if changes.keys() - header_values.keys() or (changes and cint(current.get("has_variants"))):
+                        ensure_item_group(qb_item_group)
+                        ensure_uom(stock_uom)
+                        erp_item = frappe.get_doc("Item", existing_item)
+                        erp_item.update(item_values)
+                        erp_item.save(ignore_permissions=True)
+                    else:
+                        apply_item_header_changes(existing_item, changes)
+                    links.set("Item", qb_item_id, "Item", existing_item, qb_item.get("SyncToken"))
                     skipped_items.append(item_code)
                     continue
 
+                ensure_item_group(qb_item_group)
+                ensure_uom(stock_uom)
+
                 # Create new ERPNext Item
                 erp_item = frappe.get_doc({
                     "doctype": "Item",
                     "item_code": item_code,
-                    "item_name": item_name,
-                    "item_group": qb_item_group,
-                    "description": description,
-                    "stock_uom": stock_uom,
-                    "is_stock_item": 1 if is_stock_item else 0,
+                    **item_values,
                     "disabled": 0,
                     "custom_quickbooks_item_id": qb_item_id
                 })
                 erp_item.insert(ignore_permissions=True)
-                frappe.db.commit()
+                links.set("Item", qb_item_id, "Item", erp_item.name, qb_item.get("SyncToken"))
 
                 created_items.append(item_code)
 
-            except Exception:
-                frappe.log_error(frappe.get_traceback(), "QuickBooks Item Creation Error")
-                skipped_items.append(qb_item.get("Name") or qb_item.get("Id"))
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), "QuickBooks Item Creation Error")
+            hold_watermark(qb_item)
+            skipped_items.append(qb_item.get("Name") or qb_item.get("Id"))
 
-        return f"✅ Sync complete. Created: {len(created_items)} | Updated/Skipped: {len(skipped_items)}"
-        print(f"Created Items: {created_items}")
-        print(f"Skipped Items: {skipped_items}")    
+    committer.commit()
 
-    except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "QuickBooks Item Sync Error")
-        return f"Error occurred: {str(e)}"
-        print(f"Error syncing items: {str(e)}")
\ No newline at end of file
+    record_counts("Item", created=len(created_items), skipped=len(skipped_items) + unchanged)
+    return f"✅ Sync complete. Created: {len(created_items)} | Updated/Skipped: {len(skipped_items)} | Unchanged: {unchanged}"
+
+
+def apply_item_header_changes(item_code, changes):
+    """Write item_name/description changes directly, with the copy Item.update_item_price would make"""
+    if not changes:
+        return
+    apply_header_changes("Item", item_code, changes)
+    price_values = {
+        ITEM_PRICE_FIELDS[fieldname]: value for fieldname, value in changes.items() if fieldname in ITEM_PRICE_FIELDS
+    }
+    if price_values:
+        frappe.db.set_value("Item Price", {"item_code": item_code}, price_values)
+
+
+def ensure_item_group(item_group):
+    """Create the QuickBooks item group under All Item Groups if missing"""
+    if not frappe.db.exists("Item Group", item_group):
+        frappe.get_doc({
+            "doctype": "Item Group",
+            "item_group_name": item_group,
+            "parent_item_group": "All Item Groups",
+            "is_group": 0
+        }).insert(ignore_permissions=True)
+
+
+def ensure_uom(uom):
+    """Create the QuickBooks unit as a UOM if missing"""
+    if not frappe.db.exists("UOM", uom):
+        frappe.get_doc({"doctype": "UOM", "uom_name": uom}).insert(ignore_permissions=True)
@@ -1,9 +1,9 @@
 import frappe
 from intuitlib.client import AuthClient
 from intuitlib.enums import Scopes
-import traceback
-import requests
-import json
+from quickbooks_integration.api.qbo_client import get_qbo_client
+from quickbooks_integration.api.sync_logger import get_logger
+from quickbooks_integration.api.token_manager import clear_published_token, save_tokens
 
 
 @frappe.whitelist()
@@ -22,11 +22,7 @@ def get_auth_url():
     if not redirect_uri:
         frappe.throw("Redirect URI is missing in Quickbook Settings")
 
-    print("🔐 QuickBooks OAuth Client Details:")
-    print("Client ID:", client_id)
-    print("Client Secret:", client_secret)
-    print("Redirect URI:", redirect_uri)
-    print("Environment:", environment)
+    get_logger().info("🔐 Generating QuickBooks OAuth URL (%s, redirect %s)", environment, redirect_uri)
 
     auth_client = AuthClient(
         client_id=client_id,
@@ -38,8 +34,6 @@ def get_auth_url():
     scopes = [Scopes.ACCOUNTING]
     auth_url = auth_client.get_authorization_url(scopes)
 
-    print("🌐 Generated QuickBooks OAuth URL:", auth_url)
-
     frappe.cache().set_value("quickbooks_auth_client", auth_client)
 
     return auth_url
@@ -47,9 +41,8 @@ def get_auth_url():
 
 @frappe.whitelist(allow_guest=True)
 def oauth_callback(code=None, state=None, realmId=None):
-    print("🔁 QuickBooks OAuth Callback:")
-    print("Code:", code)
-    print("Realm ID:", realmId)
+    logger = get_logger()
+    logger.info("🔁 QuickBooks OAuth Callback for realm %s", realmId)
 
     if not code:
         frappe.throw("Missing authorization code from QuickBooks.")
@@ -72,41 +65,30 @@ def oauth_callback(code=None, state=None, realmId=None):
             redirect_uri=redirect_uri
         )
 
-        print("🔐 Requesting token from QuickBooks...")
-
         # ✅ FIXED (removed realm_id param)
-        token_response = auth_client.get_bearer_token(code)
-
-        print("📦 Raw token response object:")
-        print(token_response)
+        # get_bearer_token stores the tokens on the client instead of returning them
+        auth_client.get_bearer_token(code)
 
-        if not token_response:
+        if not auth_client.access_token:
             frappe.throw("Failed to retrieve token from QuickBooks. The response was empty.")
 
-        # Save tokens & realmId
-        settings.refresh_token = token_response.get("refresh_token")
-        settings.access_token = token_response.get("access_token")
+        # Save tokens, their expiry & realmId
+        save_tokens(settings, {
+            "access_token": auth_client.access_token,
+            "refresh_token": auth_client.refresh_token,
+            "expires_in": auth_client.expires_in
+        })
         settings.realm_id = realmId
         settings.save(ignore_permissions=True)
+        # Workers must not keep using a token shared before this reconnect
+        clear_published_token()
 
-        print("✅ QuickBooks token saved successfully:")
-        print("Access Token:", settings.access_token)
-        print("Refresh Token:", settings.refresh_token)
-        print("Realm ID:", settings.realm_id)
+        logger.info("✅ QuickBooks token saved for realm %s", settings.realm_id)
 
         # 🔹 Fetch Company Info
-        company_info_url = f"https://quickbooks.api.intuit.com/v3/company/{realmId}/companyinfo/{realmId}"
-        headers = {
-            "Authorization": f"Bearer {settings.access_token}",
-            "Accept": "application/json"
-        }
-
-        response = requests.get(company_info_url, headers=headers)
+        response = get_qbo_client(settings).get_company_info()
         company_info = response.json()
 
-        print("🏢 Company Info:")
-        print(json.dumps(company_info, indent=2))
-
         # Optionally store company name in settings
         if company_info.get("CompanyInfo"):
             settings.company_name = company_info["CompanyInfo"].get("CompanyName")
@@ -115,6 +97,5 @@ def oauth_callback(code=None, state=None, realmId=None):
         return f"QuickBooks connection successful ✅ Company: {company_info['CompanyInfo']['CompanyName']}"
 
     except Exception as e:
-        print("❌ Exception during token exchange or company info fetch:")
-        traceback.print_exc()
+        logger.exception("❌ Exception during token exchange or company info fetch")
         frappe.throw(f"QuickBooks authorization failed: {e}")
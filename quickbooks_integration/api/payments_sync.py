@@ -1,82 +1,84 @@
 import frappe
-import requests
 import json
-from frappe.utils import nowdate
+from frappe.utils import cint, nowdate
+from quickbooks_integration.api.batch_commit import BatchCommitter
+from quickbooks_integration.api.qbo_client import QuickBooksAPIError, get_qbo_client
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+from quickbooks_integration.api.resolvers import CustomerResolver
+from quickbooks_integration.api.sync_jobs import in_sync_job, track_progress
+from quickbooks_integration.api.sync_logger import RecordLogger, get_logger
+from quickbooks_integration.api.sync_state import Watermark, hold_watermark
+from quickbooks_integration.api.telemetry import record_counts
 
 @frappe.whitelist()
-def sync_quickbooks_payments():
+def sync_quickbooks_payments(full_sync=0):
     try:
         # Load QuickBooks Settings
-        settings = frappe.get_single("Quickbook Settings")
-        access_token = settings.access_token
-        realm_id = settings.realm_id
-        environment = settings.environment or "sandbox"
+        client = get_qbo_client()
 
-        if not access_token or not realm_id:
+        if not client.access_token or not client.realm_id:
             frappe.throw("Access Token or Realm ID missing. Please connect to QuickBooks.")
 
-        # Choose base URL
-        base_url = "https://sandbox-quickbooks.api.intuit.com" if environment == "sandbox" else "https://quickbooks.api.intuit.com"
-        endpoint = f"{base_url}/v3/company/{realm_id}/query"
-        
-        # Query for all Payments
-        query = "SELECT * FROM Payment"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/text"
-        }
-
-        print(f"📡 Sending request to: {endpoint} with Query: {query}")
-        response = requests.post(endpoint, headers=headers, data=query)
-
-        if response.status_code != 200:
-            print(f"❌ Failed to fetch payments: {response.text}")
-            return f"Failed to fetch payments: {response.text}"
-
-        payment_data = response.json()
-        payments = payment_data.get("QueryResponse", {}).get("Payment", [])
-        print("🔎 Raw Payment Response:")
-        print(json.dumps(payments, indent=4))
-
-        if not payments:
+        watermark = Watermark("Payment", full_sync=cint(full_sync))
+        payments = watermark.fetch(client)
+        result = import_quickbooks_payments(track_progress("Payment", watermark.track(payments)))
+
+        watermark.save()
+        if not watermark.seen:
             return "No payments found in QuickBooks."
 
-        synced_count = 0
-        company = frappe.defaults.get_global_default("company")
-        company_currency = frappe.get_cached_value("Company", company, "default_currency")
+        return result
+
+    except QuickBooksAPIError as e:
+        get_logger().error("❌ Failed to fetch payments: %s", e.response_text)
+        if in_sync_job():
+            raise
+        return f"Failed to fetch payments: {e.response_text}"
+
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "QuickBooks Payment Sync Error")
+        if in_sync_job():
+            raise
+        return f"🔥 Error occurred: {str(e)}"
 
-        for qb_payment in payments:
-            try:
+
+def import_quickbooks_payments(payments):
+    """Create and submit Payment Entries for an iterable of QuickBooks Payment records"""
+    synced_count = 0
+    company = frappe.defaults.get_global_default("company")
+    company_currency = frappe.get_cached_value("Company", company, "default_currency")
+    links = QuickBooksLinks()
+    customers = CustomerResolver(links)
+    committer = BatchCommitter()
+    logger = get_logger()
+    record_logger = RecordLogger("Payment")
+
+    for qb_payment in payments:
+        try:
+            with committer.record():
                 qb_payment_id = qb_payment.get("Id")
                 amount = qb_payment.get("TotalAmt", 0)
                 txn_date = qb_payment.get("TxnDate", nowdate())
                 customer_ref = qb_payment.get("CustomerRef", {}).get("value")
                 customer_name = qb_payment.get("CustomerRef", {}).get("name", "Unknown Customer")
 
-                print(f"\n➡️ Processing Payment: {qb_payment_id}, Amount: {amount}, CustomerRef: {customer_ref}, Name: {customer_name}")
 
                 # Skip invalid/zero payments
                 if not amount or float(amount) <= 0:
-                    print(f"⚠️ Skipping payment {qb_payment_id} because amount is {amount}")
+                    record_logger.debug("⚠️ Skipping payment %s because amount is %s", qb_payment_id, amount)
                     continue
 
                 # ✅ Find ERPNext customer using QuickBooks Customer Id
-                erp_customer = frappe.db.get_value(
-                    "Customer",
-                    {"custom_quickbooks_customer_id": customer_ref},  # custom field match
-                    "name"
-                )
+                erp_customer = customers.get_by_qbo_id(customer_ref)  # custom field match
 
                 if not erp_customer:
-                    print(f"❌ Could not find ERPNext Customer for QuickBooks ID {customer_ref} ({customer_name})")
+                    logger.warning("❌ Could not find ERPNext Customer for QuickBooks ID %s (%s)", customer_ref, customer_name)
+                    hold_watermark(qb_payment)
                     continue
 
-                print(f"✅ Found ERPNext Customer: {erp_customer} for QuickBooks ID {customer_ref}")
-
                 # ✅ Check if already synced
-                if frappe.db.exists("Payment Entry", {"qbo_payment_id": qb_payment_id}):
-                    print(f"⚠️ Payment {qb_payment_id} already synced. Skipping.")
+                if links.get("Payment", qb_payment_id):
+                    record_logger.debug("⚠️ Payment %s already synced. Skipping.", qb_payment_id)
                     continue
 
                 # Get default accounts
@@ -114,18 +116,17 @@ def sync_quickbooks_payments():
 
                 pe.save(ignore_permissions=True)
                 pe.submit()
+                links.set("Payment", qb_payment_id, "Payment Entry", pe.name, qb_payment.get("SyncToken"))
 
-                print(f"✅ Synced Payment Entry: {qb_payment_id} ({amount}) for {erp_customer}")
                 synced_count += 1
-                print(f"Total Synced Count: {synced_count}")
-                print("-" * 50)
+                record_logger.debug("✅ Synced Payment Entry: %s (%s) for %s", qb_payment_id, amount, erp_customer)
 
-            except Exception as pe_err:
-                frappe.log_error(frappe.get_traceback(), f"Payment Sync Failed: {qb_payment.get('Id')}")
-                print(f"❌ Error syncing payment {qb_payment.get('Id')}: {pe_err}")
+        except Exception as pe_err:
+            frappe.log_error(frappe.get_traceback(), f"Payment Sync Failed: {qb_payment.get('Id')}")
+            logger.warning("❌ Error syncing payment %s: %s", qb_payment.get("Id"), pe_err)
+            hold_watermark(qb_payment)
 
-        return f"✅ Synced {synced_count} Payment Entry records from QuickBooks."
+    committer.commit()
+    record_counts("Payment", created=synced_count)
 
-    except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "QuickBooks Payment Sync Error")
-        return f"🔥 Error occurred: {str(e)}"
+    return f"✅ Synced {synced_count} Payment Entry records from QuickBooks."
@@ -0,0 +1,278 @@
+import shutil
+import tempfile
+import time
+from contextlib import nullcontext
+
+import frappe
+import requests
+from requests.adapters import HTTPAdapter
+
+from quickbooks_integration.api.cassette import get_cassette_mode, get_cassette_session
+from quickbooks_integration.api.rate_limiter import MAX_RETRIES, RealmRateLimiter, get_retry_delay
+
+try:
+    import ijson
+except ImportError:  # fall back to decoding whole pages with response.json()
+    ijson = None
+
+from quickbooks_integration.api.sync_logger import get_payload_capture
+from quickbooks_integration.api.sync_state import parse_qbo_timestamp
+from quickbooks_integration.api.telemetry import get_telemetry
+from quickbooks_integration.api.token_manager import get_access_token, get_stored_token, is_token_expiring
+
+SANDBOX_BASE_URL = "https://sandbox-quickbooks.api.intuit.com"
+PRODUCTION_BASE_URL = "https://quickbooks.api.intuit.com"
+
+DEFAULT_CONNECT_TIMEOUT = 10  # seconds
+DEFAULT_READ_TIMEOUT = 120  # seconds
+POOL_MAXSIZE = 10  # QBO allows 10 concurrent requests per realm
+MAX_PAGE_SIZE = 1000  # QBO hard limit for MAXRESULTS
+MAX_BATCH_OPERATIONS = 30  # QBO hard limit for BatchItemRequest
+SPOOL_MAX_SIZE = 8 * 1024 * 1024  # bytes of a streamed page kept in memory before spilling to disk
+
+_session = None
+
+
+class QuickBooksAPIError(frappe.ValidationError):
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.response_text = response.text
+        super().__init__(f"QuickBooks API Error: {response.status_code}, {response.text}")
+
+
+def get_session():
+    """Return the process-wide pooled session shared by every QuickBooks call
+
+    With `quickbooks_cassette_mode` in site_config.json the session records to or replays from a cassette instead.
+    """
+    if get_cassette_mode():
+        return get_cassette_session()
+
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_MAXSIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive"
+        })
+        _session = session
+    return _session
+
+
+def get_base_url(environment):
+    """Map the Quickbook Settings environment to the QBO API host
+
+    `quickbooks_base_url` in site_config.json overrides it, e.g. to point at the benchmark stub server.
+    """
+    if frappe.conf.get("quickbooks_base_url"):
+        return frappe.conf.quickbooks_base_url.rstrip("/")
+    return SANDBOX_BASE_URL if (environment or "sandbox") == "sandbox" else PRODUCTION_BASE_URL
+
+
+def get_qbo_client(settings=None):
+    """Build a client for the realm configured in Quickbook Settings"""
+    return QuickBooksClient(settings or frappe.get_single("Quickbook Settings"))
+
+
+class QuickBooksClient:
+    """Thin wrapper over the pooled session that knows the realm, token and timeouts"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.access_token = settings.access_token
+        self.token_expires_at = settings.get("token_expires_at")
+        self.realm_id = settings.realm_id
+        self.environment = settings.environment or "sandbox"
+        self.base_url = get_base_url(self.environment)
+        self.timeout = (
+            settings.get("connect_timeout") or DEFAULT_CONNECT_TIMEOUT,
+            settings.get("read_timeout") or DEFAULT_READ_TIMEOUT
+        )
+        self.session = get_session()
+        # Replays never reach Intuit, so neither its token nor its rate limits apply
+        self.replaying = get_cassette_mode() == "replay"
+        self.limiter = RealmRateLimiter(self.realm_id)
+        self.payload_capture = get_payload_capture()
+
+    def company_url(self, path):
+        return f"{self.base_url}/v3/company/{self.realm_id}/{path.lstrip('/')}"
+
+    def renew_access_token(self, stale_token=None):
+        self.access_token = get_access_token(stale_token=stale_token)
+        self.token_expires_at = get_stored_token()[1]
+
+    def request(self, method, path, headers=None, **kwargs):
+        """Send a request for this realm and return the raw response
+
+        The token is refreshed ahead of its expiry, and once more if QuickBooks rejects it.
+        """
+        if self.access_token and not self.replaying and is_token_expiring(self.token_expires_at):
+            self.renew_access_token()
+
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.monotonic()
+        response = self._send(method, path, headers, **kwargs)
+        if response.status_code == 401 and self.access_token:
+            response.close()
+            if not self.replaying:  # a replay serves the recorded retry as is
+                self.renew_access_token(stale_token=self.access_token)
+            response = self._send(method, path, headers, **kwargs)
+
+        # Streamed bodies are captured and measured by their reader, which consumes them anyway
+        streamed = kwargs.get("stream")
+        if self.payload_capture and not streamed:
+            self.payload_capture.capture(method, path, response.status_code, response.content)
+
+        telemetry = get_telemetry()
+        if telemetry:
+            telemetry.record_api_call(time.monotonic() - started, None if streamed else len(response.content))
+        return response
+
+    def _send(self, method, path, headers=None, **kwargs):
+        """Send through the realm's rate limiter, backing off and retrying when QBO answers 429"""
+        request_headers = {"Authorization": f"Bearer {self.access_token}"}
+        request_headers.update(headers or {})
+        for attempt in range(MAX_RETRIES + 1):
+            with nullcontext() if self.replaying else self.limiter.acquire():
+                response = self.session.request(method, self.company_url(path), headers=request_headers, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RETRIES:
+                return response
+            response.close()
+            time.sleep(get_retry_delay(response, attempt))
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def query(self, query, **kwargs):
+        """Run a QBO SQL-like query against the /query endpoint"""
+        return self.post("query", data=query, headers={"Content-Type": "application/text"}, **kwargs)
+
+    def iter_query(self, entity, where=None, order_by=None, page_size=MAX_PAGE_SIZE, start_position=1):
+        """Yield every matching entity one at a time, paging with STARTPOSITION/MAXRESULTS
+
+        Only one page is held in memory, so memory stays flat regardless of realm size.
+        With ijson installed, not even the page is decoded at once: see iter_page_rows.
+        """
+        page_size = min(page_size, MAX_PAGE_SIZE)
+        query = f"SELECT * FROM {entity}"
+        if where:
+            query += f" WHERE {where}"
+        if order_by:
+            query += f" ORDERBY {order_by}"
+
+        while True:
+            response = self.query(f"{query} STARTPOSITION {start_position} MAXRESULTS {page_size}", stream=bool(ijson))
+            if response.status_code != 200:
+                raise QuickBooksAPIError(response)
+
+            rows = 0
+            for row in iter_page_rows(response, entity, self.payload_capture):
+                rows += 1
+                yield row
+
+            if rows < page_size:
+                break
+            start_position += page_size
+
+    def iter_updated_since(self, entity, since=None, inclusive=False, page_size=MAX_PAGE_SIZE):
+        """Yield records changed after (or, inclusive, at) a LastUpdatedTime, oldest first, paging with a keyset
+
+        A STARTPOSITION offset shifts when a record is edited during the run, since it
+        moves to the end of the ordering, and the record at the next page boundary is
+        never returned. Each page instead starts at the newest LastUpdatedTime already
+        returned, skipping the Ids yielded at that time. Only when a whole page shares
+        that time is an offset used, to step past it.
+        """
+        page_size = min(page_size, MAX_PAGE_SIZE)
+        boundary_ids = set()  # Ids already yielded at LastUpdatedTime since
+        start_position = 1
+
+        while True:
+            query = f"SELECT * FROM {entity}"
+            if since:
+                query += f" WHERE MetaData.LastUpdatedTime {'>=' if inclusive else '>'} '{since}'"
+            response = self.query(
+                f"{query} ORDERBY MetaData.LastUpdatedTime STARTPOSITION {start_position} MAXRESULTS {page_size}",
+                stream=bool(ijson)
+            )
+            if response.status_code != 200:
+                raise QuickBooksAPIError(response)
+
+            rows, newest, newest_ids = 0, since, set(boundary_ids)
+            for row in iter_page_rows(response, entity, self.payload_capture):
+                rows += 1
+                if row.get("Id") in boundary_ids:
+                    continue
+                updated = (row.get("MetaData") or {}).get("LastUpdatedTime")
+                if updated and (not newest or parse_qbo_timestamp(updated) > parse_qbo_timestamp(newest)):
+                    newest, newest_ids = updated, set()
+                if updated == newest:
+                    newest_ids.add(row.get("Id"))
+                yield row
+
+            if rows < page_size:
+                break
+            if newest == since:
+                # The whole page shares the boundary LastUpdatedTime, so only an offset gets past it
+                start_position += page_size
+            else:
+                since, inclusive, start_position = newest, True, 1
+            boundary_ids = newest_ids
+
+    def cdc(self, entities, changed_since):
+        """Fetch every entity of the given types changed or deleted since a timestamp in one call"""
+        response = self.get("cdc", params={"entities": ",".join(entities), "changedSince": changed_since})
+        if response.status_code != 200:
+            raise QuickBooksAPIError(response)
+        return response.json()
+
+    def batch(self, operations):
+        """Send up to 30 create/update/delete operations in one /batch call and return the BatchItemResponse list"""
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f"QuickBooks accepts at most {MAX_BATCH_OPERATIONS} operations per batch")
+        response = self.post("batch", json={"BatchItemRequest": operations})
+        if response.status_code != 200:
+            raise QuickBooksAPIError(response)
+        return response.json().get("BatchItemResponse", [])
+
+    def get_company_info(self):
+        return self.get(f"companyinfo/{self.realm_id}")
+
+
+def iter_page_rows(response, entity, payload_capture=None):
+    """Decode a /query page one entity at a time instead of building the whole response dict
+
+    The (decompressed) body is first spooled to memory or disk, so the connection is
+    released before the caller starts its slow per-record work; the raw JSON is several
+    times smaller than the dicts it decodes to, and only one entity is decoded at a time.
+    """
+    if ijson is None:
+        telemetry = get_telemetry()
+        if telemetry:
+            telemetry.record_bytes(len(response.content))
+        if payload_capture:
+            payload_capture.capture("POST", "query", response.status_code, response.content)
+        yield from response.json().get("QueryResponse", {}).get(entity, [])
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as body:
+        try:
+            response.raw.decode_content = True  # let urllib3 undo the gzip transfer encoding
+            shutil.copyfileobj(response.raw, body)
+        finally:
+            response.close()
+        telemetry = get_telemetry()
+        if telemetry:
+            telemetry.record_bytes(body.tell())
+        if payload_capture:
+            body.seek(0)
+            payload_capture.capture("POST", "query", response.status_code, body.read())
+        body.seek(0)
+        yield from ijson.items(body, f"QueryResponse.{entity}.item", use_float=True)
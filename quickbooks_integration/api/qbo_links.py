@@ -0,0 +1,180 @@
+import threading
+
+import frappe
+
+LINK_DOCTYPE = "QuickBooks Link"
+LINK_VERSION_CACHE_KEY = "quickbooks_link_version"
+LINK_FIELDS = ["qbo_id", "reference_doctype", "reference_name", "sync_token"]
+
+# Where the imports kept QBO Ids before the crosswalk: (doctype, id field, filters) per entity.
+# The id fields are still filled for reports; the backfill patch reads links from them.
+LEGACY_ID_FIELDS = {
+    "Account": [("Account", "quickbooks_id", {})],
+    "Customer": [("Customer", "custom_quickbooks_customer_id", {})],
+    "Vendor": [("Supplier", "custom_quickbooks_vendor_id", {})],
+    "Item": [("Item", "custom_quickbooks_item_id", {})],
+    "Invoice": [("Sales Invoice", "custom_quickbooks_invoice_id", {})],
+    "Bill": [
+        ("Journal Entry", "custom_quickbooks_je_id", {"user_remark": "bills of QBO"}),
+        ("Purchase Invoice", "custom_quickbooks_pi_id", {})
+    ],
+    "Payment": [("Payment Entry", "qbo_payment_id", {})],
+    "JournalEntry": [("Journal Entry", "custom_quickbooks_je_id", {"user_remark": ["like", "QBO Journal Entry %"]})]
+}
+
+# (site, realm, entity) → {qbo_id: (doctype, name, sync_token)}, shared by the threads of a worker
+_links = {}
+_link_version = {}
+_lock = threading.Lock()
+
+
+def get_link_name(realm_id, entity, qbo_id):
+    return f"{realm_id}:{entity}:{qbo_id}"
+
+
+def get_realm_id():
+    return frappe.db.get_single_value("Quickbook Settings", "realm_id")
+
+
+def get_link_version():
+    return frappe.cache().get_value(LINK_VERSION_CACHE_KEY) or 0
+
+
+def bump_link_version():
+    """Make every worker reload its links, after links were removed or repointed outside QuickBooksLinks.set"""
+    frappe.cache().set_value(LINK_VERSION_CACHE_KEY, frappe.generate_hash(length=10))
+
+
+class QuickBooksLinks:
+    """(realm, entity, QBO Id) → (doctype, name, SyncToken) crosswalk with a process-level cache
+
+    Each entity's links are loaded in a single query on first use and kept for the
+    life of the worker. A miss falls back to a primary key lookup, which picks up
+    links another worker added since; removals and renames invalidate the cache.
+    Misses are remembered for the life of the instance (one import run), so refs
+    that never had a link, like accounts mapped by name, cost one lookup per run.
+
+    Links written or looked up in the open transaction stay on the instance until
+    it commits, and only then reach the shared cache; a rollback drops them.
+    """
+
+    def __init__(self, realm_id=None):
+        self.realm_id = realm_id or get_realm_id()
+        self.misses = set()
+        self.pending = {}  # (entity, qbo_id) → link not yet committed
+        site = frappe.local.site
+        version = get_link_version()
+        with _lock:
+            if _link_version.get(site) != version:
+                for key in [key for key in _links if key[0] == site]:
+                    del _links[key]
+                _link_version[site] = version
+
+    def get_entity_links(self, entity):
+        key = (frappe.local.site, self.realm_id, entity)
+        links = _links.get(key)
+        if links is None:
+            rows = frappe.get_all(
+                LINK_DOCTYPE,
+                filters={"realm_id": self.realm_id, "entity": entity},
+                fields=LINK_FIELDS,
+                as_list=True
+            )
+            with _lock:
+                links = _links.setdefault(key, {row[0]: tuple(row[1:]) for row in rows})
+        return links
+
+    def get(self, entity, qbo_id):
+        """(doctype, name, sync_token) of the document a QBO record was imported as, or None"""
+        if not qbo_id:
+            return None
+        qbo_id = str(qbo_id)
+        link = self.get_cached(entity, qbo_id)
+        if link is None and (entity, qbo_id) not in self.misses:
+            link = frappe.db.get_value(LINK_DOCTYPE, get_link_name(self.realm_id, entity, qbo_id), LINK_FIELDS[1:])
+            if link:
+                link = tuple(link)
+                self.add_pending(entity, qbo_id, link)
+            else:
+                self.misses.add((entity, qbo_id))
+        return link
+
+    def get_cached(self, entity, qbo_id):
+        return self.pending.get((entity, qbo_id)) or self.get_entity_links(entity).get(qbo_id)
+
+    def add_pending(self, entity, qbo_id, link):
+        """Keep a link on the instance until the transaction commits, so a rollback cannot leave it in the cache"""
+        if not self.pending:
+            frappe.db.after_commit.add(self.publish_pending)
+            frappe.db.after_rollback.add(self.pending.clear)
+        self.pending[(entity, qbo_id)] = link
+
+    def publish_pending(self):
+        with _lock:
+            for (entity, qbo_id), link in self.pending.items():
+                links = _links.get((frappe.local.site, self.realm_id, entity))
+                if links is not None:
+                    links[qbo_id] = link
+        self.pending.clear()
+
+    def get_name(self, entity, qbo_id, doctype=None):
+        link = self.get(entity, qbo_id)
+        if link and (not doctype or link[0] == doctype):
+            return link[1]
+        return None
+
+    def is_unchanged(self, entity, record, doctype=None):
+        """Whether a QBO record is still at the SyncToken it was imported at, so its document needs no update"""
+        link = self.get(entity, record.get("Id"))
+        return bool(
+            link
+            and link[2] is not None
+            and str(link[2]) == str(record.get("SyncToken"))
+            and (not doctype or link[0] == doctype)
+        )
+
+    def set(self, entity, qbo_id, doctype, name, sync_token=None):
+        """Record the document a QBO record maps to, replacing any previous one
+
+        Call it after the document is saved: the link is not dropped when only a failed record's
+        savepoint is rolled back.
+        """
+        qbo_id = str(qbo_id)
+        self.misses.discard((entity, qbo_id))
+        current = self.get_cached(entity, qbo_id)
+        link_name = get_link_name(self.realm_id, entity, qbo_id)
+        values = {"reference_doctype": doctype, "reference_name": name, "sync_token": sync_token}
+
+        if current:
+            if current != (doctype, name, sync_token):
+                frappe.db.set_value(LINK_DOCTYPE, link_name, values, update_modified=False)
+        else:
+            link = frappe.get_doc({"doctype": LINK_DOCTYPE, "realm_id": self.realm_id, "entity": entity, "qbo_id": qbo_id, **values})
+            link.name = link_name
+            try:
+                link.db_insert()  # no hooks or validation: links are written once per imported record
+            except frappe.DuplicateEntryError:
+                frappe.db.set_value(LINK_DOCTYPE, link_name, values, update_modified=False)
+        self.add_pending(entity, qbo_id, (doctype, name, sync_token))
+
+    def remove(self, entity, qbo_id):
+        qbo_id = str(qbo_id)
+        frappe.db.delete(LINK_DOCTYPE, {"name": get_link_name(self.realm_id, entity, qbo_id)})
+        self.pending.pop((entity, qbo_id), None)
+        self.get_entity_links(entity).pop(qbo_id, None)
+        bump_link_version()
+
+
+def delete_document_links(doc, method=None, *args, **kwargs):
+    """on_trash of an imported document: drop the links pointing at it"""
+    if frappe.db.exists(LINK_DOCTYPE, {"reference_doctype": doc.doctype, "reference_name": doc.name}):
+        frappe.db.delete(LINK_DOCTYPE, {"reference_doctype": doc.doctype, "reference_name": doc.name})
+        bump_link_version()
+
+
+def rename_document_links(doc, method=None, old_name=None, new_name=None, merge=False):
+    """after_rename of an imported document: repoint its links at the new name"""
+    filters = {"reference_doctype": doc.doctype, "reference_name": old_name}
+    if frappe.db.exists(LINK_DOCTYPE, filters):
+        frappe.db.set_value(LINK_DOCTYPE, filters, "reference_name", new_name, update_modified=False)
+        bump_link_version()
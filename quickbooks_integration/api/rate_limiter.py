@@ -0,0 +1,107 @@
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+import frappe
+
+REQUESTS_PER_MINUTE = 500  # QBO throttle per realm
+MAX_CONCURRENT_REQUESTS = 10  # QBO concurrency limit per realm
+LEASE_TTL = 180  # seconds after which a slot held by a crashed worker is reclaimed
+POLL_INTERVAL = 0.05  # seconds between attempts to take a concurrency slot
+MAX_WAIT = 300  # seconds a request waits for the limiter before giving up
+MAX_RETRIES = 5  # attempts at a request QBO answers with 429
+BACKOFF_BASE = 1  # seconds
+BACKOFF_CAP = 60  # seconds
+
+# Refill the bucket for the elapsed time and take one token, or return the ms until one is available
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return wait
+"""
+
+# Take a concurrency slot unless `limit` unexpired leases are already held
+CONCURRENCY_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ttl)
+    return 1
+end
+return 0
+"""
+
+
+class RateLimitTimeout(frappe.ValidationError):
+    pass
+
+
+class RealmRateLimiter:
+    """Token bucket plus concurrency limit for one realm, shared by every worker through Redis"""
+
+    def __init__(self, realm_id, requests_per_minute=REQUESTS_PER_MINUTE, max_concurrent=MAX_CONCURRENT_REQUESTS):
+        self.cache = frappe.cache()
+        self.realm_id = realm_id
+        self.capacity = requests_per_minute
+        self.rate = requests_per_minute / 60
+        self.max_concurrent = max_concurrent
+        self.bucket_key = self.cache.make_key(f"quickbooks_rate_limit::{realm_id}")
+        self.slots_key = self.cache.make_key(f"quickbooks_concurrency::{realm_id}")
+
+    @contextmanager
+    def acquire(self):
+        """Wait for a request token and a concurrency slot, and hold the slot for the request"""
+        deadline = time.monotonic() + MAX_WAIT
+        self.take_token(deadline)
+        lease = self.take_slot(deadline)
+        try:
+            yield
+        finally:
+            self.cache.zrem(self.slots_key, lease)
+
+    def take_token(self, deadline):
+        while True:
+            wait = self.cache.eval(TOKEN_BUCKET_SCRIPT, 1, self.bucket_key, self.capacity, self.rate, time.time())
+            if not wait:
+                return
+            sleep_until(deadline, wait / 1000)
+
+    def take_slot(self, deadline):
+        lease = uuid.uuid4().hex
+        while not self.cache.eval(CONCURRENCY_SCRIPT, 1, self.slots_key, self.max_concurrent, time.time(), LEASE_TTL, lease):
+            sleep_until(deadline, POLL_INTERVAL)
+        return lease
+
+
+def sleep_until(deadline, seconds):
+    if time.monotonic() + seconds > deadline:
+        raise RateLimitTimeout(f"Timed out after {MAX_WAIT}s waiting for the QuickBooks rate limiter")
+    time.sleep(seconds)
+
+
+def get_retry_delay(response, attempt):
+    """Seconds to wait after a 429: Retry-After if QBO sent one, else capped exponential backoff with full jitter
+
+    Pass response=None for faults reported inside a successful response, e.g. throttled /batch operations.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return int(retry_after) + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
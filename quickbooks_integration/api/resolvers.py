@@ -0,0 +1,133 @@
+from functools import lru_cache
+
+import frappe
+
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+
+ITEM_PRELOAD_LIMIT = 100000  # above this, resolve items lazily instead of indexing them all
+ITEM_CACHE_SIZE = 10000
+ACCOUNT_MAP_CACHE_KEY = "quickbooks_account_map"
+
+
+class CustomerResolver:
+    """Answers QBO-id and name → Customer lookups from the QuickBooks Links and a map loaded in a single query"""
+
+    def __init__(self, links=None):
+        self.links = links or QuickBooksLinks()
+        self.by_customer_name = {}
+        self.payment_terms = {}
+
+        customers = frappe.get_all("Customer", fields=["name", "customer_name", "payment_terms"], order_by="creation asc")
+        for customer in customers:
+            self.add(customer.name, customer.customer_name, customer.payment_terms)
+
+    def add(self, name, customer_name=None, payment_terms=None):
+        """Register a Customer, e.g. one created during the current run"""
+        if customer_name:
+            self.by_customer_name.setdefault(customer_name, name)
+        self.payment_terms[name] = payment_terms
+
+    def get_by_qbo_id(self, qb_customer_id):
+        return self.links.get_name("Customer", qb_customer_id, doctype="Customer")
+
+    def get_by_name(self, customer_name):
+        """Match on customer_name first, then on the document name"""
+        if customer_name in self.by_customer_name:
+            return self.by_customer_name[customer_name]
+        if customer_name in self.payment_terms:
+            return customer_name
+        return None
+
+    def get_payment_terms(self, name):
+        return self.payment_terms.get(name)
+
+
+class ItemResolver:
+    """Resolves QBO ItemRefs to Item codes without per-line queries
+
+    QBO ids go through the QuickBooks Links. Catalogs up to `preload_limit` items are
+    indexed by code and name in one query; larger catalogs are looked up lazily
+    through a bounded LRU cache instead.
+    """
+
+    def __init__(self, links=None, preload_limit=ITEM_PRELOAD_LIMIT, cache_size=ITEM_CACHE_SIZE):
+        self.links = links or QuickBooksLinks()
+        self.by_item_code = {}
+        self.by_item_name = {}
+        self.preloaded = frappe.db.count("Item") <= preload_limit
+
+        if self.preloaded:
+            for item in frappe.get_all("Item", fields=["name", "item_name"], order_by="creation asc"):
+                self.add(item.name, item.item_name)
+        else:
+            self._lookup = lru_cache(maxsize=cache_size)(self._query)
+
+    def add(self, item_code, item_name=None):
+        """Register an Item, e.g. one created during the current run"""
+        self.by_item_code[item_code] = item_code
+        if item_name:
+            self.by_item_name.setdefault(item_name, item_code)
+
+    def _query(self, fieldname, value):
+        return frappe.db.get_value("Item", {fieldname: value}, "name")
+
+    def _get(self, index, fieldname, value):
+        if not value:
+            return None
+        if value in index or self.preloaded:
+            return index.get(value)
+        return self._lookup(fieldname, value)
+
+    def get_by_qbo_id(self, qb_item_id):
+        return self.links.get_name("Item", qb_item_id, doctype="Item")
+
+    def get_by_item_code(self, item_code):
+        return self._get(self.by_item_code, "item_code", item_code)
+
+    def get_by_item_name(self, item_name):
+        return self._get(self.by_item_name, "item_name", item_name)
+
+    def resolve(self, item_ref, match_item_code=True):
+        """Map an ItemRef ({"value": id, "name": name}) to an Item code"""
+        item_ref = item_ref or {}
+        name = item_ref.get("name")
+        return (
+            self.get_by_qbo_id(item_ref.get("value"))
+            or (match_item_code and self.get_by_item_code(name))
+            or self.get_by_item_name(name)
+        )
+
+
+class AccountResolver:
+    """Resolves QBO AccountRefs to Accounts: by QBO id through the links, then by custom_qbc_child_account_name"""
+
+    def __init__(self, company, links=None):
+        self.links = links or QuickBooksLinks()
+        self.account_map = get_account_map(company)
+
+    def resolve(self, account_ref):
+        account_ref = account_ref or {}
+        return self.links.get_name("Account", account_ref.get("value"), doctype="Account") or self.account_map.get(account_ref.get("name"))
+
+
+def get_account_map(company):
+    """custom_qbc_child_account_name → Account for a company, cached in Redis until an Account changes"""
+    return frappe.cache().hget(ACCOUNT_MAP_CACHE_KEY, company, generator=lambda: build_account_map(company))
+
+
+def build_account_map(company):
+    accounts = frappe.get_all(
+        "Account",
+        filters={"company": company, "custom_qbc_child_account_name": ["is", "set"]},
+        fields=["name", "custom_qbc_child_account_name"],
+        order_by="creation asc"
+    )
+    account_map = {}
+    for account in accounts:
+        account_map.setdefault(account.custom_qbc_child_account_name, account.name)
+    return account_map
+
+
+def clear_account_map_cache(doc, method=None, *args, **kwargs):
+    """Account doc event: drop the cached map of the account's company"""
+    frappe.cache().hdel(ACCOUNT_MAP_CACHE_KEY, doc.company)
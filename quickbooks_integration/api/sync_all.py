@@ -1,121 +1,134 @@
-# import frappe
-# from .oauth import get_auth_client
-# from quickbooks import Quickbook
-# from quickbooks.objects.customer import Customer
-# from quickbooks.objects.vendor import Vendor
-# from quickbooks.objects.item import Item
-# from quickbooks.objects.account import Account
-# from quickbooks.objects.invoice import Invoice
-# from quickbooks.objects.bill import Bill
-# from quickbooks.objects.journalentry import JournalEntry
-# from quickbooks.objects.payment import Payment
-# from quickbooks.objects.employee import Employee
-
-# def get_qb():
-#     settings = frappe.get_single("Quickbook Settings")
-#     auth_client = get_auth_client()
-#     auth_client.refresh_token = settings.refresh_token
-#     return Quickbook(
-#         auth_client=auth_client,
-#         refresh_token=settings.refresh_token,
-#         company_id=settings.realm_id
-#     )
-
-# @frappe.whitelist()
-# def sync_all():
-#     qb = get_qb()
-#     sync_customers(qb)
-#     sync_vendors(qb)
-#     sync_items(qb)
-#     sync_accounts(qb)
-#     sync_invoices(qb)
-#     sync_bills(qb)
-#     sync_payments(qb)
-#     sync_journal_entries(qb)
-#     sync_employees(qb)
-#     frappe.msgprint("Quickbook Data Synced Successfully")
-
-# def sync_customers(qb):
-#     for cust in Customer.all(qb=qb):
-#         if not frappe.db.exists("Customer", {"customer_name": cust.DisplayName}):
-#             frappe.get_doc({"doctype": "Customer", "customer_name": cust.DisplayName}).insert()
-
-# def sync_vendors(qb):
-#     for vend in Vendor.all(qb=qb):
-#         if not frappe.db.exists("Supplier", {"supplier_name": vend.DisplayName}):
-#             frappe.get_doc({"doctype": "Supplier", "supplier_name": vend.DisplayName}).insert()
-
-# def sync_items(qb):
-#     for item in Item.all(qb=qb):
-#         if not frappe.db.exists("Item", {"item_code": item.Name}):
-#             frappe.get_doc({"doctype": "Item", "item_code": item.Name, "item_name": item.Name, "stock_uom": "Nos"}).insert()
-
-# def sync_accounts(qb):
-#     for acc in Account.all(qb=qb):
-#         if not frappe.db.exists("Account", {"account_name": acc.Name}):
-#             frappe.get_doc({"doctype": "Account", "account_name": acc.Name, "root_type": "Asset", "report_type": "Balance Sheet"}).insert()
-
-# def sync_invoices(qb):
-#     for inv in Invoice.all(qb=qb):
-#         if not frappe.db.exists("Sales Invoice", {"quickbooks_invoice_id": inv.Id}):
-#             doc = frappe.new_doc("Sales Invoice")
-#             doc.customer = inv.CustomerRef.name or "Default Customer"
-#             doc.posting_date = inv.TxnDate
-#             doc.quickbooks_invoice_id = inv.Id
-#             for line in inv.Line:
-#                 doc.append("items", {
-#                     "item_code": line.SalesItemLineDetail.ItemRef.name,
-#                     "qty": line.SalesItemLineDetail.Qty,
-#                     "rate": line.Amount
-#                 })
-#             doc.insert()
-#             doc.submit()
-
-# def sync_bills(qb):
-#     for bill in Bill.all(qb=qb):
-#         if not frappe.db.exists("Purchase Invoice", {"quickbooks_bill_id": bill.Id}):
-#             doc = frappe.new_doc("Purchase Invoice")
-#             doc.supplier = bill.VendorRef.name
-#             doc.posting_date = bill.TxnDate
-#             doc.quickbooks_bill_id = bill.Id
-#             for line in bill.Line:
-#                 doc.append("items", {
-#                     "item_code": line.AccountBasedExpenseLineDetail.AccountRef.name,
-#                     "qty": 1,
-#                     "rate": line.Amount
-#                 })
-#             doc.insert()
-#             doc.submit()
-
-# def sync_payments(qb):
-#     for pay in Payment.all(qb=qb):
-#         if not frappe.db.exists("Payment Entry", {"quickbooks_payment_id": pay.Id}):
-#             doc = frappe.new_doc("Payment Entry")
-#             doc.payment_type = "Receive"
-#             doc.party_type = "Customer"
-#             doc.party = pay.CustomerRef.name
-#             doc.posting_date = pay.TxnDate
-#             doc.paid_amount = pay.TotalAmt
-#             doc.quickbooks_payment_id = pay.Id
-#             doc.insert()
-#             doc.submit()
-
-# def sync_journal_entries(qb):
-#     for je in JournalEntry.all(qb=qb):
-#         if not frappe.db.exists("Journal Entry", {"quickbooks_journal_id": je.Id}):
-#             doc = frappe.new_doc("Journal Entry")
-#             doc.posting_date = je.TxnDate
-#             doc.quickbooks_journal_id = je.Id
-#             for line in je.Line:
-#                 doc.append("accounts", {
-#                     "account": line.JournalEntryLineDetail.AccountRef.name,
-#                     "debit_in_account_currency": line.DebitAmt or 0,
-#                     "credit_in_account_currency": line.CreditAmt or 0
-#                 })
-#             doc.insert()
-#             doc.submit()
-
-# def sync_employees(qb):
-#     for emp in Employee.all(qb=qb):
-#         if not frappe.db.exists("Employee", {"employee_name": emp.DisplayName}):
-#             frappe.get_doc({"doctype": "Employee", "employee_name": emp.DisplayName}).insert()
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import frappe
+
+from quickbooks_integration.api.sync_jobs import SYNC_METHODS, get_sync_progress, in_sync_job
+from quickbooks_integration.api.sync_logger import end_run, get_run_id
+from quickbooks_integration.api.telemetry import finish_sync_run, start_sync_run
+
+# Each stage lists the stages whose records it links to; a stage starts as soon as these finish
+SYNC_STAGES = {
+    "accounts": [],
+    "customers": ["accounts"],
+    "vendors": ["accounts"],
+    "items": ["accounts"],
+    "invoices": ["customers", "items"],
+    "bills": ["vendors", "items"],
+    "payments": ["invoices"],
+    "journal_entries": ["accounts"]
+}
+MAX_PARALLEL_STAGES = 4  # QBO allows 10 concurrent requests per realm, shared with webhooks
+
+
+def sync_all(full_sync=0):
+    """Run every entity sync in dependency order, with independent stages in parallel threads
+
+    Run it through sync_jobs.enqueue_sync("all"); a full refresh is far too long for a web request.
+    """
+    site = frappe.local.site
+    sites_path = frappe.local.sites_path
+    progress = get_sync_progress()
+    run_id = get_run_id()
+    started = time.monotonic()
+    if progress:
+        progress.steps_total = len(SYNC_STAGES)
+
+    stages, succeeded, failed, skipped = {}, set(), set(), set()
+    pending = dict(SYNC_STAGES)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_STAGES, thread_name_prefix="quickbooks_sync") as executor:
+        while pending or running:
+            for stage, depends_on in list(pending.items()):
+                if any(d in failed or d in skipped for d in depends_on):
+                    skipped.add(stage)
+                    stages[stage] = {"status": "Skipped", "depends_on": depends_on}
+                    del pending[stage]
+                elif all(d in succeeded for d in depends_on):
+                    future = executor.submit(run_stage, site, sites_path, stage, full_sync, started, run_id)
+                    running[future] = stage
+                    del pending[stage]
+
+            if not running:
+                continue
+
+            if progress:
+                progress.steps_done = len(stages)
+                progress.set_phase("Running " + ", ".join(sorted(running.values())))
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                stages[stage] = future.result()
+                (succeeded if stages[stage]["status"] == "Completed" else failed).add(stage)
+
+    if failed and in_sync_job():
+        # Each stage keeps its own Sync Run; the job itself has to end as Failed
+        frappe.throw(f"QuickBooks sync failed at {', '.join(sorted(failed))}; skipped {', '.join(sorted(skipped)) or 'none'}.")
+
+    critical_path, critical_path_duration = get_critical_path(stages)
+    return {
+        "elapsed": round(time.monotonic() - started, 2),
+        "critical_path": critical_path,
+        "critical_path_duration": critical_path_duration,
+        "stages": {stage: stages[stage] for stage in SYNC_STAGES}
+    }
+
+
+def run_stage(site, sites_path, stage, full_sync, started, run_id):
+    """Thread entry point: run one sync on its own site connection and time it"""
+    stage_started = time.monotonic()
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.flags.quickbooks_run_id = f"{run_id}-{stage}"
+    frappe.flags.quickbooks_sync_job = True  # so a failed stage raises and its dependents are skipped
+    start_sync_run(frappe.flags.quickbooks_run_id, stage, full_sync)
+    try:
+        result = frappe.get_attr(SYNC_METHODS[stage])(full_sync=full_sync)
+        frappe.db.commit()
+        status = "Completed"
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), f"QuickBooks Sync All: {stage} failed")
+        frappe.db.commit()
+        result, status = str(e), "Failed"
+
+    try:
+        finish_sync_run(status, result)
+    finally:
+        end_run()
+        frappe.destroy()
+
+    finished = time.monotonic()
+    return {
+        "status": status,
+        "depends_on": SYNC_STAGES[stage],
+        "started": round(stage_started - started, 2),
+        "finished": round(finished - started, 2),
+        "duration": round(finished - stage_started, 2),
+        "result": result
+    }
+
+
+def get_critical_path(stages):
+    """Longest chain of stage durations through the DAG, which bounds the whole run"""
+    path_duration, previous = {}, {}
+    for stage, depends_on in SYNC_STAGES.items():  # SYNC_STAGES is listed in topological order
+        duration = stages.get(stage, {}).get("duration")
+        if duration is None:
+            continue
+        before = max((d for d in depends_on if d in path_duration), key=path_duration.get, default=None)
+        previous[stage] = before
+        path_duration[stage] = duration + (path_duration[before] if before else 0)
+
+    if not path_duration:
+        return [], 0
+
+    stage = max(path_duration, key=path_duration.get)
+    total = path_duration[stage]
+    path = []
+    while stage:
+        path.append(stage)
+        stage = previous[stage]
+    return path[::-1], round(total, 2)
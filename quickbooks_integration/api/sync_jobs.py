@@ -0,0 +1,209 @@
+import inspect
+import time
+
+import frappe
+from frappe.utils import now_datetime
+
+from quickbooks_integration.api.sync_logger import end_run, get_logger, get_run_id
+from quickbooks_integration.api.telemetry import finish_sync_run, get_telemetry, start_sync_run
+
+SYNC_METHODS = {
+    "accounts": "quickbooks_integration.api.account_sync.sync_quickbooks_chart_of_accounts",
+    "customers": "quickbooks_integration.api.customer_sync.sync_quickbooks_customers",
+    "vendors": "quickbooks_integration.api.vendor_sync.sync_quickbooks_vendors",
+    "items": "quickbooks_integration.api.item_sync.sync_quickbooks_items",
+    "invoices": "quickbooks_integration.api.invoice_sync.sync_quickbooks_invoices",
+    "bills": "quickbooks_integration.api.bill_sync.sync_quickbooks_bills",
+    "payments": "quickbooks_integration.api.payments_sync.sync_quickbooks_payments",
+    "journal_entries": "quickbooks_integration.api.journal_entries_sync.sync_quickbooks_journal_entries",
+    "employees": "quickbooks_integration.api.employee_sync.sync_quickbooks_employees",
+    "changes": "quickbooks_integration.api.cdc_sync.sync_quickbooks_changes",
+    "all": "quickbooks_integration.api.sync_all.sync_all"
+}
+
+SYNC_JOB_TIMEOUT = 4 * 60 * 60  # seconds; full backfills of large realms run for hours
+STATUS_EXPIRY = 24 * 60 * 60  # seconds to keep a finished job's status around
+STATUS_FLUSH_INTERVAL = 1  # seconds between progress writes to Redis
+PUBLISH_INTERVAL = 0.5  # seconds between realtime progress events, so a burst of phase changes stays cheap
+PROGRESS_EVENT = "quickbooks_sync_progress"
+
+
+def get_job_id(sync):
+    # One job per sync type, so a second click while it runs does not start a duplicate
+    return f"quickbooks_sync::{sync}"
+
+
+def get_status_key(job_id):
+    return f"quickbooks_sync_status::{job_id}"
+
+
+@frappe.whitelist()
+def enqueue_sync(sync, full_sync=0):
+    """Queue a sync on the long worker queue and return its job id immediately"""
+    frappe.only_for("System Manager")
+    if sync not in SYNC_METHODS:
+        frappe.throw(f"Unknown QuickBooks sync: {sync}")
+
+    job_id = get_job_id(sync)
+    job = frappe.enqueue(
+        "quickbooks_integration.api.sync_jobs.run_sync",
+        queue="long",
+        timeout=SYNC_JOB_TIMEOUT,
+        job_id=job_id,
+        deduplicate=True,
+        sync=sync,
+        full_sync=full_sync
+    )
+    if job:
+        SyncProgress(job_id, sync).save(phase="Queued", status="Queued")
+
+    return job_id
+
+
+@frappe.whitelist()
+def get_sync_status(job_id):
+    """Return phase, rows processed and throughput of a queued or running sync"""
+    frappe.only_for("System Manager")
+    return frappe.cache().get_value(get_status_key(job_id))
+
+
+def run_sync(sync, full_sync=0):
+    """Worker entry point: run a sync_* function with progress tracking enabled"""
+    progress = SyncProgress(get_job_id(sync), sync, get_run_id())
+    frappe.flags.quickbooks_sync_progress = progress
+    frappe.flags.quickbooks_sync_job = True
+    progress.save(phase="Starting", status="Running")
+    get_logger().info("[%s] Starting QuickBooks sync %s (full_sync=%s)", get_run_id(), sync, full_sync)
+    start_sync_run(get_run_id(), sync, full_sync)
+    try:
+        method = frappe.get_attr(SYNC_METHODS[sync])
+        kwargs = {"full_sync": full_sync} if "full_sync" in inspect.signature(method).parameters else {}
+        result = method(**kwargs)
+        progress.save(phase="Completed", status="Completed", result=result)
+        finish_sync_run("Completed", result)
+        return result
+    except Exception as e:
+        progress.save(phase="Failed", status="Failed", result=str(e))
+        frappe.db.rollback()
+        finish_sync_run("Failed", str(e))
+        raise
+    finally:
+        frappe.flags.quickbooks_sync_progress = None
+        frappe.flags.quickbooks_sync_job = False
+        end_run()
+
+
+def in_sync_job():
+    """Whether a sync runs under the job runner, which needs failures raised instead of returned as a message"""
+    return bool(frappe.flags.quickbooks_sync_job)
+
+
+def get_sync_progress():
+    """Progress tracker of the sync running in this job, if any"""
+    return frappe.flags.quickbooks_sync_progress
+
+
+def track_progress(entity, records):
+    """Count records as the import loop consumes them and report them to the job status
+
+    With run telemetry on, time spent waiting for the next record (fetch) is told
+    apart from time the import loop spends on each record (map and write).
+    """
+    progress = get_sync_progress()
+    telemetry = get_telemetry()
+    if not progress and not telemetry:
+        yield from records
+        return
+
+    if progress:
+        progress.set_phase(f"Importing {entity}")
+    if telemetry:
+        telemetry.set_entity(entity)
+
+    records = iter(records)
+    while True:
+        fetch_started = time.monotonic()
+        record = next(records, None)
+        if record is None:
+            break
+        row_started = time.monotonic()
+        if telemetry:
+            telemetry.record_fetch(row_started - fetch_started)
+
+        yield record
+
+        if telemetry:
+            telemetry.record_row(time.monotonic() - row_started)
+        if progress:
+            progress.update()
+
+    if telemetry:
+        telemetry.mark_db_queries()
+    if progress:
+        progress.flush()
+
+
+class SyncProgress:
+    """Rows processed and throughput of one sync job
+
+    Written to Redis for the status API and streamed to open Quickbook Settings forms
+    over socket.io. Syncs made of steps (sync_all) set steps_total so a percentage can be shown.
+    """
+
+    def __init__(self, job_id, sync, run_id=None):
+        self.job_id = job_id
+        self.sync = sync
+        self.run_id = run_id
+        self.phase = None
+        self.status = None
+        self.rows_processed = 0
+        self.steps_done = 0
+        self.steps_total = None
+        self.started = time.monotonic()
+        self.started_at = now_datetime()
+        self.last_flush = 0
+        self.last_publish = 0
+
+    def set_phase(self, phase):
+        self.phase = phase
+        self.flush()
+
+    def update(self, rows=1):
+        self.rows_processed += rows
+        if time.monotonic() - self.last_flush >= STATUS_FLUSH_INTERVAL:
+            self.flush()
+
+    def save(self, phase=None, status=None, result=None):
+        self.phase = phase or self.phase
+        self.status = status or self.status
+        self.flush(result=result)
+
+    def flush(self, result=None):
+        self.last_flush = time.monotonic()
+        elapsed = self.last_flush - self.started
+        status = {
+            "job_id": self.job_id,
+            "sync": self.sync,
+            "status": self.status,
+            "phase": self.phase,
+            "rows_processed": self.rows_processed,
+            "rows_per_sec": round(self.rows_processed / elapsed, 2) if elapsed else 0,
+            "elapsed": round(elapsed, 2),
+            "started_at": str(self.started_at),
+            "sync_run": self.run_id
+        }
+        if self.steps_total:
+            status["percent"] = round(100 * self.steps_done / self.steps_total, 1)
+        if result is not None:
+            status["result"] = result
+        frappe.cache().set_value(get_status_key(self.job_id), status, expires_in_sec=STATUS_EXPIRY)
+        self.publish(status)
+
+    def publish(self, status):
+        finished = self.status in ("Completed", "Failed")
+        if not finished and self.last_flush - self.last_publish < PUBLISH_INTERVAL:
+            return
+        self.last_publish = self.last_flush
+        # The result stays in Redis and on the Sync Run; the event only carries the counters
+        event = {key: value for key, value in status.items() if key != "result"}
+        frappe.publish_realtime(PROGRESS_EVENT, event, doctype="Quickbook Settings", docname="Quickbook Settings")
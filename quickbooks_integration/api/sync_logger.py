@@ -0,0 +1,110 @@
+import gzip
+import logging
+import os
+import shutil
+from logging.handlers import RotatingFileHandler
+
+import frappe
+from frappe.utils import cint
+
+LOGGER_NAME = "quickbooks_integration"
+DEFAULT_SAMPLE_EVERY = 100  # records between sampled per-record log lines
+PAYLOAD_MAX_BYTES = 50 * 1024 * 1024  # uncompressed size of a capture file before it is rotated
+PAYLOAD_BACKUP_COUNT = 20  # rotated capture files kept per run
+
+
+def get_logger():
+    """App logger writing to logs/quickbooks_integration.log at the level set in Quickbook Settings"""
+    logger = frappe.logger(LOGGER_NAME, allow_site=True)
+    logger.setLevel(frappe.db.get_single_value("Quickbook Settings", "log_level") or "INFO")
+    return logger
+
+
+def get_run_id():
+    """Id shared by every log line and payload captured during one sync run"""
+    if not frappe.flags.quickbooks_run_id:
+        frappe.flags.quickbooks_run_id = frappe.generate_hash(length=10)
+    return frappe.flags.quickbooks_run_id
+
+
+class RecordLogger:
+    """Per-record DEBUG logging for one entity, sampled to every Nth record
+
+    Arguments are %-formatted by logging only for lines that are actually emitted,
+    so with DEBUG off the per-record cost is a counter increment.
+    """
+
+    def __init__(self, entity, sample_every=None):
+        self.logger = get_logger()
+        self.entity = entity
+        self.sample_every = cint(sample_every) or cint(
+            frappe.db.get_single_value("Quickbook Settings", "log_sample_every")
+        ) or DEFAULT_SAMPLE_EVERY
+        self.enabled = self.logger.isEnabledFor(logging.DEBUG)
+        self.count = 0
+
+    def debug(self, msg, *args):
+        self.count += 1
+        if self.enabled and self.count % self.sample_every == 1 % self.sample_every:
+            self.logger.debug(f"[{get_run_id()}] {self.entity} #%s: {msg}", self.count, *args)
+
+
+def get_payload_capture():
+    """Payload capture for the current run, or None unless enabled in Quickbook Settings"""
+    if not cint(frappe.db.get_single_value("Quickbook Settings", "capture_payloads")):
+        return None
+    if not frappe.flags.quickbooks_payload_capture:
+        frappe.flags.quickbooks_payload_capture = PayloadCapture(get_run_id())
+    return frappe.flags.quickbooks_payload_capture
+
+
+def end_run():
+    """Compress the run's last capture file and forget its run id"""
+    if frappe.flags.quickbooks_payload_capture:
+        frappe.flags.quickbooks_payload_capture.close()
+    frappe.flags.quickbooks_payload_capture = None
+    frappe.flags.quickbooks_run_id = None
+
+
+class PayloadCapture:
+    """Writes raw QBO response bodies to gzip-rotated files under logs/quickbooks_payloads/<run id>.log"""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.logger = logging.getLogger(f"{LOGGER_NAME}.payloads.{run_id}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            self.logger.addHandler(get_payload_handler(run_id))
+
+    def capture(self, method, path, status_code, body):
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        self.logger.info("%s %s %s\n%s", method, path, status_code, body)
+
+    def close(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+            if os.path.exists(handler.baseFilename):
+                gzip_rotator(handler.baseFilename, handler.baseFilename + ".gz")
+
+
+def get_payload_handler(run_id):
+    directory = os.path.join(frappe.utils.get_bench_path(), "logs", "quickbooks_payloads")
+    os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(
+        os.path.join(directory, f"{run_id}.log"),
+        maxBytes=PAYLOAD_MAX_BYTES,
+        backupCount=PAYLOAD_BACKUP_COUNT
+    )
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = gzip_rotator
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    return handler
+
+
+def gzip_rotator(source, dest):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
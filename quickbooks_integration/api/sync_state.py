@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.utils import now_datetime
+
+SYNC_STATE_DOCTYPE = "QuickBooks Sync State"
+
+
+def get_watermark(entity):
+    """Return the stored MetaData.LastUpdatedTime high-water mark for an entity"""
+    return frappe.db.get_value(SYNC_STATE_DOCTYPE, entity, "last_updated_time")
+
+
+def set_watermark(entity, last_updated_time, records_synced=0, clear_checkpoint=True):
+    """Persist the high-water mark reached by a successful sync run, discarding its checkpoint"""
+    values = {
+        "last_updated_time": last_updated_time,
+        "last_synced_on": now_datetime(),
+        "records_synced": records_synced
+    }
+    if clear_checkpoint:
+        values.update({"checkpoint_updated_time": None, "checkpoint_records": 0, "checkpoint_saved_on": None})
+    save_sync_state(entity, values)
+
+
+def get_checkpoint(entity):
+    """LastUpdatedTime and record count an unfinished run had committed up to, if any"""
+    return frappe.db.get_value(
+        SYNC_STATE_DOCTYPE, entity, ["checkpoint_updated_time", "checkpoint_records"], as_dict=True
+    )
+
+
+def set_checkpoint(entity, last_updated_time, records):
+    save_sync_state(entity, {
+        "checkpoint_updated_time": last_updated_time,
+        "checkpoint_records": records,
+        "checkpoint_saved_on": now_datetime()
+    })
+
+
+def save_checkpoint():
+    """Persist the cursor of the run being imported in this job; BatchCommitter calls it before each commit"""
+    watermark = frappe.flags.quickbooks_watermark
+    if watermark:
+        watermark.checkpoint()
+
+
+def hold_watermark(record):
+    """Called by the imports for a record they skipped or rolled back, so the next run fetches it again"""
+    watermark = frappe.flags.quickbooks_watermark
+    if watermark:
+        watermark.hold(record)
+
+
+def save_sync_state(entity, values):
+    if frappe.db.exists(SYNC_STATE_DOCTYPE, entity):
+        frappe.db.set_value(SYNC_STATE_DOCTYPE, entity, values)
+    else:
+        frappe.get_doc({"doctype": SYNC_STATE_DOCTYPE, "entity": entity, **values}).insert(ignore_permissions=True)
+
+
+def parse_qbo_timestamp(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def get_time_before(value):
+    """A watermark just below a LastUpdatedTime, so the next `>` query includes records at that time
+
+    QBO timestamps have whole-second precision.
+    """
+    return (parse_qbo_timestamp(value) - timedelta(seconds=1)).isoformat(timespec="seconds")
+
+
+class Watermark:
+    """Tracks the newest LastUpdatedTime seen while iterating one entity
+
+    Records are fetched in LastUpdatedTime order, so everything older than the newest
+    committed record is done. That time is checkpointed with every committed batch;
+    a run started while a checkpoint exists (a retried or restarted job) resumes from
+    it, re-reading only the records that share its timestamp.
+
+    Records the import skipped for a missing dependency or rolled back are held:
+    neither the watermark nor the checkpoint moves past the oldest of them, so the
+    next run fetches them again. A full sync resumes from a checkpoint too, since a
+    retried job repeats its arguments; the checkpoint is only cleared by a finished run.
+    """
+
+    def __init__(self, entity, full_sync=False):
+        self.entity = entity
+        self.since = None if full_sync else get_watermark(entity)
+        checkpoint = get_checkpoint(entity) or {}
+        self.resume_from = checkpoint.get("checkpoint_updated_time")
+        self.resumed_records = (checkpoint.get("checkpoint_records") or 0) if self.resume_from else 0
+        self.latest = self.resume_from or self.since
+        self.held_from = None
+        self.seen = 0
+        self.checkpointing = False
+
+    def fetch(self, client):
+        """Records changed since the last run, or not yet committed by an unfinished one, oldest first"""
+        if self.resume_from:
+            return client.iter_updated_since(self.entity, self.resume_from, inclusive=True)
+        return client.iter_updated_since(self.entity, self.since)
+
+    def observe(self, record):
+        self.seen += 1
+        updated = (record.get("MetaData") or {}).get("LastUpdatedTime")
+        if updated and (not self.latest or parse_qbo_timestamp(updated) > parse_qbo_timestamp(self.latest)):
+            self.latest = updated
+
+    def hold(self, record):
+        updated = (record.get("MetaData") or {}).get("LastUpdatedTime")
+        if updated and (not self.held_from or parse_qbo_timestamp(updated) < parse_qbo_timestamp(self.held_from)):
+            self.held_from = updated
+
+    @property
+    def safe_point(self):
+        """Newest LastUpdatedTime everything up to which was imported, for a `>=` resume"""
+        if self.held_from and (not self.latest or parse_qbo_timestamp(self.held_from) < parse_qbo_timestamp(self.latest)):
+            return self.held_from
+        return self.latest
+
+    def track(self, records, checkpoint=True):
+        """Observe each record as it streams past on its way to the mapping code
+
+        Pass checkpoint=False for records not in LastUpdatedTime order, e.g. a CDC change list.
+        """
+        self.checkpointing = self.checkpointing or checkpoint
+        frappe.flags.quickbooks_watermark = self
+        try:
+            for record in records:
+                self.observe(record)
+                yield record
+        finally:
+            if frappe.flags.quickbooks_watermark is self:
+                frappe.flags.quickbooks_watermark = None
+
+    def checkpoint(self):
+        if self.checkpointing and self.latest and self.seen:
+            set_checkpoint(self.entity, self.safe_point, self.resumed_records + self.seen)
+
+    @property
+    def last_updated_time(self):
+        """Watermark to store: the newest record seen, or just below the oldest held one"""
+        if self.held_from and self.safe_point == self.held_from:
+            return get_time_before(self.held_from)
+        return self.latest
+
+    def save(self):
+        # Only a run that walked the records in order has finished what a checkpoint left over
+        if self.latest:
+            set_watermark(self.entity, self.last_updated_time, self.resumed_records + self.seen, clear_checkpoint=self.checkpointing)
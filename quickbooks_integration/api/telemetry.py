@@ -0,0 +1,192 @@
+import time
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+SYNC_RUN_DOCTYPE = "QuickBooks Sync Run"
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)  # upper bounds in ms; the rest fall in "inf"
+
+
+def get_telemetry():
+    """Telemetry of the sync run in progress in this job or thread, if any"""
+    return frappe.flags.quickbooks_sync_telemetry
+
+
+def start_sync_run(run_id, sync, full_sync=0):
+    frappe.flags.quickbooks_sync_telemetry = SyncTelemetry(run_id, sync, full_sync)
+    return frappe.flags.quickbooks_sync_telemetry
+
+
+def finish_sync_run(status, result=None):
+    """Store the run as a QuickBooks Sync Run; telemetry must never fail the sync itself"""
+    telemetry = get_telemetry()
+    frappe.flags.quickbooks_sync_telemetry = None
+    if not telemetry:
+        return
+    try:
+        return telemetry.save(status, result)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "QuickBooks Sync Run Telemetry Error")
+
+
+def record_counts(entity, created=0, updated=0, skipped=0, failed=0):
+    """Called by the import functions with their outcome counters"""
+    telemetry = get_telemetry()
+    if telemetry:
+        stats = telemetry.get_entity(entity)
+        stats.created += cint(created)
+        stats.updated += cint(updated)
+        stats.skipped += cint(skipped)
+        stats.failed += cint(failed)
+
+
+def record_summary(entity, lines):
+    """Keep the import's per-record outcome lines on the Sync Run instead of sending them to the browser"""
+    telemetry = get_telemetry()
+    if telemetry and lines:
+        telemetry.summaries.setdefault(entity, []).extend(lines)
+
+
+def get_db_query_count():
+    """Statements this connection has sent (MariaDB Questions), or None on other databases"""
+    if frappe.db.db_type != "mariadb":
+        return None
+    result = frappe.db.sql("SHOW SESSION STATUS LIKE 'Questions'")
+    return cint(result[0][1]) if result else None
+
+
+def get_percentile(sorted_values, percentile):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, round(percentile / 100 * (len(sorted_values) - 1)))
+    return round(sorted_values[index], 2)
+
+
+def get_latency_histogram(latencies):
+    histogram = {str(bound): 0 for bound in LATENCY_BUCKETS}
+    histogram["inf"] = 0
+    for latency in latencies:
+        bucket = next((str(bound) for bound in LATENCY_BUCKETS if latency <= bound), "inf")
+        histogram[bucket] += 1
+    return histogram
+
+
+class EntityStats:
+    """Timings and counters of one entity within a run"""
+
+    def __init__(self, entity):
+        self.entity = entity
+        self.rows = 0
+        self.created = self.updated = self.skipped = self.failed = 0
+        self.fetch_time = self.loop_time = self.write_time = 0.0
+        self.latencies = []
+        self.bytes_downloaded = 0
+        self.db_queries = 0
+
+    def as_row(self):
+        latencies = sorted(self.latencies)
+        busy = self.fetch_time + self.loop_time
+        return {
+            "entity": self.entity,
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / busy, 2) if busy else 0,
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "fetch_time": round(self.fetch_time, 3),
+            "map_time": round(max(self.loop_time - self.write_time, 0), 3),
+            "write_time": round(self.write_time, 3),
+            "api_calls": len(latencies),
+            "bytes_downloaded": self.bytes_downloaded,
+            "db_queries": self.db_queries,
+            "latency_p50": get_percentile(latencies, 50),
+            "latency_p95": get_percentile(latencies, 95),
+            "latency_p99": get_percentile(latencies, 99)
+        }
+
+
+class SyncTelemetry:
+    """Collects per-entity fetch/map/write time, API latency, bytes and DB queries for one run
+
+    API calls and DB queries are attributed to the entity whose records are being
+    iterated (see sync_jobs.track_progress); calls made before that land under "Setup".
+    """
+
+    def __init__(self, run_id, sync, full_sync=0):
+        self.run_id = run_id
+        self.sync = sync
+        self.full_sync = cint(full_sync)
+        self.started = time.monotonic()
+        self.started_at = now_datetime()
+        self.entities = {}
+        self.summaries = {}
+        self.current = self.get_entity("Setup")
+        self.db_queries_start = self.db_queries_mark = get_db_query_count()
+
+    def get_entity(self, entity):
+        if entity not in self.entities:
+            self.entities[entity] = EntityStats(entity)
+        return self.entities[entity]
+
+    def set_entity(self, entity):
+        self.mark_db_queries()
+        self.current = self.get_entity(entity)
+
+    def mark_db_queries(self):
+        if self.db_queries_mark is None:
+            return
+        count = get_db_query_count()
+        self.current.db_queries += count - self.db_queries_mark
+        self.db_queries_mark = count
+
+    def record_api_call(self, elapsed, size=None):
+        self.current.latencies.append(elapsed * 1000)
+        if size:
+            self.current.bytes_downloaded += size
+
+    def record_bytes(self, size):
+        self.current.bytes_downloaded += size
+
+    def record_fetch(self, elapsed):
+        self.current.fetch_time += elapsed
+
+    def record_row(self, elapsed):
+        self.current.rows += 1
+        self.current.loop_time += elapsed
+
+    def record_write(self, elapsed):
+        self.current.write_time += elapsed
+
+    def save(self, status, result=None):
+        self.mark_db_queries()
+        duration = time.monotonic() - self.started
+        latencies = sorted(latency for stats in self.entities.values() for latency in stats.latencies)
+        rows = [stats.as_row() for stats in self.entities.values() if stats.rows or stats.latencies]
+        rows_processed = sum(row["rows"] for row in rows)
+
+        run = frappe.get_doc({
+            "doctype": SYNC_RUN_DOCTYPE,
+            "run_id": self.run_id,
+            "sync": self.sync,
+            "status": status,
+            "full_sync": self.full_sync,
+            "started_at": self.started_at,
+            "finished_at": now_datetime(),
+            "duration": round(duration, 3),
+            "rows_processed": rows_processed,
+            "rows_per_sec": round(rows_processed / duration, 2) if duration else 0,
+            "db_queries": sum(row["db_queries"] for row in rows) if self.db_queries_start is not None else None,
+            "api_calls": len(latencies),
+            "bytes_downloaded": sum(row["bytes_downloaded"] for row in rows),
+            "latency_p50": get_percentile(latencies, 50),
+            "latency_p95": get_percentile(latencies, 95),
+            "latency_p99": get_percentile(latencies, 99),
+            "latency_histogram": frappe.as_json(get_latency_histogram(latencies)),
+            "result": frappe.as_json(result) if result is not None else None,
+            "summary": "\n\n".join(f"{entity}:\n" + "\n".join(lines) for entity, lines in self.summaries.items()) or None,
+            "entities": rows
+        })
+        run.insert(ignore_permissions=True)
+        frappe.db.commit()
+        return run
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+from intuitlib.client import AuthClient
+
+SETTINGS_DOCTYPE = "Quickbook Settings"
+REFRESH_MARGIN = 5 * 60  # seconds before expiry at which the token is refreshed ahead of time
+DEFAULT_EXPIRES_IN = 60 * 60  # QBO access tokens live for an hour
+REFRESH_LOCK = "quickbooks_token_refresh"
+TOKEN_CACHE_KEY = "quickbooks_access_token"
+REFRESH_LOCK_TIMEOUT = 30  # seconds a worker may hold the lock while talking to Intuit
+REFRESH_LOCK_WAIT = 35  # seconds other workers wait for the holder before giving up
+
+
+class QuickBooksTokenError(frappe.ValidationError):
+    pass
+
+
+def is_token_expiring(expires_at, margin=REFRESH_MARGIN):
+    """True if the access token is unknown to expire or expires within `margin` seconds"""
+    if not expires_at:
+        return False  # tokens saved before expiry tracking existed; rely on the 401 retry
+    return get_datetime(expires_at) - timedelta(seconds=margin) <= now_datetime()
+
+
+def get_expires_at(expires_in):
+    return now_datetime() + timedelta(seconds=cint(expires_in) or DEFAULT_EXPIRES_IN)
+
+
+def save_tokens(settings, token_response):
+    """Store a token response from AuthClient (get_bearer_token or refresh) on Quickbook Settings"""
+    settings.access_token = token_response.get("access_token")
+    settings.refresh_token = token_response.get("refresh_token") or settings.refresh_token
+    settings.token_expires_at = get_expires_at(token_response.get("expires_in"))
+
+
+def get_access_token(stale_token=None):
+    """Return a usable access token, refreshing it if it is about to expire or was rejected
+
+    `stale_token` is the token QuickBooks just answered 401 for. Refreshes are
+    single-flight across workers: whoever holds the Redis lock calls Intuit, the
+    others wait for it and pick up the token it stored.
+    """
+    access_token, expires_at = get_stored_token()
+    if access_token and access_token != stale_token and not is_token_expiring(expires_at):
+        return access_token
+
+    with frappe.cache().lock(frappe.cache().make_key(REFRESH_LOCK), timeout=REFRESH_LOCK_TIMEOUT, blocking_timeout=REFRESH_LOCK_WAIT):
+        # Another worker may have refreshed while we waited for the lock
+        access_token, expires_at = get_stored_token()
+        if access_token and access_token != stale_token and not is_token_expiring(expires_at):
+            return access_token
+
+        return refresh_access_token()
+
+
+def get_stored_token():
+    """Latest token, preferring the one a refreshing worker shared through Redis
+
+    A worker inside an open transaction may not see another worker's commit yet,
+    so the refreshed token is published to the cache as well as saved.
+    """
+    cached = frappe.cache().get_value(TOKEN_CACHE_KEY)
+    if cached:
+        return cached.get("access_token"), cached.get("token_expires_at")
+
+    values = frappe.db.get_values_from_single(["access_token", "token_expires_at"], None, SETTINGS_DOCTYPE, as_dict=True)
+    values = values[0] if values else frappe._dict()
+    return values.get("access_token"), values.get("token_expires_at")
+
+
+def publish_token(settings):
+    expires_in = (get_datetime(settings.token_expires_at) - now_datetime()).total_seconds()
+    frappe.cache().set_value(
+        TOKEN_CACHE_KEY,
+        {
+            "access_token": settings.access_token,
+            "refresh_token": settings.refresh_token,
+            "token_expires_at": str(settings.token_expires_at)
+        },
+        expires_in_sec=max(cint(expires_in), 1)
+    )
+
+
+def clear_published_token():
+    """Forget the shared token, e.g. after reconnecting through OAuth"""
+    frappe.cache().delete_value(TOKEN_CACHE_KEY)
+
+
+def refresh_access_token():
+    """Exchange the stored refresh token for a new access token and commit it for other workers"""
+    settings = frappe.get_doc(SETTINGS_DOCTYPE)
+    # Intuit rotates refresh tokens, so prefer the one the last refresh published
+    cached = frappe.cache().get_value(TOKEN_CACHE_KEY)
+    if cached and cached.get("refresh_token"):
+        settings.refresh_token = cached["refresh_token"]
+
+    if not settings.refresh_token:
+        raise QuickBooksTokenError("Refresh Token missing. Please reconnect QuickBooks.")
+
+    auth_client = AuthClient(
+        client_id=settings.client_id,
+        client_secret=settings.client_secret,
+        environment=settings.environment or "sandbox",
+        redirect_uri=settings.redirect_uri
+    )
+    try:
+        auth_client.refresh(refresh_token=settings.refresh_token)
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "QuickBooks Token Refresh Failed")
+        raise QuickBooksTokenError(f"Could not refresh the QuickBooks access token. Please reconnect QuickBooks. ({e})")
+
+    save_tokens(settings, {
+        "access_token": auth_client.access_token,
+        "refresh_token": auth_client.refresh_token,
+        "expires_in": auth_client.expires_in
+    })
+    settings.save(ignore_permissions=True)
+    frappe.db.commit()
+    # Hand the token to workers waiting on the lock, not the one Intuit just revoked
+    publish_token(settings)
+    return settings.access_token
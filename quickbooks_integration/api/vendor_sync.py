@@ -1,130 +1,166 @@
 import frappe
-import requests
 import json
+from frappe.utils import cint
+from quickbooks_integration.api.batch_commit import BatchCommitter
+from quickbooks_integration.api.doc_updates import apply_header_changes, get_changes, get_current_values
+from quickbooks_integration.api.qbo_client import QuickBooksAPIError, get_qbo_client
+from quickbooks_integration.api.qbo_links import QuickBooksLinks
+from quickbooks_integration.api.sync_jobs import in_sync_job, track_progress
+from quickbooks_integration.api.sync_logger import get_logger
+from quickbooks_integration.api.sync_state import Watermark, hold_watermark
+from quickbooks_integration.api.telemetry import record_counts
 
 @frappe.whitelist()
-def sync_quickbooks_vendors():
+def sync_quickbooks_vendors(full_sync=0):
     try:
         # Load QuickBooks settings
-        settings = frappe.get_single("Quickbook Settings")
-        access_token = settings.access_token
-        realm_id = settings.realm_id
-        environment = settings.environment or "sandbox"
+        client = get_qbo_client()
 
-        if not access_token or not realm_id:
+        if not client.access_token or not client.realm_id:
             frappe.throw("Access Token or Realm ID missing. Please connect to QuickBooks.")
 
-        # Determine QuickBooks base URL
-        base_url = "https://sandbox-quickbooks.api.intuit.com" if environment == "sandbox" else "https://quickbooks.api.intuit.com"
-        endpoint = f"{base_url}/v3/company/{realm_id}/query"
-        query = "SELECT * FROM Vendor"
+        watermark = Watermark("Vendor", full_sync=cint(full_sync))
+        vendors = watermark.fetch(client)
+        result = import_quickbooks_vendors(track_progress("Vendor", watermark.track(vendors)))
 
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/text"
-        }
-
-        response = requests.post(endpoint, headers=headers, data=query)
-
-        if response.status_code != 200:
-            frappe.log_error(response.text, "QuickBooks Vendor Sync API Error")
-            return "Failed to fetch vendors. Check error logs."
-
-        vendor_data = response.json()
-        vendors = vendor_data.get("QueryResponse", {}).get("Vendor", [])
-        print("Fetched Vendors:", json.dumps(vendors, indent=2))  # Debugging output
-        print("Fetched Vendors Count:", len(vendors))
+        watermark.save()
+        frappe.db.commit()
 
-        if not vendors:
+        get_logger().info("Fetched Vendors Count: %s", watermark.seen)
+        if not watermark.seen:
             return "No vendors found in QuickBooks."
 
-        created, updated = 0, 0
-
-        # Get default company
-        default_company = frappe.defaults.get_user_default("Company")
-
-        # Get company's default currency
-        company_currency = frappe.db.get_value("Company", default_company, "default_currency")
-
-        # Try fetching default payable account from Company
-        default_payable = frappe.db.get_value("Company", default_company, "default_payable_account")
-
-        # If not found, fallback to your fixed account
-        if not default_payable:
-            default_payable = frappe.db.get_value(
-                "Account",
-                {"name": "226040 - Other Creditors - NGN - MTL"},
-                "name"
-            )
-
-        if not default_payable:
-            frappe.throw("No default payable account found. Please set it in Company or check the fallback account.")
-
-        for v in vendors:
-            vendor_name = v.get("DisplayName")
-            email = v.get("PrimaryEmailAddr", {}).get("Address")
-            phone = v.get("PrimaryPhone", {}).get("FreeFormNumber")
-            company_name = v.get("CompanyName") or vendor_name
-            qb_id = v.get("Id")
-
-            if not vendor_name:
-                continue  # skip if vendor has no name
-
-            # Check if supplier already exists (using QuickBooks Id as unique key)
-            existing_supplier = frappe.db.exists("Supplier", {"custom_quickbooks_vendor_id": qb_id})
-
-            if existing_supplier:
-                supplier = frappe.get_doc("Supplier", existing_supplier)
-                supplier.supplier_name = vendor_name
-                supplier.supplier_group = supplier.supplier_group or "All Supplier Groups"
-                supplier.supplier_type = supplier.supplier_type or "Company"
-                supplier.supplier_email = email
-                supplier.mobile_no = phone
-                supplier.company_name = company_name
-
-                # ✅ Always match ERPNext company currency
-                supplier.default_currency = company_currency
-
-                # Always ensure accounts row exists
-                supplier.set("accounts", [{
-                    "company": default_company,
-                    "account": default_payable
-                }])
-
-                supplier.save(ignore_permissions=True)
-                updated += 1
-            else:
-                supplier = frappe.get_doc({
-                    "doctype": "Supplier",
-                    "supplier_name": vendor_name,
-                    "supplier_group": "All Supplier Groups",
-                    "supplier_type": "Company",
-                    "supplier_email": email,
-                    "mobile_no": phone,
-                    "company_name": company_name,
-                    "custom_quickbooks_vendor_id": qb_id,  # custom field you should add
-
-                    # ✅ Force company currency as billing currency
-                    "default_currency": company_currency,
-
-                    "accounts": [{
-                        "company": default_company,
-                        "account": default_payable
-                    }]
-                })
-                supplier.insert(ignore_permissions=True)
-                created += 1
+        return result
 
-        frappe.db.commit()
-
-        return f"✅ Vendor Sync Completed: {created} created, {updated} updated."
-        print(f"Created Suppliers: {created}")
-        print(f"Updated Suppliers: {updated}")
-        print(f"Skipped Suppliers: {len(vendors) - (created + updated)}")
-        print(f"Total Suppliers Processed: {len(vendors)}")
-        print(f"Vendor Sync Completed Successfully")
+    except QuickBooksAPIError as e:
+        frappe.log_error(e.response_text, "QuickBooks Vendor Sync API Error")
+        if in_sync_job():
+            raise
+        return "Failed to fetch vendors. Check error logs."
 
     except Exception as e:
         frappe.log_error(frappe.get_traceback(), "QuickBooks Vendor Sync Error")
+        if in_sync_job():
+            raise
         return f"🔥 Error occurred: {str(e)}"
+
+
+def import_quickbooks_vendors(vendors):
+    """Create or update ERPNext Suppliers for an iterable of QuickBooks Vendor records"""
+    created, updated, unchanged, failed = 0, 0, 0, 0
+    committer = BatchCommitter()
+    links = QuickBooksLinks()
+
+    # Get default company
+    default_company = frappe.defaults.get_user_default("Company")
+
+    # Get company's default currency
+    company_currency = frappe.db.get_value("Company", default_company, "default_currency")
+
+    # Try fetching default payable account from Company
+    default_payable = frappe.db.get_value("Company", default_company, "default_payable_account")
+
+    # If not found, fallback to your fixed account
+    if not default_payable:
+        default_payable = frappe.db.get_value(
+            "Account",
+            {"name": "226040 - Other Creditors - NGN - MTL"},
+            "name"
+        )
+
+    if not default_payable:
+        frappe.throw("No default payable account found. Please set it in Company or check the fallback account.")
+
+    for v in vendors:
+        vendor_name = v.get("DisplayName")
+        email = v.get("PrimaryEmailAddr", {}).get("Address")
+        phone = v.get("PrimaryPhone", {}).get("FreeFormNumber")
+        qb_id = v.get("Id")
+
+        if not vendor_name:
+            continue  # skip if vendor has no name
+
+        # Same SyncToken as at the last import: nothing changed in QuickBooks, so skip the save
+        if links.is_unchanged("Vendor", v, doctype="Supplier"):
+            unchanged += 1
+            continue
+
+        try:
+            with committer.record():
+                # Check if supplier already exists (using QuickBooks Id as unique key)
+                existing_supplier = links.get_name("Vendor", qb_id, doctype="Supplier")
+
+                # Plain header fields can be written directly; the rest need a full Supplier save
+                header_values = {"supplier_name": vendor_name}
+                # email_id and mobile_no come from the primary Contact, which Supplier.on_update keeps in step
+                contact_values = {"email_id": email, "mobile_no": phone}
+
+                if existing_supplier:
+                    current = get_current_values(
+                        "Supplier",
+                        existing_supplier,
+                        [*header_values, *contact_values, "supplier_group", "supplier_type", "default_currency"]
+                    )
+                    accounts = frappe.get_all(
+                        "Party Account",
+                        filters={"parenttype": "Supplier", "parent": existing_supplier},
+                        fields=["company", "account"],
+                        as_list=True
+                    )
+                    needs_save = (
+                        not current.get("supplier_group")
+                        or not current.get("supplier_type")
+                        # ✅ Always match ERPNext company currency
+                        or get_changes(current, {"default_currency": company_currency})
+                        or get_changes(current, contact_values)
+                        # Always ensure accounts row exists
+                        or [tuple(row) for row in accounts] != [(default_company, default_payable)]
+                    )
+
+                    if needs_save:
+                        supplier = frappe.get_doc("Supplier", existing_supplier)
+                        supplier.update({**header_values, **contact_values})
+                        supplier.supplier_group = supplier.supplier_group or "All Supplier Groups"
+                        supplier.supplier_type = supplier.supplier_type or "Company"
+                        supplier.default_currency = company_currency
+                        supplier.set("accounts", [{
+                            "company": default_company,
+                            "account": default_payable
+                        }])
+                        supplier.save(ignore_permissions=True)
+                        updated += 1
+                    else:
+                        changes = get_changes(current, header_values)
+                        apply_header_changes("Supplier", existing_supplier, changes)
+                        updated += bool(changes)
+                        unchanged += not changes
+                else:
+                    supplier = frappe.get_doc({
+                        "doctype": "Supplier",
+                        **header_values,
+                        **contact_values,
+                        "supplier_group": "All Supplier Groups",
+                        "supplier_type": "Company",
+                        "custom_quickbooks_vendor_id": qb_id,  # custom field you should add
+
+                        # ✅ Force company currency as billing currency
+                        "default_currency": company_currency,
+
+                        "accounts": [{
+                            "company": default_company,
+                            "account": default_payable
+                        }]
+                    })
+                    supplier.insert(ignore_permissions=True)
+                    created += 1
+
+                links.set("Vendor", qb_id, "Supplier", existing_supplier or supplier.name, v.get("SyncToken"))
+        except Exception:
+            frappe.log_error(frappe.get_traceback(), f"QuickBooks Vendor Sync Failed: {qb_id}")
+            hold_watermark(v)
+            failed += 1
+
+    committer.commit()
+    record_counts("Vendor", created=created, updated=updated, skipped=unchanged, failed=failed)
+
+    return f"✅ Vendor Sync Completed: {created} created, {updated} updated, {unchanged} unchanged, {failed} failed."
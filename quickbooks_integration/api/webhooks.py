@@ -0,0 +1,139 @@
+import base64
+import hashlib
+import hmac
+import json
+import pickle
+import time
+
+import frappe
+import redis
+from frappe.utils.password import get_decrypted_password
+
+from quickbooks_integration.api.cdc_sync import ENTITY_IMPORTERS, remove_linked_documents
+from quickbooks_integration.api.qbo_client import get_qbo_client
+
+WEBHOOK_QUEUE = "quickbooks_webhook_queue"
+DEBOUNCE_SECONDS = 30  # wait for a burst on the same entity to settle
+MAX_WAIT_SECONDS = 300  # but never hold a notification longer than this
+ID_BATCH_SIZE = 50  # Ids per "Id IN (...)" query
+REMOVE_OPERATIONS = ("Delete", "Void")
+
+# Remove a queue entry only if it still holds the value that was read, so a newer notification is kept
+CLAIM_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+@frappe.whitelist(allow_guest=True, methods=["POST"])
+def handle_qbo_webhook():
+    """Receive QBO change notifications, verify them and queue the entity Ids"""
+    payload = frappe.request.get_data()
+    signature = frappe.get_request_header("intuit-signature")
+
+    if not verify_signature(payload, signature):
+        frappe.throw("Invalid QuickBooks webhook signature", frappe.AuthenticationError)
+
+    queue_notifications(json.loads(payload))
+    return "ok"
+
+
+def verify_signature(payload, signature, verifier_token=None):
+    """Check the intuit-signature header: base64(HMAC-SHA256(verifier token, raw body))"""
+    verifier_token = verifier_token or get_decrypted_password(
+        "Quickbook Settings", "Quickbook Settings", "webhook_verifier_token", raise_exception=False
+    )
+    if not verifier_token or not signature:
+        return False
+
+    digest = hmac.new(verifier_token.encode(), payload, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+
+def queue_notifications(data):
+    """Add notified entities to the queue, coalescing repeats of the same entity"""
+    cache = frappe.cache()
+    now = time.time()
+
+    for notification in data.get("eventNotifications", []):
+        realm_id = notification.get("realmId")
+        for event in (notification.get("dataChangeEvent") or {}).get("entities", []):
+            key = f"{realm_id}:{event.get('name')}:{event.get('id')}"
+            queued = cache.hget(WEBHOOK_QUEUE, key)
+            cache.hset(WEBHOOK_QUEUE, key, {
+                "operation": event.get("operation"),
+                "first_seen": queued["first_seen"] if queued else now,
+                "last_seen": now
+            })
+
+
+def get_due_notifications(now=None):
+    """Pop queued notifications whose debounce window has elapsed
+
+    Each entry is claimed with a compare-and-delete on its stored value: one that a
+    new notification overwrote since it was read stays queued for the next run.
+    """
+    cache = frappe.cache()
+    queue_key = cache.make_key(WEBHOOK_QUEUE)
+    now = now or time.time()
+    due = {}
+
+    # The raw pickled values, which RedisWrapper.hgetall would unpickle
+    for key, value in redis.Redis.hgetall(cache, queue_key).items():
+        entry = pickle.loads(value)
+        if now - entry["last_seen"] < DEBOUNCE_SECONDS and now - entry["first_seen"] < MAX_WAIT_SECONDS:
+            continue
+        if cache.eval(CLAIM_SCRIPT, 1, queue_key, key, value):
+            due[frappe.safe_decode(key)] = entry
+
+    return due
+
+
+def process_webhook_queue():
+    """Scheduled job: drain debounced notifications in batches of Id IN (...) queries"""
+    due = get_due_notifications()
+    if not due:
+        return
+
+    client = get_qbo_client()
+    updates, removals = {}, {}
+    for key, entry in due.items():
+        realm_id, entity, qb_id = key.split(":", 2)
+        if realm_id != client.realm_id or entity not in ENTITY_IMPORTERS:
+            continue
+        target = removals if entry["operation"] in REMOVE_OPERATIONS else updates
+        target.setdefault(entity, []).append(qb_id)
+
+    for entity, ids in removals.items():
+        for qb_id in ids:
+            try:
+                remove_linked_documents(entity, qb_id)
+            except Exception:
+                frappe.log_error(frappe.get_traceback(), f"QuickBooks Webhook Delete Error: {entity} {qb_id}")
+
+    # Keep dependency order so customers/items exist before the invoices that use them
+    for entity, importer in ENTITY_IMPORTERS.items():
+        ids = updates.get(entity)
+        for start in range(0, len(ids or []), ID_BATCH_SIZE):
+            batch = ids[start:start + ID_BATCH_SIZE]
+            try:
+                id_list = ", ".join(f"'{qb_id}'" for qb_id in batch)
+                importer(client.iter_query(entity, where=f"Id IN ({id_list})"))
+            except Exception:
+                frappe.log_error(frappe.get_traceback(), f"QuickBooks Webhook Sync Error: {entity}")
+                requeue(client.realm_id, entity, batch)
+
+    frappe.db.commit()
+
+
+def requeue(realm_id, entity, ids):
+    """Put a failed batch back so the next run retries it"""
+    now = time.time()
+    for qb_id in ids:
+        frappe.cache().hset(WEBHOOK_QUEUE, f"{realm_id}:{entity}:{qb_id}", {
+            "operation": "Update",
+            "first_seen": now,
+            "last_seen": now
+        })
@@ -0,0 +1,101 @@
+"""Latency of the "already synced?" lookups on QBO id columns, with and without an index
+
+Builds a temporary table of `rows` synthetic ids, so it is safe on any site:
+
+    bench --site bench.localhost execute quickbooks_integration.benchmarks.lookups.run_lookup_benchmark \
+        --kwargs "{'rows': 200000}"
+
+It also reports, for each real lookup column, its row count and whether MariaDB
+plans the lookup through an index.
+"""
+
+import random
+import time
+
+import frappe
+
+from quickbooks_integration.api.telemetry import get_percentile
+from quickbooks_integration.patches.v1_0.add_quickbooks_id_indexes import INDEXED_ID_FIELDS, UNIQUE_ID_FIELDS
+
+BENCHMARK_TABLE = "quickbooks_lookup_benchmark"
+INSERT_CHUNK = 5000
+
+
+def run_lookup_benchmark(rows=100000, lookups=1000, seed=42):
+    if frappe.db.db_type != "mariadb":
+        frappe.throw("The lookup benchmark only supports MariaDB.")
+
+    rng = random.Random(seed)
+    create_table(rows)
+    try:
+        # Half the probes hit an existing id, half miss, like a sync mixing new and known records
+        probes = [str(rng.randint(1, rows * 2)) for _ in range(lookups)]
+        results = {"rows": rows, "lookups": lookups, "scan": time_lookups(probes)}
+        frappe.db.sql(f"ALTER TABLE `{BENCHMARK_TABLE}` ADD INDEX `qbo_id` (`qbo_id`)")
+        results["indexed"] = time_lookups(probes)
+    finally:
+        frappe.db.sql(f"DROP TEMPORARY TABLE IF EXISTS `{BENCHMARK_TABLE}`")
+
+    results["columns"] = get_column_plans()
+    print_report(results)
+    return results
+
+
+def create_table(rows):
+    frappe.db.sql(f"DROP TEMPORARY TABLE IF EXISTS `{BENCHMARK_TABLE}`")
+    # Roughly the width of a tabSales Invoice row, so a scan reads a realistic number of pages
+    frappe.db.sql(
+        f"""CREATE TEMPORARY TABLE `{BENCHMARK_TABLE}` (
+            `name` varchar(140) NOT NULL PRIMARY KEY,
+            `qbo_id` varchar(140),
+            `padding` varchar(2000)
+        )"""
+    )
+    padding = "x" * 1500
+    for start in range(1, rows + 1, INSERT_CHUNK):
+        values = [(f"BENCH-{i}", str(i * 2), padding) for i in range(start, min(start + INSERT_CHUNK, rows + 1))]
+        frappe.db.sql(
+            f"INSERT INTO `{BENCHMARK_TABLE}` (`name`, `qbo_id`, `padding`) VALUES "
+            + ", ".join(["(%s, %s, %s)"] * len(values)),
+            [value for row in values for value in row]
+        )
+
+
+def time_lookups(probes):
+    latencies = []
+    for probe in probes:
+        started = time.perf_counter()
+        frappe.db.sql(f"SELECT `name` FROM `{BENCHMARK_TABLE}` WHERE `qbo_id` = %s LIMIT 1", probe)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": get_percentile(latencies, 50),
+        "p95_ms": get_percentile(latencies, 95),
+        "p99_ms": get_percentile(latencies, 99),
+        "lookups_per_sec": round(len(latencies) / (sum(latencies) / 1000), 1) if sum(latencies) else 0
+    }
+
+
+def get_column_plans():
+    plans = []
+    for doctype, fieldname in UNIQUE_ID_FIELDS + INDEXED_ID_FIELDS:
+        if not frappe.db.has_column(doctype, fieldname):
+            continue
+        plan = frappe.db.sql(f"EXPLAIN SELECT `name` FROM `tab{doctype}` WHERE `{fieldname}` = %s", "1", as_dict=True)[0]
+        plans.append({
+            "doctype": doctype,
+            "fieldname": fieldname,
+            "rows": frappe.db.count(doctype),
+            "index": plan.get("key"),
+            "rows_examined": plan.get("rows")
+        })
+    return plans
+
+
+def print_report(results):
+    print(f"{results['rows']} rows, {results['lookups']} lookups")
+    for label in ("scan", "indexed"):
+        timing = results[label]
+        print(f"  {label:<8} p50 {timing['p50_ms']} ms  p95 {timing['p95_ms']} ms  p99 {timing['p99_ms']} ms  {timing['lookups_per_sec']} lookups/sec")
+    for plan in results["columns"]:
+        print(f"  {plan['doctype']}.{plan['fieldname']}: {plan['rows']} rows, index {plan['index'] or 'NONE'}, examines ~{plan['rows_examined']}")
@@ -0,0 +1,125 @@
+"""Offline sync benchmarks against a local QBO stub server
+
+Imports a synthetic realm into the site, so only run it on a throwaway site
+with `allow_tests` set in site_config.json:
+
+    bench --site bench.localhost execute quickbooks_integration.benchmarks.run.run_benchmarks \
+        --kwargs "{'sizes': {'Invoice': 10000}, 'output': '/tmp/qbo-bench.json'}"
+"""
+
+import json
+import resource
+import time
+
+import frappe
+
+from quickbooks_integration.api.sync_jobs import SYNC_METHODS
+from quickbooks_integration.api.telemetry import finish_sync_run, start_sync_run
+from quickbooks_integration.api.token_manager import clear_published_token
+from quickbooks_integration.benchmarks.stub_server import start_stub_server
+from quickbooks_integration.benchmarks.synthetic_realm import get_realm_start
+
+BENCHMARK_REALM_ID = "benchmark"
+STUB_SETTINGS = ("access_token", "refresh_token", "token_expires_at", "realm_id")
+BENCHMARK_SYNCS = ["accounts", "customers", "vendors", "items", "invoices", "bills", "payments", "journal_entries"]
+
+
+def run_benchmarks(sizes=None, seed=42, latency=0, syncs=None, cdc=True, output=None):
+    """Run each sync_quickbooks_* entry point against the stub and report rows/sec, queries/row and peak RSS
+
+    `latency` adds seconds of delay to every stub response to mimic the network.
+    """
+    if not frappe.conf.allow_tests:
+        frappe.throw("Benchmarks import a synthetic realm. Set allow_tests in site_config.json of a throwaway site.")
+
+    process, base_url = start_stub_server(sizes, seed, latency)
+    connection = frappe.db.get_singles_dict("Quickbook Settings")
+    try:
+        use_stub(base_url)
+        results = []
+        for sync in syncs or BENCHMARK_SYNCS:
+            results.append(run_benchmark(sync, full_sync=1))
+        if cdc:
+            since = get_realm_start().strftime("%Y-%m-%dT%H:%M:%S-00:00")
+            results.append(run_benchmark("changes", changed_since=since))
+    finally:
+        process.terminate()
+        frappe.local.conf.pop("quickbooks_base_url", None)
+        restore_settings(connection)
+
+    print_report(results)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    return results
+
+
+def use_stub(base_url):
+    """Point this process's client at the stub with a dummy token that never expires"""
+    frappe.local.conf.quickbooks_base_url = base_url
+    settings = frappe.get_single("Quickbook Settings")
+    settings.access_token = "benchmark"
+    settings.refresh_token = "benchmark"
+    settings.token_expires_at = None
+    settings.realm_id = BENCHMARK_REALM_ID
+    settings.save(ignore_permissions=True)
+    frappe.db.commit()
+    clear_published_token()
+
+
+def restore_settings(connection):
+    """Put back the QuickBooks connection use_stub replaced"""
+    settings = frappe.get_single("Quickbook Settings")
+    settings.update({fieldname: connection.get(fieldname) for fieldname in STUB_SETTINGS})
+    settings.save(ignore_permissions=True)
+    frappe.db.commit()
+    clear_published_token()
+
+
+def get_peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # ru_maxrss is in KiB on Linux
+
+
+def run_benchmark(sync, **kwargs):
+    run_id = f"benchmark-{frappe.generate_hash(length=8)}-{sync}"
+    rss_before = get_peak_rss_mb()
+    started = time.monotonic()
+
+    start_sync_run(run_id, f"benchmark:{sync}", kwargs.get("full_sync", 0))
+    status, result = "Completed", None
+    # Run like the worker does, so a failed sync raises instead of returning an error message
+    frappe.flags.quickbooks_sync_job = True
+    try:
+        result = frappe.get_attr(SYNC_METHODS[sync])(**kwargs)
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        status, result = "Failed", str(e)
+    finally:
+        frappe.flags.quickbooks_sync_job = False
+    run = finish_sync_run(status, result)
+
+    elapsed = time.monotonic() - started
+    rows = run.rows_processed if run else 0
+    return {
+        "sync": sync,
+        "status": status,
+        "sync_run": run.name if run else None,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else 0,
+        "queries_per_row": round(run.db_queries / rows, 1) if run and rows and run.db_queries is not None else None,
+        "api_calls": run.api_calls if run else 0,
+        "latency_p95_ms": run.latency_p95 if run else None,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "peak_rss_growth_mb": round(get_peak_rss_mb() - rss_before, 1),
+        "result": result
+    }
+
+
+def print_report(results):
+    columns = ["sync", "status", "rows", "seconds", "rows_per_sec", "queries_per_row", "api_calls", "peak_rss_mb", "peak_rss_growth_mb"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for result in results:
+        print("  ".join(str(result[c]).ljust(widths[c]) for c in columns))
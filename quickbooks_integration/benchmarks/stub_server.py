@@ -0,0 +1,143 @@
+import json
+import multiprocessing
+import re
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from quickbooks_integration.benchmarks.synthetic_realm import SyntheticRealm
+
+QUERY_PATTERN = re.compile(
+    r"SELECT \* FROM (?P<entity>\w+)"
+    r"(?: WHERE (?P<where>.+?))?"
+    r"(?: ORDERBY (?P<order_by>\S+))?"
+    r"(?: STARTPOSITION (?P<start>\d+))?"
+    r"(?: MAXRESULTS (?P<max>\d+))?\s*$",
+    re.IGNORECASE
+)
+UPDATED_SINCE_PATTERN = re.compile(r"MetaData\.LastUpdatedTime\s*(>=?)\s*'([^']+)'")
+ID_IN_PATTERN = re.compile(r"Id IN \(([^)]*)\)", re.IGNORECASE)
+CDC_MAX_RESULTS = 1000
+DEFAULT_PAGE_SIZE = 100  # what QBO returns without MAXRESULTS
+
+
+def now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S-00:00")
+
+
+def filter_records(records, where):
+    """Support the WHERE clauses the app sends: LastUpdatedTime watermarks and Id IN (...)"""
+    if not where:
+        return records
+    match = UPDATED_SINCE_PATTERN.search(where)
+    if match:
+        operator, since = match.groups()
+        if operator == ">=":
+            records = [r for r in records if r["MetaData"]["LastUpdatedTime"] >= since]
+        else:
+            records = [r for r in records if r["MetaData"]["LastUpdatedTime"] > since]
+    match = ID_IN_PATTERN.search(where)
+    if match:
+        ids = {value.strip().strip("'\"") for value in match.group(1).split(",")}
+        records = [r for r in records if r["Id"] in ids]
+    return records
+
+
+class QuickBooksStubHandler(BaseHTTPRequestHandler):
+    """Serves /query, /cdc, /batch and /companyinfo for one synthetic realm"""
+
+    realm = None
+    latency = 0
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith("/cdc"):
+            params = parse_qs(url.query)
+            self.send_json(self.cdc(params["entities"][0].split(","), params["changedSince"][0]))
+        elif "/companyinfo/" in url.path:
+            self.send_json({"CompanyInfo": {"CompanyName": "Benchmark Realm"}, "time": now()})
+        else:
+            self.send_json({"Fault": {"Error": [{"Message": "Unknown endpoint"}]}}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+        if url.path.endswith("/query"):
+            self.send_json(self.query(body))
+        elif url.path.endswith("/batch"):
+            self.send_json(self.batch(json.loads(body)))
+        else:
+            self.send_json({"Fault": {"Error": [{"Message": "Unknown endpoint"}]}}, status=404)
+
+    def send_json(self, data, status=200):
+        if self.latency:
+            time.sleep(self.latency)
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def query(self, query):
+        match = QUERY_PATTERN.match(query.strip())
+        if not match:
+            return {"Fault": {"Error": [{"Message": f"Unparseable query: {query}"}]}}
+        entity = match.group("entity")
+        records = filter_records(self.realm.entities.get(entity, []), match.group("where"))
+        start = int(match.group("start") or 1)
+        page = records[start - 1:start - 1 + int(match.group("max") or DEFAULT_PAGE_SIZE)]
+        query_response = {"startPosition": start, "maxResults": len(page)}
+        if page:
+            query_response[entity] = page
+        return {"QueryResponse": query_response, "time": now()}
+
+    def cdc(self, entities, changed_since):
+        query_responses = []
+        for entity in entities:
+            records = filter_records(self.realm.entities.get(entity, []), f"MetaData.LastUpdatedTime > '{changed_since}'")
+            query_responses.append({entity: records[:CDC_MAX_RESULTS], "startPosition": 1, "maxResults": len(records[:CDC_MAX_RESULTS])})
+        return {"CDCResponse": [{"QueryResponse": query_responses}], "time": now()}
+
+    def batch(self, data):
+        responses = []
+        for item in data.get("BatchItemRequest", []):
+            entity = next(key for key in item if key not in ("bId", "operation"))
+            record = dict(item[entity])
+            if item.get("operation") == "create":
+                record.update({"Id": str(len(self.realm.entities.setdefault(entity, [])) + 1), "SyncToken": "0"})
+                self.realm.entities[entity].append(record)
+            else:
+                record["SyncToken"] = str(int(record.get("SyncToken") or 0) + 1)
+            responses.append({"bId": item["bId"], entity: record})
+        return {"BatchItemResponse": responses, "time": now()}
+
+
+def serve(sizes, seed, latency, port_pipe, port=0):
+    """Child process entry point: build the realm, bind, report the port and serve forever"""
+    QuickBooksStubHandler.realm = SyntheticRealm(sizes, seed)
+    QuickBooksStubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), QuickBooksStubHandler)
+    port_pipe.send(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub_server(sizes=None, seed=42, latency=0, port=0):
+    """Start the stub in a separate process so its data does not count towards the sync's RSS
+
+    Returns (process, base_url); terminate the process when done.
+    """
+    context = multiprocessing.get_context("spawn")
+    parent_pipe, child_pipe = context.Pipe()
+    process = context.Process(target=serve, args=(sizes, seed, latency, child_pipe, port), daemon=True)
+    process.start()
+    # Wait for the realm to be generated and the socket bound, unless the child dies first
+    while not parent_pipe.poll(1):
+        if not process.is_alive():
+            raise RuntimeError(f"QuickBooks stub server exited with code {process.exitcode}")
+    return process, f"http://127.0.0.1:{parent_pipe.recv()}"
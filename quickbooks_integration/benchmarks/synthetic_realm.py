@@ -0,0 +1,193 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+
+DEFAULT_SIZES = {
+    "Account": 200,
+    "Customer": 10000,
+    "Vendor": 2000,
+    "Item": 5000,
+    "Invoice": 100000,
+    "Bill": 20000,
+    "Payment": 50000,
+    "JournalEntry": 10000
+}
+# Entities in the order the realm is built, so references always point at existing records
+ENTITY_ORDER = list(DEFAULT_SIZES)
+REALM_AGE_DAYS = 7  # records are timestamped from this long ago, inside QBO's 30-day CDC window
+LINES_PER_INVOICE = (1, 12)  # uniform range; QBO invoices in the wild mostly carry a handful of lines
+ACCOUNT_TYPES = [
+    ("Bank", "Checking"),
+    ("Accounts Receivable", "AccountsReceivable"),
+    ("Accounts Payable", "AccountsPayable"),
+    ("Income", "SalesOfProductIncome"),
+    ("Expense", "OfficeGeneralAdministrativeExpenses"),
+    ("Cost of Goods Sold", "SuppliesMaterialsCogs"),
+    ("Other Current Asset", "OtherCurrentAssets"),
+    ("Equity", "OwnersEquity")
+]
+
+
+def get_realm_start():
+    """LastUpdatedTime of the first record; one second passes per record after it"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=REALM_AGE_DAYS)
+
+
+class SyntheticRealm:
+    """Deterministic QBO-shaped records for every entity the syncs import
+
+    Records carry the fields the import functions read, references to records of
+    the other entities and strictly increasing MetaData.LastUpdatedTime values.
+    """
+
+    def __init__(self, sizes=None, seed=42):
+        self.sizes = {**DEFAULT_SIZES, **(sizes or {})}
+        self.random = random.Random(seed)
+        self.clock = get_realm_start()
+        self.entities = {}
+        for entity in ENTITY_ORDER:
+            build = getattr(self, f"build_{entity.lower()}")
+            self.entities[entity] = [build(i + 1) for i in range(self.sizes[entity])]
+
+    def metadata(self):
+        self.clock += timedelta(seconds=1)
+        timestamp = self.clock.strftime("%Y-%m-%dT%H:%M:%S-00:00")
+        return {"CreateTime": timestamp, "LastUpdatedTime": timestamp}
+
+    def pick(self, entity):
+        record = self.random.choice(self.entities[entity])
+        return {"value": record["Id"], "name": record.get("DisplayName") or record.get("Name")}
+
+    def txn_date(self):
+        return str(date(2024, 1, 1) + timedelta(days=self.random.randrange(365)))
+
+    def amount(self, low=10, high=5000):
+        return round(self.random.uniform(low, high), 2)
+
+    def build_account(self, i):
+        account_type, subtype = ACCOUNT_TYPES[i % len(ACCOUNT_TYPES)]
+        record = {
+            "Id": str(i),
+            "Name": f"Benchmark Account {i}",
+            "AcctNum": str(100000 + i),
+            "AccountType": account_type,
+            "AccountSubType": subtype,
+            "SyncToken": "0",
+            "MetaData": self.metadata()
+        }
+        if i > len(ACCOUNT_TYPES):
+            # Everything past the first account of each type is a sub-account
+            record["SubAccount"] = True
+            record["ParentRef"] = {"value": str((i - 1) % len(ACCOUNT_TYPES) + 1)}
+        return record
+
+    def build_party(self, i, prefix):
+        name = f"Benchmark {prefix} {i}"
+        return {
+            "Id": str(i),
+            "DisplayName": name,
+            "CompanyName": f"{name} Ltd",
+            "PrimaryEmailAddr": {"Address": f"{prefix.lower()}{i}@example.com"},
+            "PrimaryPhone": {"FreeFormNumber": f"+1 555 {i:07d}"},
+            "SyncToken": "0",
+            "MetaData": self.metadata()
+        }
+
+    def build_customer(self, i):
+        return self.build_party(i, "Customer")
+
+    def build_vendor(self, i):
+        return self.build_party(i, "Vendor")
+
+    def build_item(self, i):
+        return {
+            "Id": str(i),
+            "Name": f"Benchmark Item {i}",
+            "FullyQualifiedName": f"Benchmark Item {i}",
+            "Description": f"Synthetic item {i}",
+            "Type": self.random.choice(["Inventory", "NonInventory", "Service"]),
+            "UnitPrice": self.amount(1, 500),
+            "SyncToken": "0",
+            "MetaData": self.metadata()
+        }
+
+    def build_invoice(self, i):
+        lines = []
+        for _ in range(self.random.randint(*LINES_PER_INVOICE)):
+            qty = self.random.randint(1, 20)
+            price = self.amount(1, 500)
+            lines.append({
+                "DetailType": "SalesItemLineDetail",
+                "Amount": round(qty * price, 2),
+                "Description": "Synthetic line",
+                "SalesItemLineDetail": {"ItemRef": self.pick("Item"), "Qty": qty, "UnitPrice": price}
+            })
+        txn_date = self.txn_date()
+        return {
+            "Id": str(i),
+            "DocNumber": f"INV-{i}",
+            "TxnDate": txn_date,
+            "DueDate": txn_date,
+            "CustomerRef": self.pick("Customer"),
+            "Line": lines,
+            "TotalAmt": round(sum(line["Amount"] for line in lines), 2),
+            "SyncToken": "0",
+            "MetaData": self.metadata()
+        }
+
+    def build_bill(self, i):
+        if self.random.random() < 0.5:
+            lines = [{
+                "DetailType": "AccountBasedExpenseLineDetail",
+                "Amount": self.amount(),
+                "AccountBasedExpenseLineDetail": {"AccountRef": self.pick("Account")}
+            } for _ in range(self.random.randint(1, 4))]
+        else:
+            lines = [{
+                "DetailType": "ItemBasedExpenseLineDetail",
+                "Amount": self.amount(),
+                "ItemBasedExpenseLineDetail": {"ItemRef": self.pick("Item"), "Qty": 1, "UnitPrice": self.amount()}
+            } for _ in range(self.random.randint(1, 4))]
+        txn_date = self.txn_date()
+        return {
+            "Id": str(i),
+            "DocNumber": f"BILL-{i}",
+            "TxnDate": txn_date,
+            "DueDate": txn_date,
+            "VendorRef": self.pick("Vendor"),
+            "Line": lines,
+            "TotalAmt": round(sum(line["Amount"] for line in lines), 2),
+            "SyncToken": "0",
+            "MetaData": self.metadata()
+        }
+
+    def build_payment(self, i):
+        invoice = self.random.choice(self.entities["Invoice"]) if self.entities["Invoice"] else None
+        amount = invoice["TotalAmt"] if invoice else self.amount()
+        return {
+            "Id": str(i),
+            "TxnDate": self.txn_date(),
+            "TotalAmt": amount,
+            "CustomerRef": dict(invoice["CustomerRef"]) if invoice else self.pick("Customer"),
+            "Line": [{"Amount": amount, "LinkedTxn": [{"TxnId": invoice["Id"], "TxnType": "Invoice"}]}] if invoice else [],
+            "SyncToken": "0",
+            "MetaData": self.metadata()
+        }
+
+    def build_journalentry(self, i):
+        amount = self.amount()
+        return {
+            "Id": str(i),
+            "DocNumber": f"JE-{i}",
+            "TxnDate": self.txn_date(),
+            "Line": [
+                {
+                    "DetailType": "JournalEntryLineDetail",
+                    "Amount": amount,
+                    "JournalEntryLineDetail": {"PostingType": posting_type, "AccountRef": self.pick("Account")}
+                }
+                for posting_type in ("Debit", "Credit")
+            ],
+            "SyncToken": "0",
+            "MetaData": self.metadata()
+        }
@@ -147,10 +147,39 @@ app_license = "mit"
 # 	}
 # }
 
+_quickbooks_link_events = {
+	"on_trash": "quickbooks_integration.api.qbo_links.delete_document_links",
+	"after_rename": "quickbooks_integration.api.qbo_links.rename_document_links"
+}
+
+doc_events = {
+	"Account": {
+		"on_update": "quickbooks_integration.api.resolvers.clear_account_map_cache",
+		"on_trash": [
+			"quickbooks_integration.api.resolvers.clear_account_map_cache",
+			_quickbooks_link_events["on_trash"]
+		],
+		"after_rename": [
+			"quickbooks_integration.api.resolvers.clear_account_map_cache",
+			_quickbooks_link_events["after_rename"]
+		]
+	},
+	"Customer": _quickbooks_link_events,
+	"Supplier": _quickbooks_link_events,
+	"Item": _quickbooks_link_events,
+	"Sales Invoice": _quickbooks_link_events,
+	"Purchase Invoice": _quickbooks_link_events,
+	"Journal Entry": _quickbooks_link_events,
+	"Payment Entry": _quickbooks_link_events
+}
+
 # Scheduled Tasks
 # ---------------
 
 scheduler_events = {
+	"cron": {
+		"* * * * *": ["quickbooks_integration.api.webhooks.process_webhook_queue"]
+	},
 # 	"all": [
 # 		"quickbooks_integration.tasks.all"
 # 	],
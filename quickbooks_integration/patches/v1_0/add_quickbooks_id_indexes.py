@@ -0,0 +1,66 @@
+import frappe
+
+# (doctype, QBO id field); one ERPNext master per QBO record, so these get a unique index
+UNIQUE_ID_FIELDS = [
+    ("Customer", "custom_quickbooks_customer_id"),
+    ("Supplier", "custom_quickbooks_vendor_id"),
+    ("Item", "custom_quickbooks_item_id")
+]
+# Transactions can share an id (amendments, bills and journals both in tabJournal Entry), so plain indexes
+INDEXED_ID_FIELDS = [
+    ("Sales Invoice", "custom_quickbooks_invoice_id"),
+    ("Purchase Invoice", "custom_quickbooks_pi_id"),
+    ("Journal Entry", "custom_quickbooks_je_id"),
+    ("Payment Entry", "qbo_payment_id"),
+    ("Account", "quickbooks_id"),
+    ("Account", "custom_qbc_child_account_name")
+]
+
+
+def execute():
+    """Index the QBO id lookup columns before the custom field fixtures mark them indexed
+
+    Building the indexes here keeps the slow ALTERs in one logged step. The index
+    names match the ones Frappe's schema sync gives these fields (`<fieldname>` for
+    unique, `<fieldname>_index` for search_index), so the fixture sync finds them in
+    place. Duplicate ids on masters would make the unique index fail, so only the
+    oldest document keeps the id and the others are logged and cleared.
+    """
+    for doctype, fieldname in UNIQUE_ID_FIELDS + INDEXED_ID_FIELDS:
+        if not frappe.db.has_column(doctype, fieldname):
+            continue  # the fixture creates the field, already indexed
+        table = f"tab{doctype}"
+        # Empty strings would collide in a unique index and are not ids anyway
+        frappe.db.sql(f"UPDATE `{table}` SET `{fieldname}` = NULL WHERE `{fieldname}` = ''")
+
+        if (doctype, fieldname) in UNIQUE_ID_FIELDS:
+            clear_duplicate_ids(doctype, fieldname)
+            if not has_index(table, fieldname):
+                frappe.db.add_unique(doctype, [fieldname], constraint_name=fieldname)
+        elif not has_index(table, fieldname):
+            frappe.db.add_index(doctype, [fieldname], index_name=f"{fieldname}_index")
+
+
+def has_index(table, fieldname):
+    return bool(frappe.db.sql(f"SHOW INDEX FROM `{table}` WHERE Column_name = %s AND Seq_in_index = 1", fieldname))
+
+
+def clear_duplicate_ids(doctype, fieldname):
+    duplicates = frappe.db.sql(
+        f"""SELECT `{fieldname}` FROM `tab{doctype}`
+        WHERE `{fieldname}` IS NOT NULL
+        GROUP BY `{fieldname}` HAVING COUNT(*) > 1""",
+        pluck=True
+    )
+    cleared = []
+    for qbo_id in duplicates:
+        names = frappe.get_all(doctype, filters={fieldname: qbo_id}, order_by="creation asc", pluck="name")
+        for name in names[1:]:
+            frappe.db.set_value(doctype, name, fieldname, None, update_modified=False)
+            cleared.append(f"{name} (QBO id {qbo_id}, kept on {names[0]})")
+
+    if cleared:
+        frappe.log_error(
+            f"Cleared duplicate {fieldname} before adding a unique index:\n" + "\n".join(cleared),
+            f"QuickBooks {doctype} Duplicate IDs"
+        )
@@ -0,0 +1,43 @@
+import frappe
+from frappe.utils import now_datetime
+
+from quickbooks_integration.api.qbo_links import (
+    LEGACY_ID_FIELDS,
+    LINK_DOCTYPE,
+    bump_link_version,
+    get_link_name,
+    get_realm_id,
+)
+
+INSERT_CHUNK = 10000
+
+
+def execute():
+    """Create a QuickBooks Link for every document imported before the crosswalk existed"""
+    realm_id = get_realm_id()
+    if not realm_id:
+        return  # never connected, so nothing was imported
+
+    now = now_datetime()
+    fields = ["name", "realm_id", "entity", "qbo_id", "reference_doctype", "reference_name", "creation", "modified", "owner", "modified_by"]
+
+    for entity, sources in LEGACY_ID_FIELDS.items():
+        for doctype, fieldname, filters in sources:
+            if not frappe.db.has_column(doctype, fieldname):
+                continue
+            documents = frappe.get_all(
+                doctype,
+                filters={fieldname: ["is", "set"], "docstatus": ["<", 2], **filters},
+                fields=["name", fieldname],
+                order_by="creation asc",
+                as_list=True
+            )
+            values = [
+                (get_link_name(realm_id, entity, qbo_id), realm_id, entity, qbo_id, doctype, name, now, now, "Administrator", "Administrator")
+                for name, qbo_id in documents
+            ]
+            # The oldest document wins where several carry the same id, as the old lookups did
+            for start in range(0, len(values), INSERT_CHUNK):
+                frappe.db.bulk_insert(LINK_DOCTYPE, fields, values[start:start + INSERT_CHUNK], ignore_duplicates=True)
+
+    bump_link_version()
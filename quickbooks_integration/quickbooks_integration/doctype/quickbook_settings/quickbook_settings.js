@@ -1,7 +1,105 @@
 // Copyright (c) 2025, maddy and contributors
 // For license information, please see license.txt
 
+const SYNC_BUTTONS = [
+    ["Fetch Customers", "customers"],
+    ["Fetch Vendors", "vendors"],
+    ["Fetch Items", "items"],
+    ["Fetch Accounts", "accounts"],
+    ["Fetch Invoices", "invoices"],
+    ["Fetch Bills", "bills"],
+    ["Fetch Payments", "payments"],
+    ["Fetch Journal Entries", "journal_entries"],
+    ["Fetch Employees", "employees"],
+    ["Fetch Changes (CDC)", "changes"],
+    ["Sync All", "all"],
+];
+
+// Syncs that keep a watermark; a full sync re-reads every record, resuming from the checkpoint of an unfinished one
+const FULL_SYNCS = ["customers", "vendors", "items", "accounts", "invoices", "bills", "payments", "journal_entries", "all"];
+
+const SYNC_STATUS_POLL_INTERVAL = 15000; // ms; realtime events drive the bar, polling only catches a missed finish
+
+function show_sync_result(status) {
+    const link = status.sync_run
+        ? `<br><a href="/app/quickbooks-sync-run/${encodeURIComponent(status.sync_run)}">View Sync Run</a>`
+        : "";
+    if (typeof status.result === "string") {
+        frappe.msgprint(status.result + link);
+    } else if (status.result) {
+        frappe.msgprint("<pre>" + frappe.utils.escape_html(JSON.stringify(status.result, null, 2)) + "</pre>" + link);
+    } else {
+        frappe.msgprint("Sync completed." + link);
+    }
+}
+
+function show_sync_progress(frm, status) {
+    const finished = ["Completed", "Failed"].includes(status.status);
+    const percent = finished ? 100 : status.percent || 0;
+    const message = `${status.phase || status.status}: ${status.rows_processed} rows (${status.rows_per_sec} rows/sec)`;
+    frm.dashboard.show_progress(`QuickBooks ${status.sync}`, percent, message);
+}
+
+function finish_sync(frm, job_id, status) {
+    show_sync_progress(frm, status);
+    // Only report the result once, and only for syncs queued from this form
+    if (!frm.quickbooks_sync_jobs.delete(job_id)) return;
+    if (status.status === "Completed") {
+        frappe.call({
+            method: "quickbooks_integration.api.sync_jobs.get_sync_status",
+            args: { job_id: job_id },
+            callback: (r) => show_sync_result(r.message || status)
+        });
+    } else {
+        frappe.msgprint("Sync failed: " + (status.result || "check error logs."));
+    }
+}
+
+function poll_sync_status(frm, job_id) {
+    if (!frm.quickbooks_sync_jobs.has(job_id)) return;
+    frappe.call({
+        method: "quickbooks_integration.api.sync_jobs.get_sync_status",
+        args: { job_id: job_id },
+        callback: function (r) {
+            const status = r.message;
+            if (status && ["Completed", "Failed"].includes(status.status)) {
+                finish_sync(frm, job_id, status);
+            } else {
+                if (status) show_sync_progress(frm, status);
+                setTimeout(() => poll_sync_status(frm, job_id), SYNC_STATUS_POLL_INTERVAL);
+            }
+        }
+    });
+}
+
+function enqueue_sync(frm, sync, full_sync = 0) {
+    frappe.call({
+        method: "quickbooks_integration.api.sync_jobs.enqueue_sync",
+        args: { sync: sync, full_sync: full_sync },
+        callback: function (r) {
+            if (r.message) {
+                frappe.show_alert(`Queued QuickBooks sync: ${r.message}`);
+                frm.quickbooks_sync_jobs.add(r.message);
+                poll_sync_status(frm, r.message);
+            } else {
+                frappe.msgprint("Failed to queue sync.");
+            }
+        }
+    });
+}
+
 frappe.ui.form.on("Quickbook Settings", {
+    onload(frm) {
+        frm.quickbooks_sync_jobs = new Set();
+        frappe.realtime.on("quickbooks_sync_progress", (status) => {
+            if (["Completed", "Failed"].includes(status.status)) {
+                finish_sync(frm, status.job_id, status);
+            } else {
+                show_sync_progress(frm, status);
+            }
+        });
+    },
+
     refresh(frm) {
         frm.add_custom_button("Connect QuickBooks", function () {
             frappe.call({
@@ -15,87 +113,13 @@ frappe.ui.form.on("Quickbook Settings", {
                 }
             });
         });
-        frm.add_custom_button("Fetch Customers", function () {
-            frappe.call({
-                method: "quickbooks_integration.api.customer_sync.sync_quickbooks_customers",
-                callback: function (r) {
-                    if (r.message) {
-                        frappe.msgprint(r.message);
-                    } else {
-                        frappe.msgprint("Failed to sync customers.");
-                    }
-                }
-            });
+        SYNC_BUTTONS.forEach(([label, sync]) => {
+            frm.add_custom_button(label, () => enqueue_sync(frm, sync));
         });
-        frm.add_custom_button("Fetch Vendors", function () {
-            frappe.call({
-                method: "quickbooks_integration.api.vendor_sync.sync_quickbooks_vendors",
-                callback: function (r) {
-                    if (r.message) {
-                        frappe.msgprint(r.message);
-                    } else {
-                        frappe.msgprint("Failed to sync vendors.");
-                    }
-                }
-            });
-        });
-        frm.add_custom_button("Fetch Items", function () {
-            frappe.call({
-                method: "quickbooks_integration.api.item_sync.sync_quickbooks_items",
-                callback: function (r) {
-                    frappe.msgprint(r.message || "Failed to sync items.");
-                }
-            });
-        });
-        frm.add_custom_button("Fetch Accounts", function () {
-            frappe.call({
-                method: "quickbooks_integration.api.account_sync.sync_quickbooks_chart_of_accounts",
-                callback: function (r) {
-                    frappe.msgprint(r.message || "Failed to sync accounts.");
-                }
-            });
-        });
-        frm.add_custom_button("Fetch Invoices", function () {
-            frappe.call({
-                method: "quickbooks_integration.api.invoice_sync.sync_quickbooks_invoices",
-                callback: function (r) {
-                    frappe.msgprint(r.message || "Failed to sync invoices.");
-                }
-            });
-        });
-        frm.add_custom_button("Fetch Bills", function () {
-            frappe.call({
-                method: "quickbooks_integration.api.bill_sync.sync_quickbooks_bills",
-                callback: function (r) {
-                    frappe.msgprint(r.message || "Failed to sync bills.");
-                }
-            });
-        });
-        frm.add_custom_button(__('Fetch Payments'), function() {
-            frappe.call({
-                method: "quickbooks_integration.api.payments_sync.sync_quickbooks_payments",
-                callback: function(r) {
-                    frappe.msgprint(r.message || "Payments synced successfully.");
-                }
-            });
-        });
-        frm.add_custom_button("Fetch Journal Entries", function() {
-            frappe.call({
-                method: "quickbooks_integration.api.journal_entries_sync.sync_quickbooks_journal_entries",
-                callback: function(r) {
-                    if (!r.exc) {
-                        frappe.msgprint(r.message);
-                    }
-                }
-            });
-        });
-        frm.add_custom_button("Fetch Employees", function () {
-            frappe.call({
-                method: "quickbooks_integration.api.employee_sync.sync_quickbooks_employees",
-                callback: function (r) {
-                    frappe.msgprint(r.message || "Failed to sync employees.");
-                }
-            });
+        SYNC_BUTTONS.filter(([, sync]) => FULL_SYNCS.includes(sync)).forEach(([label, sync]) => {
+            frm.add_custom_button(label, () => {
+                frappe.confirm(`Re-read every record from QuickBooks for ${label}?`, () => enqueue_sync(frm, sync, 1));
+            }, "Full Sync");
         });
         frm.add_custom_button("Fetch Company Info", function () {
             frappe.call({
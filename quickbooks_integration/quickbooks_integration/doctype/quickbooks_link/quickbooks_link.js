@@ -0,0 +1,8 @@
+// Copyright (c) 2026, maddy and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("QuickBooks Link", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,16 @@
+# Copyright (c) 2026, maddy and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from quickbooks_integration.api.qbo_links import LINK_DOCTYPE, get_link_name
+
+
+class QuickBooksLink(Document):
+	def autoname(self):
+		self.name = get_link_name(self.realm_id, self.entity, self.qbo_id)
+
+
+def on_doctype_update():
+	frappe.db.add_index(LINK_DOCTYPE, ["reference_doctype", "reference_name"])
@@ -0,0 +1,50 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.qbo_links import LINK_DOCTYPE, QuickBooksLinks
+
+
+class TestQuickBooksLink(FrappeTestCase):
+	def test_set_and_get_round_trip_through_the_database(self):
+		QuickBooksLinks("test-realm").set("Customer", "42", "Customer", "_Test Customer", "3")
+
+		self.assertTrue(frappe.db.exists(LINK_DOCTYPE, "test-realm:Customer:42"))
+		self.assertEqual(
+			QuickBooksLinks("test-realm").get("Customer", 42), ("Customer", "_Test Customer", "3")
+		)
+		self.assertIsNone(QuickBooksLinks("test-realm").get_name("Customer", "42", doctype="Supplier"))
+
+	def test_set_repoints_an_existing_link(self):
+		links = QuickBooksLinks("test-realm")
+		links.set("Bill", "7", "Journal Entry", "JV-0001")
+		links.set("Bill", "7", "Purchase Invoice", "PINV-0001")
+
+		self.assertEqual(
+			frappe.db.get_value(LINK_DOCTYPE, "test-realm:Bill:7", ["reference_doctype", "reference_name"]),
+			("Purchase Invoice", "PINV-0001"),
+		)
+
+	def test_is_unchanged_compares_sync_tokens(self):
+		links = QuickBooksLinks("test-realm")
+		links.set("Vendor", "9", "Supplier", "_Test Supplier", "2")
+
+		self.assertTrue(links.is_unchanged("Vendor", {"Id": "9", "SyncToken": "2"}))
+		self.assertFalse(links.is_unchanged("Vendor", {"Id": "9", "SyncToken": "3"}))
+		self.assertFalse(links.is_unchanged("Vendor", {"Id": "9", "SyncToken": "2"}, doctype="Customer"))
+		self.assertFalse(links.is_unchanged("Vendor", {"Id": "10", "SyncToken": "0"}))
+
+	def test_links_reach_the_shared_cache_only_on_commit(self):
+		links = QuickBooksLinks("test-realm")
+		cached = links.get_entity_links("Customer")
+		links.set("Customer", "43", "Customer", "_Test Customer")
+
+		self.assertNotIn("43", cached)
+		self.assertEqual(links.get_name("Customer", "43"), "_Test Customer")
+
+		frappe.db.rollback()
+
+		self.assertNotIn("43", cached)
+		self.assertIsNone(links.get("Customer", "43"))
@@ -0,0 +1,60 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.telemetry import (
+	SYNC_RUN_DOCTYPE,
+	finish_sync_run,
+	get_telemetry,
+	record_counts,
+	record_summary,
+	start_sync_run,
+)
+
+
+class TestQuickBooksSyncRun(FrappeTestCase):
+	def start_run(self):
+		run_id = f"_Test Run {frappe.generate_hash(length=8)}"
+		start_sync_run(run_id, "vendors", full_sync=1)
+		# finish_sync_run commits the run, so the cleanup has to commit its removal too
+		self.addCleanup(frappe.db.commit)
+		self.addCleanup(frappe.db.delete, "QuickBooks Sync Run Entity", {"parent": run_id})
+		self.addCleanup(frappe.db.delete, SYNC_RUN_DOCTYPE, {"run_id": run_id})
+		return run_id
+
+	def test_finished_run_stores_entity_counts(self):
+		run_id = self.start_run()
+		telemetry = get_telemetry()
+		telemetry.record_api_call(0.2, size=1024)  # before any entity: lands under Setup
+		telemetry.set_entity("Vendor")
+		for _ in range(3):
+			telemetry.record_row(0.01)
+		record_counts("Vendor", created=2, failed=1)
+		record_summary("Vendor", ["Vendor 7 → Missing payable account"])
+
+		run = finish_sync_run("Completed", {"created": 2})
+
+		self.assertIsNone(get_telemetry())
+		self.assertEqual(run.name, run_id)
+		self.assertEqual((run.sync, run.status, run.full_sync), ("vendors", "Completed", 1))
+		self.assertEqual((run.rows_processed, run.api_calls, run.bytes_downloaded), (3, 1, 1024))
+		self.assertEqual(frappe.parse_json(run.result), {"created": 2})
+		self.assertIn("Vendor 7 → Missing payable account", run.summary)
+
+		entities = {row.entity: row for row in run.entities}
+		self.assertEqual(set(entities), {"Setup", "Vendor"})
+		self.assertEqual(
+			(entities["Vendor"].rows, entities["Vendor"].created, entities["Vendor"].failed), (3, 2, 1)
+		)
+
+	def test_failed_run_is_stored_as_failed(self):
+		run_id = self.start_run()
+		finish_sync_run("Failed", "Access Token or Realm ID missing")
+
+		self.assertEqual(frappe.db.get_value(SYNC_RUN_DOCTYPE, run_id, "status"), "Failed")
+
+	def test_finish_without_a_started_run_does_nothing(self):
+		frappe.flags.quickbooks_sync_telemetry = None
+		self.assertIsNone(finish_sync_run("Completed"))
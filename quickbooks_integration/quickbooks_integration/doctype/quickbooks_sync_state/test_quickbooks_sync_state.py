@@ -0,0 +1,59 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.sync_state import (
+	SYNC_STATE_DOCTYPE,
+	Watermark,
+	get_watermark,
+	hold_watermark,
+	save_checkpoint,
+)
+
+
+def make_record(updated):
+	return {"Id": updated, "MetaData": {"LastUpdatedTime": updated}}
+
+
+class TestQuickBooksSyncState(FrappeTestCase):
+	def test_unfinished_run_resumes_from_its_checkpoint(self):
+		frappe.db.delete(SYNC_STATE_DOCTYPE, {"entity": "_Test Entity"})
+		records = [make_record(f"2025-01-0{day}T00:00:00-00:00") for day in (1, 2, 3)]
+
+		watermark = Watermark("_Test Entity", full_sync=True)
+		tracked = watermark.track(records)
+		next(tracked)
+		next(tracked)
+		save_checkpoint()  # what BatchCommitter does before committing a batch
+
+		resumed = Watermark("_Test Entity", full_sync=True)  # the retried job
+		self.assertEqual(resumed.resume_from, "2025-01-02T00:00:00-00:00")
+		self.assertIsNone(resumed.since)
+
+		list(resumed.track(records[1:]))
+		resumed.save()
+		state = frappe.db.get_value(
+			SYNC_STATE_DOCTYPE,
+			"_Test Entity",
+			["last_updated_time", "records_synced", "checkpoint_updated_time"],
+			as_dict=True,
+		)
+		self.assertEqual(state.last_updated_time, "2025-01-03T00:00:00-00:00")
+		self.assertEqual(
+			state.records_synced, 4
+		)  # two checkpointed, then the shared-timestamp record re-read
+		self.assertIsNone(state.checkpoint_updated_time)
+
+	def test_watermark_is_held_below_a_skipped_record(self):
+		frappe.db.delete(SYNC_STATE_DOCTYPE, {"entity": "_Test Entity"})
+		records = [make_record(f"2025-01-0{day}T00:00:00-00:00") for day in (1, 2, 3)]
+
+		watermark = Watermark("_Test Entity")
+		for record in watermark.track(records):
+			if record["Id"].startswith("2025-01-02"):
+				hold_watermark(record)  # e.g. an invoice whose customer was not imported yet
+		watermark.save()
+
+		self.assertEqual(get_watermark("_Test Entity"), "2025-01-01T23:59:59+00:00")
@@ -0,0 +1,47 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.patches.v1_0 import add_quickbooks_id_indexes
+from quickbooks_integration.patches.v1_0.add_quickbooks_id_indexes import INDEXED_ID_FIELDS, UNIQUE_ID_FIELDS
+
+
+class TestAddQuickBooksIdIndexes(FrappeTestCase):
+	def test_indexes_use_the_names_schema_sync_gives_the_fields(self):
+		with (
+			patch.object(frappe.db, "has_column", return_value=True),
+			patch.object(frappe.db, "sql"),
+			patch.object(frappe.db, "add_unique") as add_unique,
+			patch.object(frappe.db, "add_index") as add_index,
+			patch.object(add_quickbooks_id_indexes, "has_index", return_value=False),
+			patch.object(add_quickbooks_id_indexes, "clear_duplicate_ids") as clear_duplicate_ids,
+		):
+			add_quickbooks_id_indexes.execute()
+
+		self.assertEqual(
+			[call.args + tuple(call.kwargs.values()) for call in add_unique.call_args_list],
+			[(doctype, [fieldname], fieldname) for doctype, fieldname in UNIQUE_ID_FIELDS],
+		)
+		self.assertEqual(
+			[call.args + tuple(call.kwargs.values()) for call in add_index.call_args_list],
+			[(doctype, [fieldname], f"{fieldname}_index") for doctype, fieldname in INDEXED_ID_FIELDS],
+		)
+		self.assertEqual(clear_duplicate_ids.call_count, len(UNIQUE_ID_FIELDS))
+
+	def test_existing_indexes_are_left_alone(self):
+		with (
+			patch.object(frappe.db, "has_column", return_value=True),
+			patch.object(frappe.db, "sql"),
+			patch.object(frappe.db, "add_unique") as add_unique,
+			patch.object(frappe.db, "add_index") as add_index,
+			patch.object(add_quickbooks_id_indexes, "has_index", return_value=True),
+			patch.object(add_quickbooks_id_indexes, "clear_duplicate_ids"),
+		):
+			add_quickbooks_id_indexes.execute()
+
+		add_unique.assert_not_called()
+		add_index.assert_not_called()
@@ -0,0 +1,52 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.batch_commit import BatchCommitter
+
+
+def make_uom(name):
+	frappe.get_doc({"doctype": "UOM", "uom_name": name}).insert(ignore_permissions=True)
+
+
+class TestBatchCommitter(FrappeTestCase):
+	def setUp(self):
+		self.calls = []
+		# Record the commits instead of making them, so the test data stays in the test transaction
+		for patcher in (
+			patch(
+				"quickbooks_integration.api.batch_commit.save_checkpoint",
+				side_effect=lambda: self.calls.append("checkpoint"),
+			),
+			patch.object(frappe.db, "commit", side_effect=lambda: self.calls.append("commit")),
+		):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def test_a_failed_record_is_rolled_back_alone(self):
+		committer = BatchCommitter(batch_size=10)
+		with committer.record():
+			make_uom("_Test QBO UOM Kept")
+
+		with self.assertRaises(frappe.ValidationError), committer.record():
+			make_uom("_Test QBO UOM Rolled Back")
+			frappe.throw("Missing account")
+
+		self.assertTrue(frappe.db.exists("UOM", "_Test QBO UOM Kept"))
+		self.assertFalse(frappe.db.exists("UOM", "_Test QBO UOM Rolled Back"))
+		self.assertEqual((committer.pending, self.calls), (1, []))
+
+	def test_every_batch_commits_with_its_checkpoint(self):
+		committer = BatchCommitter(batch_size=2)
+		for _ in range(5):
+			with committer.record():
+				pass
+
+		self.assertEqual(self.calls, ["checkpoint", "commit"] * 2)
+		committer.commit()
+		self.assertEqual((committer.committed, committer.pending), (5, 0))
+		self.assertEqual(self.calls[-2:], ["checkpoint", "commit"])
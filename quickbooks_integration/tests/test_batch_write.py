@@ -0,0 +1,77 @@
+# Copyright (c) 2025, maddy and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.batch_write import (
+	WRITE_MAPPINGS,
+	QuickBooksWriteError,
+	build_operation,
+	push_documents,
+)
+
+
+class TestBatchWrite(FrappeTestCase):
+	def test_only_failed_operations_are_retried(self):
+		client = MagicMock()
+		client.batch.side_effect = [
+			[
+				{"bId": "SINV-1", "Invoice": {"Id": "10", "SyncToken": "0"}},
+				{"bId": "SINV-2", "Fault": {"type": "SystemFault", "Error": [{"Message": "Try again"}]}},
+				{
+					"bId": "SINV-3",
+					"Fault": {"type": "ValidationFault", "Error": [{"Message": "Bad customer"}]},
+				},
+			],
+			[{"bId": "SINV-2", "Invoice": {"Id": "11", "SyncToken": "0"}}],
+		]
+
+		with (
+			patch(
+				"frappe.get_doc",
+				side_effect=lambda doctype, name: frappe._dict(doctype=doctype, name=name, docstatus=1),
+			),
+			patch(
+				"quickbooks_integration.api.batch_write.build_operation",
+				return_value={"operation": "create", "Invoice": {}},
+			),
+			patch("quickbooks_integration.api.batch_write.save_qbo_reference") as save_qbo_reference,
+			patch("quickbooks_integration.api.batch_write.time.sleep") as sleep,
+		):
+			result = push_documents(client, "Sales Invoice", ["SINV-1", "SINV-2", "SINV-3"])
+
+		self.assertEqual([op["bId"] for op in client.batch.call_args.args[0]], ["SINV-2"])
+		self.assertEqual(result["pushed"], ["SINV-1", "SINV-2"])
+		self.assertEqual(list(result["failed"]), ["SINV-3"])
+		self.assertEqual(save_qbo_reference.call_count, 2)
+		sleep.assert_called_once()  # backed off once before retrying SINV-2
+
+	def test_document_imported_as_another_entity_is_not_pushed(self):
+		# Journal Entries imported from bills are linked to the QBO Bill, not to a JournalEntry
+		doc = frappe._dict(doctype="Journal Entry", name="ACC-JV-1", custom_quickbooks_je_id="42")
+
+		with patch(
+			"quickbooks_integration.api.batch_write.get_document_links", return_value={"Bill": ("42", "3")}
+		):
+			self.assertRaises(QuickBooksWriteError, build_operation, doc, MagicMock())
+
+	def test_update_uses_the_linked_sync_token_and_keeps_the_qbo_doc_number(self):
+		doc = frappe._dict(doctype="Sales Invoice", name="SINV-1")
+		payload = {"DocNumber": "SINV-1", "TxnDate": "2025-01-01"}
+
+		with (
+			patch(
+				"quickbooks_integration.api.batch_write.get_document_links",
+				return_value={"Invoice": ("10", "5")},
+			),
+			patch.dict(WRITE_MAPPINGS["Sales Invoice"], map=lambda doc: dict(payload)),
+		):
+			operation = build_operation(doc, MagicMock())
+
+		self.assertEqual(operation["operation"], "update")
+		self.assertEqual(
+			operation["Invoice"], {"TxnDate": "2025-01-01", "Id": "10", "SyncToken": "5", "sparse": True}
+		)
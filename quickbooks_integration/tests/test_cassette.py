@@ -0,0 +1,78 @@
+# Copyright (c) 2025, maddy and Contributors
+# See license.txt
+
+import gzip
+import json
+import os
+import tempfile
+
+import requests
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.cassette import ReplayAdapter
+
+
+def write_cassette(path, entries):
+	with gzip.open(path, "wt", encoding="utf-8") as cassette:
+		for entry in entries:
+			cassette.write(json.dumps(entry) + "\n")
+
+
+def make_entry(body, content, url="https://quickbooks.api.intuit.com/v3/company/111/query"):
+	return {
+		"method": "POST",
+		"url": url,
+		"body": body,
+		"status_code": 200,
+		"headers": {"Content-Type": "application/json"},
+		"content": json.dumps(content),
+		"elapsed": 0.5,
+	}
+
+
+class TestCassette(FrappeTestCase):
+	def setUp(self):
+		handle, self.path = tempfile.mkstemp(suffix=".jsonl.gz")
+		os.close(handle)
+		self.addCleanup(os.remove, self.path)
+
+	def replay_session(self):
+		session = requests.Session()
+		session.mount("https://", ReplayAdapter(self.path, realistic_latency=False))
+		return session
+
+	def test_replay_matches_across_realms_and_watermarks(self):
+		recorded = "SELECT * FROM Customer WHERE MetaData.LastUpdatedTime > '2025-01-01' STARTPOSITION 1 MAXRESULTS 1000"
+		write_cassette(self.path, [make_entry(recorded, {"QueryResponse": {"Customer": [{"Id": "1"}]}})])
+
+		session = self.replay_session()
+		url = "https://sandbox-quickbooks.api.intuit.com/v3/company/999/query"
+		query = "SELECT * FROM Customer WHERE MetaData.LastUpdatedTime > '2025-06-01' STARTPOSITION 1 MAXRESULTS 1000"
+
+		self.assertEqual(session.post(url, data=query).json()["QueryResponse"]["Customer"], [{"Id": "1"}])
+
+		# The streaming /query reader parses the raw body, which .json() would already have consumed
+		streamed = session.post(url, data=query, stream=True)
+		self.assertEqual(json.loads(streamed.raw.read())["QueryResponse"]["Customer"], [{"Id": "1"}])
+
+	def test_replay_serves_pages_in_recorded_order(self):
+		pages = [f"SELECT * FROM Item STARTPOSITION {start} MAXRESULTS 1" for start in (1, 2)]
+		write_cassette(
+			self.path,
+			[
+				make_entry(pages[0], {"page": 1}),
+				make_entry(pages[1], {"page": 2}),
+				make_entry("SELECT * FROM Item STARTPOSITION 1 MAXRESULTS 1", {"page": 3}),
+			],
+		)
+		session = self.replay_session()
+		url = "https://quickbooks.api.intuit.com/v3/company/111/query"
+
+		self.assertEqual(session.post(url, data=pages[0]).json(), {"page": 1})
+		self.assertEqual(session.post(url, data=pages[1]).json(), {"page": 2})
+		self.assertEqual(session.post(url, data=pages[0]).json(), {"page": 3})
+
+	def test_replay_raises_for_unrecorded_requests(self):
+		write_cassette(self.path, [])
+		with self.assertRaises(requests.ConnectionError):
+			self.replay_session().get("https://quickbooks.api.intuit.com/v3/company/111/companyinfo/111")
@@ -0,0 +1,86 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.cdc_sync import CDC_MAX_RESULTS, apply_entity_changes
+
+SINCE = "2026-01-01T00:00:00-08:00"
+DELETED = {"Id": "1", "status": "Deleted", "MetaData": {"LastUpdatedTime": "2026-01-01T10:00:00-08:00"}}
+VOIDED = {
+	"Id": "2",
+	"TotalAmt": 0,
+	"PrivateNote": "Voided",
+	"MetaData": {"LastUpdatedTime": "2026-01-01T11:00:00-08:00"},
+}
+CHANGED = {"Id": "3", "TotalAmt": 10, "MetaData": {"LastUpdatedTime": "2026-01-01T12:00:00-08:00"}}
+
+
+class TestCDCSync(FrappeTestCase):
+	def setUp(self):
+		self.imported = []
+		patcher = patch("quickbooks_integration.api.sync_state.Watermark.save")
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def import_records(self, records):
+		self.imported.extend(records)
+		return "imported"
+
+	def test_deleted_and_voided_records_are_removed_and_the_rest_imported(self):
+		with patch(
+			"quickbooks_integration.api.cdc_sync.remove_linked_documents",
+			side_effect=lambda entity, qb_id: [f"Sales Invoice {qb_id}"],
+		) as remove_linked_documents:
+			result = apply_entity_changes(
+				MagicMock(), "Invoice", self.import_records, [DELETED, VOIDED, CHANGED], SINCE
+			)
+
+		self.assertEqual(result, {"imported": "imported", "removed": ["Sales Invoice 1", "Sales Invoice 2"]})
+		self.assertEqual(self.imported, [CHANGED])
+		self.assertEqual(
+			[call.args for call in remove_linked_documents.call_args_list],
+			[("Invoice", "1"), ("Invoice", "2")],
+		)
+
+	def test_a_voided_bill_is_imported_as_a_change(self):
+		with patch("quickbooks_integration.api.cdc_sync.remove_linked_documents") as remove_linked_documents:
+			apply_entity_changes(MagicMock(), "Bill", self.import_records, [VOIDED], SINCE)
+
+		remove_linked_documents.assert_not_called()
+		self.assertEqual(self.imported, [VOIDED])
+
+	def test_a_failed_removal_is_held_without_stopping_the_others(self):
+		def remove_linked_documents(entity, qb_id):
+			if qb_id == "1":
+				raise frappe.ValidationError("Cannot cancel")
+			return [f"Sales Invoice {qb_id}"]
+
+		held = []
+		with (
+			patch("quickbooks_integration.api.cdc_sync.remove_linked_documents", remove_linked_documents),
+			patch.object(frappe, "log_error") as log_error,
+		):
+			result = apply_entity_changes(
+				MagicMock(), "Invoice", self.import_records, [DELETED, VOIDED], SINCE, held
+			)
+
+		self.assertEqual(result["removed"], ["Sales Invoice 2"])
+		self.assertEqual(held, [DELETED["MetaData"]["LastUpdatedTime"]])
+		log_error.assert_called_once()
+
+	def test_a_truncated_change_list_falls_back_to_a_query(self):
+		client = MagicMock()
+		client.iter_updated_since.return_value = iter([CHANGED])
+
+		with patch("quickbooks_integration.api.cdc_sync.remove_linked_documents") as remove_linked_documents:
+			result = apply_entity_changes(
+				client, "Invoice", self.import_records, [DELETED] * CDC_MAX_RESULTS, SINCE
+			)
+
+		client.iter_updated_since.assert_called_once_with("Invoice", SINCE)
+		remove_linked_documents.assert_not_called()
+		self.assertEqual((result, self.imported), ("imported", [CHANGED]))
@@ -0,0 +1,27 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.doc_updates import get_changes
+from quickbooks_integration.api.item_sync import apply_item_header_changes
+
+
+class TestDocUpdates(FrappeTestCase):
+	def test_get_changes_only_reports_differing_stored_fields(self):
+		current = frappe._dict(item_name="Widget", description=None, is_stock_item=1)
+		values = {"item_name": "Widget", "description": "", "is_stock_item": 0, "not_a_field": "x"}
+
+		self.assertEqual(get_changes(current, values), {"is_stock_item": 0})
+
+	def test_item_header_changes_are_copied_to_item_prices(self):
+		with patch.object(frappe.db, "set_value") as set_value, patch.object(frappe, "clear_document_cache"):
+			apply_item_header_changes("_Test Item", {"description": "Blue widget"})
+
+		set_value.assert_any_call("Item", "_Test Item", {"description": "Blue widget"})
+		set_value.assert_any_call(
+			"Item Price", {"item_code": "_Test Item"}, {"item_description": "Blue widget"}
+		)
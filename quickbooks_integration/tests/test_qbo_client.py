@@ -0,0 +1,107 @@
+# Copyright (c) 2025, maddy and Contributors
+# See license.txt
+
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.qbo_client import QuickBooksAPIError, QuickBooksClient
+from quickbooks_integration.api.rate_limiter import BACKOFF_BASE, get_retry_delay
+
+
+def make_response(rows, entity="Customer", status_code=200):
+	body = {"QueryResponse": {entity: rows}}
+	response = MagicMock(status_code=status_code, text="")
+	response.json.return_value = body
+	response.raw = io.BytesIO(json.dumps(body).encode())
+	return response
+
+
+class TestQuickBooksClient(FrappeTestCase):
+	def setUp(self):
+		settings = frappe._dict(access_token="token", realm_id="123", environment="sandbox")
+		self.client = QuickBooksClient(settings)
+
+	def test_iter_query_pages_until_short_page(self):
+		pages = [make_response([{"Id": str(i)} for i in range(2)]), make_response([{"Id": "2"}])]
+		with patch.object(self.client, "query", side_effect=pages) as query:
+			ids = [row["Id"] for row in self.client.iter_query("Customer", page_size=2)]
+
+		self.assertEqual(ids, ["0", "1", "2"])
+		self.assertEqual(
+			[call.args[0] for call in query.call_args_list],
+			[
+				"SELECT * FROM Customer STARTPOSITION 1 MAXRESULTS 2",
+				"SELECT * FROM Customer STARTPOSITION 3 MAXRESULTS 2",
+			],
+		)
+
+	def test_iter_updated_since_pages_by_last_updated_time(self):
+		def row(qb_id, second):
+			return {"Id": qb_id, "MetaData": {"LastUpdatedTime": f"2025-01-01T00:00:0{second}-08:00"}}
+
+		pages = [
+			make_response([row("A", 1), row("B", 2)]),
+			# B is returned again at the boundary time; an edit moved A past C meanwhile
+			make_response([row("B", 2), row("C", 3)]),
+			make_response([row("C", 3), row("A", 4)]),
+			make_response([row("A", 4)]),
+		]
+		with patch.object(self.client, "query", side_effect=pages) as query:
+			ids = [
+				r["Id"]
+				for r in self.client.iter_updated_since("Customer", "2025-01-01T00:00:00-08:00", page_size=2)
+			]
+
+		self.assertEqual(ids, ["A", "B", "C", "A"])
+		self.assertEqual(
+			[call.args[0] for call in query.call_args_list][:2],
+			[
+				"SELECT * FROM Customer WHERE MetaData.LastUpdatedTime > '2025-01-01T00:00:00-08:00' "
+				"ORDERBY MetaData.LastUpdatedTime STARTPOSITION 1 MAXRESULTS 2",
+				"SELECT * FROM Customer WHERE MetaData.LastUpdatedTime >= '2025-01-01T00:00:02-08:00' "
+				"ORDERBY MetaData.LastUpdatedTime STARTPOSITION 1 MAXRESULTS 2",
+			],
+		)
+
+	def test_iter_updated_since_steps_past_a_page_sharing_one_time(self):
+		rows = [
+			{"Id": str(i), "MetaData": {"LastUpdatedTime": "2025-01-01T00:00:00-08:00"}} for i in range(3)
+		]
+		pages = [make_response(rows[:2]), make_response(rows[:2]), make_response(rows[2:])]
+		with patch.object(self.client, "query", side_effect=pages) as query:
+			ids = [r["Id"] for r in self.client.iter_updated_since("Customer", page_size=2)]
+
+		self.assertEqual(ids, ["0", "1", "2"])
+		self.assertIn("STARTPOSITION 3 MAXRESULTS 2", query.call_args_list[2].args[0])
+
+	def test_iter_query_raises_on_api_error(self):
+		with patch.object(self.client, "query", return_value=make_response([], status_code=500)):
+			with self.assertRaises(QuickBooksAPIError):
+				list(self.client.iter_query("Customer"))
+
+	def test_request_retries_once_with_refreshed_token_on_401(self):
+		self.client.session = MagicMock()
+		self.client.session.request.side_effect = [MagicMock(status_code=401), MagicMock(status_code=200)]
+		with (
+			patch(
+				"quickbooks_integration.api.qbo_client.get_access_token", return_value="fresh"
+			) as get_access_token,
+			patch("quickbooks_integration.api.qbo_client.get_stored_token", return_value=("fresh", None)),
+		):
+			response = self.client.get("companyinfo/123")
+
+		self.assertEqual(response.status_code, 200)
+		get_access_token.assert_called_once_with(stale_token="token")
+		headers = self.client.session.request.call_args.kwargs["headers"]
+		self.assertEqual(headers["Authorization"], "Bearer fresh")
+
+	def test_retry_delay_honours_retry_after(self):
+		response = MagicMock(headers={"Retry-After": "7"})
+		self.assertTrue(7 <= get_retry_delay(response, attempt=0) <= 7 + BACKOFF_BASE)
+
+		response = MagicMock(headers={})
+		self.assertTrue(0 <= get_retry_delay(response, attempt=3) <= BACKOFF_BASE * 2**3)
@@ -0,0 +1,58 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.qbo_links import LINK_DOCTYPE, QuickBooksLinks
+from quickbooks_integration.api.resolvers import AccountResolver, CustomerResolver, ItemResolver
+
+
+class TestResolvers(FrappeTestCase):
+	def test_unlinked_account_refs_query_the_links_once_per_run(self):
+		links = QuickBooksLinks(realm_id="_Test Realm")
+		with patch(
+			"quickbooks_integration.api.resolvers.get_account_map", return_value={"Rent": "Rent - _TC"}
+		):
+			accounts = AccountResolver("_Test Company", links)
+
+		with patch.object(frappe.db, "get_value", wraps=frappe.db.get_value) as get_value:
+			for _ in range(3):
+				self.assertEqual(accounts.resolve({"value": "99", "name": "Rent"}), "Rent - _TC")
+
+		link_lookups = [call for call in get_value.call_args_list if call.args[0] == LINK_DOCTYPE]
+		self.assertEqual(len(link_lookups), 1)
+
+	def test_item_refs_resolve_by_qbo_id_then_code_then_name(self):
+		links = QuickBooksLinks(realm_id="_Test Realm")
+		links.set("Item", "5", "Item", "_Test QBO Linked Item")
+		items = ItemResolver(links)
+		items.add("_Test QBO Widget", "QBO Widget")  # created during the run
+
+		self.assertEqual(items.resolve({"value": "5", "name": "QBO Widget"}), "_Test QBO Linked Item")
+		self.assertEqual(items.resolve({"value": "404", "name": "_Test QBO Widget"}), "_Test QBO Widget")
+		self.assertEqual(items.resolve({"name": "QBO Widget"}), "_Test QBO Widget")
+		self.assertIsNone(items.resolve({"name": "_Test QBO Widget"}, match_item_code=False))
+		self.assertIsNone(items.resolve({"name": "No Such Item"}))
+
+	def test_large_catalogs_fall_back_to_cached_lookups(self):
+		items = ItemResolver(QuickBooksLinks(realm_id="_Test Realm"), preload_limit=0, cache_size=10)
+		self.assertFalse(items.preloaded)
+
+		with patch.object(frappe.db, "get_value", return_value="_Test Item") as get_value:
+			for _ in range(3):
+				self.assertEqual(items.get_by_item_code("_Test Item"), "_Test Item")
+
+		get_value.assert_called_once_with("Item", {"item_code": "_Test Item"}, "name")
+
+	def test_customers_match_on_customer_name_before_the_document_name(self):
+		customers = CustomerResolver(QuickBooksLinks(realm_id="_Test Realm"))
+		customers.add("CUST-0001", "Acme", "Net 30")
+		customers.add("Acme", "Acme Ltd")
+
+		self.assertEqual(customers.get_by_name("Acme"), "CUST-0001")
+		self.assertEqual(customers.get_by_name("Acme Ltd"), "Acme")
+		self.assertEqual(customers.get_payment_terms("CUST-0001"), "Net 30")
+		self.assertIsNone(customers.get_by_name("Nobody"))
@@ -0,0 +1,45 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.sync_all import SYNC_STAGES, get_critical_path, sync_all
+
+
+class TestSyncAll(FrappeTestCase):
+	def test_stages_start_after_their_dependencies_and_skip_after_a_failure(self):
+		order = []
+
+		def run_stage(site, sites_path, stage, full_sync, started, run_id):
+			self.assertTrue(all(d in order for d in SYNC_STAGES[stage]))
+			order.append(stage)
+			status = "Failed" if stage == "items" else "Completed"
+			return {"status": status, "depends_on": SYNC_STAGES[stage], "duration": 1}
+
+		with patch("quickbooks_integration.api.sync_all.run_stage", run_stage):
+			result = sync_all()
+
+		statuses = {stage: result["stages"][stage]["status"] for stage in SYNC_STAGES}
+		self.assertEqual(statuses["items"], "Failed")
+		self.assertEqual(
+			{s for s, status in statuses.items() if status == "Skipped"}, {"invoices", "bills", "payments"}
+		)
+		self.assertEqual(set(order), set(SYNC_STAGES) - {"invoices", "bills", "payments"})
+
+	def test_critical_path_is_the_longest_chain_of_durations(self):
+		durations = {
+			"accounts": 1,
+			"customers": 5,
+			"vendors": 2,
+			"items": 1,
+			"invoices": 3,
+			"bills": 1,
+			"payments": 2,
+			"journal_entries": 9,
+		}
+		stages = {stage: {"duration": duration} for stage, duration in durations.items()}
+
+		self.assertEqual(get_critical_path(stages), (["accounts", "customers", "invoices", "payments"], 11))
+		self.assertEqual(get_critical_path({}), ([], 0))
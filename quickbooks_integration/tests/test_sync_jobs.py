@@ -0,0 +1,37 @@
+# Copyright (c) 2025, maddy and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.sync_jobs import SYNC_METHODS, get_job_id, get_sync_status, run_sync
+
+
+class TestSyncJobs(FrappeTestCase):
+	def test_every_sync_method_accepts_the_job_arguments(self):
+		for sync, method in SYNC_METHODS.items():
+			# autospec keeps the target's signature, so unexpected keyword arguments raise TypeError
+			with (
+				self.subTest(sync=sync),
+				patch(method, autospec=True, return_value="ok"),
+				patch("quickbooks_integration.api.sync_jobs.finish_sync_run") as finish_sync_run,
+			):
+				self.assertEqual(run_sync(sync, full_sync=1), "ok")
+				finish_sync_run.assert_called_once_with("Completed", "ok")
+
+	def test_errors_raised_by_the_sync_fail_the_job(self):
+		def sync_quickbooks_vendors(full_sync=0):
+			self.assertTrue(frappe.flags.quickbooks_sync_job)
+			raise frappe.ValidationError("Access Token or Realm ID missing")
+
+		with (
+			patch(SYNC_METHODS["vendors"], sync_quickbooks_vendors),
+			patch("quickbooks_integration.api.sync_jobs.finish_sync_run") as finish_sync_run,
+		):
+			self.assertRaises(frappe.ValidationError, run_sync, "vendors")
+
+		self.assertEqual(finish_sync_run.call_args.args[0], "Failed")
+		self.assertEqual(get_sync_status(get_job_id("vendors"))["status"], "Failed")
+		self.assertFalse(frappe.flags.quickbooks_sync_job)
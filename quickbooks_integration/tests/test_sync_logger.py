@@ -0,0 +1,31 @@
+# Copyright (c) 2026, maddy and Contributors
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.sync_logger import RecordLogger
+
+
+class TestRecordLogger(FrappeTestCase):
+	def get_record_logger(self, debug_enabled):
+		logger = MagicMock()
+		logger.isEnabledFor.return_value = debug_enabled
+		with patch("quickbooks_integration.api.sync_logger.get_logger", return_value=logger):
+			return RecordLogger("Invoice", sample_every=3), logger
+
+	def test_only_every_nth_record_is_logged(self):
+		record_logger, logger = self.get_record_logger(debug_enabled=True)
+		for number in range(1, 8):
+			record_logger.debug("Created %s", number)
+
+		self.assertEqual([call.args[-1] for call in logger.debug.call_args_list], [1, 4, 7])
+
+	def test_nothing_is_logged_below_debug(self):
+		record_logger, logger = self.get_record_logger(debug_enabled=False)
+		for number in range(5):
+			record_logger.debug("Created %s", number)
+
+		logger.debug.assert_not_called()
+		self.assertEqual(record_logger.count, 5)
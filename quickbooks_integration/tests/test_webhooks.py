@@ -0,0 +1,69 @@
+# Copyright (c) 2025, maddy and Contributors
+# See license.txt
+
+import base64
+import hashlib
+import hmac
+import time
+from unittest.mock import patch
+
+import frappe
+import redis
+from frappe.tests.utils import FrappeTestCase
+
+from quickbooks_integration.api.webhooks import (
+	DEBOUNCE_SECONDS,
+	WEBHOOK_QUEUE,
+	get_due_notifications,
+	queue_notifications,
+	verify_signature,
+)
+
+
+def make_notification(qb_id, operation="Update"):
+	return {
+		"eventNotifications": [
+			{
+				"realmId": "123",
+				"dataChangeEvent": {"entities": [{"name": "Customer", "id": qb_id, "operation": operation}]},
+			}
+		]
+	}
+
+
+class TestWebhooks(FrappeTestCase):
+	def setUp(self):
+		frappe.cache().delete_value(WEBHOOK_QUEUE)
+
+	def test_verify_signature(self):
+		payload = b'{"eventNotifications": []}'
+		signature = base64.b64encode(hmac.new(b"secret", payload, hashlib.sha256).digest()).decode()
+
+		self.assertTrue(verify_signature(payload, signature, verifier_token="secret"))
+		self.assertFalse(verify_signature(payload, signature, verifier_token="other"))
+		self.assertFalse(verify_signature(payload, None, verifier_token="secret"))
+
+	def test_bursts_are_coalesced_and_debounced(self):
+		queue_notifications(make_notification("1"))
+		queue_notifications(make_notification("1", operation="Delete"))
+
+		self.assertEqual(get_due_notifications(), {})
+
+		due = get_due_notifications(now=time.time() + DEBOUNCE_SECONDS)
+		self.assertEqual(list(due), ["123:Customer:1"])
+		self.assertEqual(due["123:Customer:1"]["operation"], "Delete")
+		self.assertEqual(get_due_notifications(now=time.time() + DEBOUNCE_SECONDS), {})
+
+	def test_notification_arriving_while_claiming_stays_queued(self):
+		cache = frappe.cache()
+		queue_notifications(make_notification("1"))
+		read_before_update = redis.Redis.hgetall(cache, cache.make_key(WEBHOOK_QUEUE))
+		queue_notifications(make_notification("1", operation="Delete"))
+
+		with patch(
+			"quickbooks_integration.api.webhooks.redis.Redis.hgetall", return_value=read_before_update
+		):
+			self.assertEqual(get_due_notifications(now=time.time() + DEBOUNCE_SECONDS), {})
+
+		due = get_due_notifications(now=time.time() + DEBOUNCE_SECONDS)
+		self.assertEqual(due["123:Customer:1"]["operation"], "Delete")